@@ -1,23 +1,50 @@
 from dotenv import load_dotenv
 
 load_dotenv()
-from flask import Flask, render_template, redirect, url_for, request, flash, session, jsonify, make_response, send_file
+from flask import Flask, render_template, redirect, url_for, request, flash, session, jsonify, make_response, send_file, Response, stream_with_context
 from extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from services import db_routing
+from services.db_routing import read_replica, use_replica
+from services import sqlite_tuning
+from services.reference_cache import reference_cache
+from services.autocomplete import autocomplete
+from services import chat_intents
+from services.chat_summary import chat_summary
+from services.availability import availability, is_booked, job_window
+from services.scheduling import conflict_engine
+from services.dispatch import dispatch
+from services.travel import travel_times
+from services.recurring import parse_rule, recurring_jobs
+from services.principal_cache import principal_cache
+from services import session_store
+from services.passwords import passwords
+from services.conditional_get import conditional, table_versions
+from services.fragment_cache import fragment_cache
+from services.assets import assets, build_dist, fetch_vendor
+from services.compression import compression
+from services.change_feed import BUSY_RETRY_SECONDS, change_feed
+from services import rate_limit
+from services.rate_limit import limiter, login_username, policy, user_or_address
+from werkzeug.middleware.proxy_fix import ProxyFix
+from itsdangerous import BadSignature, URLSafeTimedSerializer
 import os
 import re
+import csv
 import json
-from datetime import datetime
+import tempfile
+from collections import namedtuple
+from datetime import date, datetime, timedelta
 from flask_migrate import Migrate
 import click
 from flask.cli import with_appcontext
 from flask_login import LoginManager, login_required, current_user, login_user, logout_user
 from wtforms import Form, StringField, PasswordField, validators
-from wtforms.validators import DataRequired, Email, Length, Optional
+from wtforms.validators import DataRequired, Email, Length, Optional, ValidationError
 from math import ceil
 from flask_admin import Admin, expose
 from flask_admin.contrib.sqla import ModelView
 from flask import abort
+from flask.globals import request_ctx
 from flask_wtf.csrf import CSRFProtect, generate_csrf
 from models import User
 import logging
@@ -29,7 +56,7 @@ import traceback
 from functools import wraps
 import io
 import pandas as pd
-from models import Driver, Agent, Vehicle, Service, Billing, Discount, Job
+from models import Driver, Agent, Vehicle, Service, Billing, Discount, Job, RecurringJob
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
 
@@ -76,6 +103,32 @@ class Config:
     if not db_url:
         db_url = 'sqlite:///app.db'
     SQLALCHEMY_DATABASE_URI = db_url
+    # Optional read replica for reports, chat and search; see services/db_routing.py
+    replica_url = os.environ.get('DATABASE_REPLICA_URL', '')
+    if replica_url.startswith('postgres://'):
+        replica_url = replica_url.replace('postgres://', 'postgresql://')
+    DATABASE_REPLICA_URL = replica_url or None
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    # WAL + production pragmas when running on a SQLite file; see services/sqlite_tuning.py
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', '1') == '1'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    # Where sessions live: database, sqlite (instance/sessions.db, one host only) or cookie; see services/session_store.py
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'database')
+    # Rate limit counters: memory:// for one worker, default instance/ratelimits.db; see services/rate_limit.py
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', '')
+    # Reverse proxies in front of the app (1 on Heroku/Render), so remote_addr is the real client
+    TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+    # Password hashing: pbkdf2_sha256, scrypt or argon2, its cost (scheme default if unset), and an
+    # optional verify/rehash thread pool for gthread workers; see services/passwords.py
+    PASSWORD_SCHEME = os.environ.get('PASSWORD_SCHEME', 'pbkdf2_sha256')
+    PASSWORD_ROUNDS = int(os.environ.get('PASSWORD_ROUNDS', 0)) or None
+    PASSWORD_THREADS = int(os.environ.get('PASSWORD_THREADS', 0))
+    # Live job board streams per worker (default by gunicorn profile when unset); see services/change_feed.py
+    CHANGE_FEED_MAX_STREAMS = (int(os.environ['CHANGE_FEED_MAX_STREAMS'])
+                               if os.environ.get('CHANGE_FEED_MAX_STREAMS') else None)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_pre_ping': True,
+    }
 
 
 class DevelopmentConfig(Config):
@@ -87,7 +140,16 @@ class TestingConfig(Config):
 
 
 class ProductionConfig(Config):
-    pass
+    # Each gunicorn worker owns its own pool, so the database sees up to
+    # workers * (pool_size + max_overflow) connections. With gthread workers
+    # keep pool_size >= GUNICORN_THREADS so threads never queue for a connection.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', max(5, int(os.environ.get('GUNICORN_THREADS', 4))))),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
 
 
 config_map = {
@@ -99,10 +161,37 @@ config_map = {
 app_env = os.environ.get('FLASK_ENV', 'development')
 app.config.from_object(config_map.get(app_env, DevelopmentConfig))
 
+if app.config['TRUSTED_PROXIES']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'], x_proto=app.config['TRUSTED_PROXIES'])
+
 if not app.config['SQLALCHEMY_DATABASE_URI']:
     raise RuntimeError('DATABASE_URL environment variable must be set to a valid PostgreSQL connection string.')
 
+if app.config['DATABASE_REPLICA_URL']:
+    # Binds don't inherit SQLALCHEMY_ENGINE_OPTIONS, so pass the same pool settings explicitly
+    app.config['SQLALCHEMY_BINDS'] = {
+        db_routing.REPLICA_BIND: dict(app.config['SQLALCHEMY_ENGINE_OPTIONS'], url=app.config['DATABASE_REPLICA_URL'])
+    }
+
 db.init_app(app)
+db_routing.init_app(app)
+sqlite_tuning.init_app(app, db)
+reference_cache.init_app(app)
+autocomplete.init_app(app)
+chat_summary.init_app(app)
+availability.init_app(app)
+conflict_engine.init_app(app)
+travel_times.init_app(app)
+recurring_jobs.init_app(app)
+principal_cache.init_app(app)
+session_store.init_app(app)
+passwords.init_app(app)
+table_versions.init_app(app)
+fragment_cache.init_app(app)
+assets.init_app(app)
+compression.init_app(app)
+change_feed.init_app(app)
+rate_limit.init_app(app)
 csrf = CSRFProtect(app)
 
 # Flask-Login setup
@@ -120,7 +209,7 @@ from services.billing_service import BillingService
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return principal_cache.get(int(user_id))
 
 
 class LoginForm(Form):
@@ -187,18 +276,39 @@ def handle_database_errors(f):
 # Custom admin view to restrict access to admins only
 class AdminModelView(ModelView):
     def is_accessible(self):
-        return current_user.is_authenticated and any(
-            role.name in ['fleet_manager', 'system_admin'] for role in current_user.roles)
+        return current_user.is_authenticated and \
+            not current_user.role_names.isdisjoint(('fleet_manager', 'system_admin'))
 
     def inaccessible_callback(self, name, **kwargs):
         return abort(403)
 
 
+class UserView(AdminModelView):
+    column_exclude_list = ('password', 'fs_uniquifier')
+
+    def on_model_change(self, form, model, is_created):
+        # A password typed into the admin form arrives as plaintext
+        if model.password and not passwords.is_hashed(model.password):
+            model.set_password(model.password)
+
+
+class RecurringJobView(AdminModelView):
+    column_list = ('name', 'rrule', 'starts_on', 'ends_on', 'active', 'pickup_time', 'pickup_location', 'dropoff_location')
+    form_excluded_columns = ('jobs',)
+    column_descriptions = {'rrule': 'RFC 5545 rule, e.g. FREQ=WEEKLY;BYDAY=MO,WE,FR or FREQ=DAILY'}
+
+    def on_model_change(self, form, model, is_created):
+        try:
+            parse_rule(model.rrule or '', model.starts_on or '')
+        except ValueError as e:
+            raise ValidationError(f'Invalid schedule: {e}')
+
+
 # Initialize Flask-Admin
 admin = Admin(app, name='Admin', template_mode='bootstrap4')
 
 with app.app_context():
-    admin.add_view(AdminModelView(User, db.session))
+    admin.add_view(UserView(User, db.session))
     admin.add_view(AdminModelView(Role, db.session))
     admin.add_view(AdminModelView(Job, db.session))
     admin.add_view(AdminModelView(Driver, db.session))
@@ -207,6 +317,7 @@ with app.app_context():
     admin.add_view(AdminModelView(Billing, db.session))
     admin.add_view(AdminModelView(Discount, db.session))
     admin.add_view(AdminModelView(Service, db.session))
+    admin.add_view(RecurringJobView(RecurringJob, db.session, name='Recurring Jobs'))
 
 
 # Error handlers
@@ -228,6 +339,21 @@ def not_found(error):
     return render_template('errors/404.html'), 404
 
 
+@app.errorhandler(429)
+def too_many_requests(error):
+    # A limited request must not reach the database. The page is standalone and rendered
+    # without context processors, since Flask-Login's would load current_user. A null
+    # session keeps Flask-Login's after_request hook from reading the session row.
+    request_ctx.session = app.session_interface.make_null_session(app)
+    app.logger.warning(f'Rate limit exceeded: {request.path} ({error.description})')
+    if request.path.startswith('/api/') or request.headers.get('HX-Request'):
+        response = jsonify({'error': 'Too many requests', 'limit': error.description})
+    else:
+        response = make_response(app.jinja_env.get_template('errors/429.html').render(limit=error.description))
+    response.status_code = 429
+    return response
+
+
 @app.errorhandler(500)
 def internal_error(error):
     app.logger.error(f'Internal server error: {error}')
@@ -237,6 +363,8 @@ def internal_error(error):
 
 
 @app.route('/login', methods=['GET', 'POST'])
+@limiter.limit(policy('RATELIMIT_LOGIN'), methods=['POST'])
+@limiter.limit(policy('RATELIMIT_LOGIN_USERNAME'), key_func=login_username, methods=['POST'])
 def login():
     if current_user.is_authenticated:
         app.logger.info(f'User {current_user.username} already authenticated, redirecting to dashboard')
@@ -263,7 +391,8 @@ def login():
                         (User.username == username) | (User.email == username)
                     ).first()
 
-                    if user and user.check_password(password):
+                    # Always spends one hash check, found or not; upgrades an outdated hash on success
+                    if passwords.check(user, password):
                         if user.active:
                             login_user(user)
                             app.logger.info(f'User {user.username} logged in successfully')
@@ -301,9 +430,7 @@ def index():
     return redirect(url_for('dashboard'))
 
 
-@app.route('/dashboard')
-@login_required
-def dashboard():
+def dashboard_metrics():
     from models import Job, Vehicle, Driver
     from datetime import date
     # Unassigned Jobs: jobs with no driver or vehicle assigned
@@ -312,28 +439,38 @@ def dashboard():
     ready_to_invoice = Job.query.filter(Job.order_status == 'Completed', Job.payment_status == 'Unpaid').count()
     # Total Vehicles
     total_vehicles = Vehicle.query.count()
-    # Available Drivers: drivers not assigned to any active job (assuming jobs with order_status 'New' or 'In Progress')
-    active_driver_ids = [job.driver_id for job in Job.query.filter(Job.order_status.in_(['New', 'In Progress'])).all()
-                         if job.driver_id]
-    available_drivers = Driver.query.filter(~Driver.id.in_(active_driver_ids)).count()
+    # Available Drivers: drivers not booked by any open job (services/availability.py is_booked)
+    available_drivers = availability.free_drivers().count()
     # Active Jobs: jobs with order_status 'New' or 'In Progress'
     active_jobs = Job.query.filter(Job.order_status.in_(['New', 'In Progress'])).count()
     # Completed Today: jobs with order_status 'Completed' and pickup_date is today
     completed_today = Job.query.filter(Job.order_status == 'Completed',
                                        Job.pickup_date == date.today().isoformat()).count()
-    return render_template('dashboard.html',
-                           unassigned_jobs=unassigned_jobs,
-                           ready_to_invoice=ready_to_invoice,
-                           total_vehicles=total_vehicles,
-                           available_drivers=available_drivers,
-                           active_jobs=active_jobs,
-                           completed_today=completed_today
-                           )
+    return dict(unassigned_jobs=unassigned_jobs,
+                ready_to_invoice=ready_to_invoice,
+                total_vehicles=total_vehicles,
+                available_drivers=available_drivers,
+                active_jobs=active_jobs,
+                completed_today=completed_today)
+
+
+@app.route('/dashboard')
+@login_required
+def dashboard():
+    return render_template('dashboard.html', **dashboard_metrics())
+
+
+@app.route('/dashboard/metrics')
+@login_required
+def dashboard_metrics_api():
+    """The dashboard counters as JSON, refetched by the page when the change feed reports job changes."""
+    return jsonify(dashboard_metrics())
 
 
 # JOBS CRUD
 @app.route('/jobs', methods=['GET', 'POST'])
 @login_required
+@read_replica
 def jobs():
     page = request.args.get('page', 1, type=int)
     per_page = 20
@@ -387,7 +524,10 @@ def jobs():
 
 
 @app.route('/jobs/table', methods=['GET'])
+@limiter.limit(policy('RATELIMIT_JOBS_TABLE'), key_func=user_or_address)
 @login_required
+@read_replica
+@conditional('job')
 def jobs_table():
     page = request.args.get('page', 1, type=int)
     per_page = 20
@@ -437,43 +577,75 @@ def jobs_table():
         query = Job.query
     pagination = query.order_by(Job.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
     jobs = pagination.items
+    if request.headers.get('HX-Target') == 'jobs-rows':
+        # Filters and paging swap only the rows; the filter inputs keep their focus
+        # and pagination follows as an out-of-band swap.
+        return render_template('jobs_rows.html', jobs=jobs, pagination=pagination, oob=True)
     return render_template('jobs_table.html', jobs=jobs, pagination=pagination)
 
 
+@app.route('/jobs/row/<int:job_id>', methods=['GET'])
+@login_required
+@read_replica
+@conditional('job')
+def job_row(job_id):
+    """One jobs table row, swapped in after a status change or edit."""
+    job = Job.query.get_or_404(job_id)
+    return render_template('job_row.html', job=job)
+
+
+@app.route('/jobs/rows', methods=['GET'])
+@login_required
+@read_replica
+@conditional('job')
+def job_rows():
+    """Several jobs table rows (?id=1&id=2...), for the changes the live board collected."""
+    # A page shows 20 rows; the cap only bounds hand-made requests
+    ids = request.args.getlist('id', type=int)[:100]
+    jobs = Job.query.filter(Job.id.in_(ids)).all() if ids else []
+    return render_template('jobs_rows.html', jobs=jobs)
+
+
+@app.route('/api/changes/stream', methods=['GET'])
+@login_required
+def change_stream():
+    """Server-Sent Events of job and billing changes (services/change_feed.py)."""
+    last_id = request.headers.get('Last-Event-ID', request.args.get('after'))
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+    if not change_feed.subscribe():
+        # Every stream slot of this worker is taken; the page keeps working without live updates
+        response = Response(f'retry: {BUSY_RETRY_SECONDS * 1000}\n\n', status=503, mimetype='text/event-stream')
+        response.headers['Retry-After'] = str(BUSY_RETRY_SECONDS)
+        return response
+    response = Response(change_feed.stream(last_id), mimetype='text/event-stream')
+    response.call_on_close(change_feed.unsubscribe)
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @app.route('/jobs/add', methods=['GET', 'POST'])
 # @login_required
 @handle_database_errors
 def add_job():
-    from models import Agent, Service, Vehicle, Driver
-    agents = Agent.query.filter_by(status='Active').all()
-    services = Service.query.filter_by(status='Active').all()
-    vehicles = Vehicle.query.filter_by(status='Active').all()
-    drivers = Driver.query.all()
-    
     if request.method == 'POST':
             
             return handle_single_job_creation()
     
     now = datetime.now()
-    return render_template('view_job.html', job=None, agents=agents, services=services, vehicles=vehicles,
-                           drivers=drivers, current_date=now.strftime('%Y-%m-%d'),current_time=now.strftime('%H:%M'))
+    return render_template('view_job.html', job=None, **reference_cache.get_all(),
+                           current_date=now.strftime('%Y-%m-%d'),current_time=now.strftime('%H:%M'))
 
 
 @app.route('/jobs/add_bulk', methods=['GET', 'POST'])
 @login_required
 @handle_database_errors
 def add_bulk_jobs():
-    from models import Agent, Service, Vehicle, Driver
-    agents = Agent.query.filter_by(status='Active').all()
-    services = Service.query.filter_by(status='Active').all()
-    vehicles = Vehicle.query.filter_by(status='Active').all()
-    drivers = Driver.query.all()
-    
     if request.method == 'POST':
         return handle_bulk_job_creation()
     
-    return render_template('bulk_jobs.html', agents=agents, services=services, vehicles=vehicles,
-                           drivers=drivers)
+    return render_template('bulk_jobs.html', **reference_cache.get_all())
 
 
 def handle_single_job_creation():
@@ -547,16 +719,20 @@ def handle_single_job_creation():
             flash('Invalid customer mobile number format', 'error')
             return redirect(request.url)
 
+        # Double-booking: the driver or vehicle may already be on an overlapping job
+        if is_booked(request.form.get('order_status', '').strip()):
+            start, end = job_window(pickup_date, pickup_time, availability.duration)
+            for conflict in conflict_engine.check(driver.id if driver else None, vehicle.id if vehicle else None,
+                                                  start, end):
+                errors[f'{conflict.resource}_id'] = booking_conflict_message(conflict)
+
         # If errors exist, re-render with preserved data and field-level errors
         print("handle single job creation 2 working ")
         if errors:
             print("handle single job creation 3 working ")
             return render_template('view_job.html',
                                    job=None,
-                                   agents=Agent.query.filter_by(status='Active').all(),
-                                   services=Service.query.filter_by(status='Active').all(),
-                                   vehicles=Vehicle.query.filter_by(status='Active').all(),
-                                   drivers=Driver.query.all(),
+                                   **reference_cache.get_all(),
                                    errors=errors,
                                    form_data=form_data)
 
@@ -579,6 +755,7 @@ def handle_single_job_creation():
             type_of_service=service.name if service else request.form.get('type_of_service', '').strip(),
             vehicle_type=vehicle.type if vehicle else request.form.get('vehicle_type', '').strip(),
             vehicle_number=vehicle.number if vehicle else request.form.get('vehicle_number', '').strip(),
+            vehicle_id=vehicle.id if vehicle else None,
             driver_contact=driver.name if driver else request.form.get('driver_contact', '').strip(),
             driver_id=driver.id if driver else None,
             customer_reference=request.form.get('customer_reference', '').strip(),
@@ -623,6 +800,16 @@ def handle_single_job_creation():
         return redirect(request.url)
 
 
+def booking_conflict_message(conflict):
+    """'Driver is already booked on job #12 (20 Jul 09:00-11:00)' for a scheduling Conflict"""
+    if conflict.job_id < 0:
+        where = f'row {-conflict.job_id} of this batch'
+    else:
+        where = f'job #{conflict.job_id}'
+    return (f'{conflict.resource.capitalize()} is already booked on {where} '
+            f'({conflict.starts_at:%d %b %H:%M}-{conflict.ends_at:%H:%M})')
+
+
 def handle_bulk_job_creation():
     """Handle bulk job creation"""
     try:
@@ -687,6 +874,20 @@ def handle_bulk_job_creation():
             flash('No valid jobs to create', 'error')
             return redirect(request.url)
         
+        # Check every row for double-bookings, against existing jobs and each other
+        candidates = []
+        for job_data in jobs:
+            start, end = job_window(job_data['pickup_date'], job_data['pickup_time'], availability.duration)
+            candidates.append({'driver_id': job_data['driver'].id, 'vehicle_id': job_data['vehicle'].id,
+                               'start': start, 'end': end})
+        clashes = False
+        for row_num, conflicts in enumerate(conflict_engine.check_batch(candidates), start=1):
+            for conflict in conflicts:
+                flash(f'Row {row_num}: {booking_conflict_message(conflict)}', 'error')
+                clashes = True
+        if clashes:
+            return redirect(request.url)
+        
         # Create all jobs
         created_jobs = []
         for job_data in jobs:
@@ -710,6 +911,7 @@ def handle_bulk_job_creation():
                 type_of_service=job_data['service'].name,
                 vehicle_type=job_data['vehicle'].type,
                 vehicle_number=job_data['vehicle'].number,
+                vehicle_id=job_data['vehicle'].id,
                 driver_contact=job_data['driver'].name,
                 driver_id=job_data['driver'].id,
                 passenger_name=job_data['passenger_name'],
@@ -747,10 +949,6 @@ def handle_bulk_job_creation():
 @login_required
 def edit_job(job_id):
     from models import Agent, Service, Vehicle, Driver
-    agents = Agent.query.filter_by(status='Active').all()
-    services = Service.query.filter_by(status='Active').all()
-    vehicles = Vehicle.query.filter_by(status='Active').all()
-    drivers = Driver.query.all()
     job = Job.query.get_or_404(job_id)
     stops = json.loads(job.additional_stops) if job.additional_stops else []
     if request.method == 'POST':
@@ -770,6 +968,7 @@ def edit_job(job_id):
         job.type_of_service = service.name if service else request.form.get('type_of_service')
         job.vehicle_type = vehicle.type if vehicle else request.form.get('vehicle_type')
         job.vehicle_number = vehicle.number if vehicle else request.form.get('vehicle_number')
+        job.vehicle_id = vehicle.id if vehicle else None
         job.driver_contact = driver.name if driver else request.form.get('driver_contact')
         job.driver_id = driver.id if driver else None
         job.customer_reference = request.form.get('customer_reference')
@@ -801,10 +1000,19 @@ def edit_job(job_id):
         job.final_price = float(request.form.get('final_price', 0) or 0)
         job.invoice_number = request.form.get('invoice_number', '').strip()
         
+        if is_booked(job.order_status):
+            start, end = job_window(job.pickup_date, job.pickup_time, availability.duration)
+            conflicts = conflict_engine.check(job.driver_id, job.vehicle_id, start, end, exclude_job_id=job.id)
+            if conflicts:
+                # Keep what the user typed and show the clashes on the driver/vehicle fields
+                db.session.rollback()
+                errors = {f'{conflict.resource}_id': booking_conflict_message(conflict) for conflict in conflicts}
+                return render_template('view_job.html', job=job, **reference_cache.get_all(),
+                                       errors=errors, form_data=request.form.to_dict())
+        
         db.session.commit()
         return redirect(url_for('jobs'))
-    return render_template('view_job.html', job=job, agents=agents, services=services, vehicles=vehicles,
-                           drivers=drivers)
+    return render_template('view_job.html', job=job, **reference_cache.get_all())
 
 
 @app.route('/jobs/view/<int:job_id>', methods=['GET'])
@@ -903,6 +1111,7 @@ def update_job_status(job_id):
 
 @app.route('/download-report', methods=['GET'])
 @login_required
+@read_replica
 def download_report():
     # Query all data
     drivers = Driver.query.all()
@@ -1238,6 +1447,7 @@ def parse_job_message(message):
 # DRIVERS CRUD
 @app.route('/drivers')
 @login_required
+@conditional('driver')
 def drivers():
     name = request.args.get('name', '')
     phone = request.args.get('phone', '')
@@ -1305,6 +1515,7 @@ def delete_driver(driver_id):
 # AGENTS CRUD
 @app.route('/agents')
 @login_required
+@conditional('agent')
 def agents():
     name = request.args.get('name', '')
     email = request.args.get('email', '')
@@ -1416,18 +1627,21 @@ def delete_agent(agent_id):
 # BILLING CRUD
 @app.route('/billing')
 @login_required
+@read_replica
 def billing():
     billings = Billing.query.all()
-    return render_template('billing.html', billings=billings)
+    # Billing rows show their job, agent and service, so their cached fragments depend on those tables too
+    related_versions = tuple(sorted(table_versions.get(('job', 'agent', 'service')).items()))
+    return render_template('billing.html', billings=billings, related_versions=related_versions)
 
 
 @app.route('/billing/add', methods=['GET', 'POST'])
 @login_required
 def add_billing():
     from models import Job
-    jobs = Job.query.all()
     
     if request.method == 'POST':
+        job = None
         try:
             # Get the selected job
             job_id = request.form['job_id']
@@ -1435,7 +1649,7 @@ def add_billing():
             
             if not job:
                 flash('Selected job not found', 'error')
-                return render_template('billing_form.html', action='Add', jobs=jobs)
+                return render_template('billing_form.html', action='Add', selected_job=None)
             
             # Create billing record with all the new fields
             base_price = job.base_price or 0
@@ -1474,9 +1688,9 @@ def add_billing():
         except Exception as e:
             db.session.rollback()
             flash(f'Error creating billing record: {str(e)}', 'error')
-            return render_template('billing_form.html', action='Add', jobs=jobs)
+            return render_template('billing_form.html', action='Add', selected_job=job)
     
-    return render_template('billing_form.html', action='Add', jobs=jobs)
+    return render_template('billing_form.html', action='Add', selected_job=None)
 
 
 @app.route('/billing/edit/<int:billing_id>', methods=['GET', 'POST'])
@@ -1484,7 +1698,6 @@ def add_billing():
 def edit_billing(billing_id):
     from models import Job
     billing = Billing.query.get_or_404(billing_id)
-    jobs = Job.query.all()
     
     if request.method == 'POST':
         try:
@@ -1494,7 +1707,7 @@ def edit_billing(billing_id):
             
             if not job:
                 flash('Selected job not found', 'error')
-                return render_template('billing_form.html', action='Edit', billing=billing, jobs=jobs)
+                return render_template('billing_form.html', action='Edit', billing=billing, selected_job=billing.job)
             
             # Update billing record with all the new fields
             base_price = job.base_price or 0
@@ -1530,9 +1743,30 @@ def edit_billing(billing_id):
         except Exception as e:
             db.session.rollback()
             flash(f'Error updating billing record: {str(e)}', 'error')
-            return render_template('billing_form.html', action='Edit', billing=billing, jobs=jobs)
+            return render_template('billing_form.html', action='Edit', billing=billing, selected_job=billing.job)
     
-    return render_template('billing_form.html', action='Edit', billing=billing, jobs=jobs)
+    return render_template('billing_form.html', action='Edit', billing=billing, selected_job=billing.job)
+
+
+@app.route('/api/billing/jobs', methods=['GET'])
+@login_required
+@read_replica
+def billing_job_typeahead():
+    """Job picker for the billing form: newest jobs matching the typed id, customer or location"""
+    q = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', 20, type=int), 50)
+    query = Job.query
+    if q.isdigit():
+        query = query.filter(Job.id == int(q))
+    elif q:
+        query = query.filter(
+            (Job.customer_name.ilike(f'%{q}%')) |
+            (Job.passenger_name.ilike(f'%{q}%')) |
+            (Job.pickup_location.ilike(f'%{q}%')) |
+            (Job.dropoff_location.ilike(f'%{q}%'))
+        )
+    jobs = query.order_by(Job.id.desc()).limit(limit).all()
+    return jsonify({'jobs': [format_billing_job_option(job) for job in jobs]})
 
 
 @app.route('/billing/delete/<int:billing_id>', methods=['POST'])
@@ -1589,6 +1823,7 @@ def delete_discount(discount_id):
 # SERVICES CRUD
 @app.route('/services')
 @login_required
+@conditional('service')
 def services():
     name = request.args.get('name', '')
     status = request.args.get('status', '')
@@ -1663,6 +1898,7 @@ def add_service_ajax():
 # VEHICLES CRUD
 @app.route('/vehicles')
 @login_required
+@conditional('vehicle')
 def vehicles():
     name = request.args.get('name', '')
     number = request.args.get('number', '')
@@ -1762,7 +1998,20 @@ def add_driver_ajax():
     return jsonify({'success': True, 'id': driver.id, 'name': f'{driver.name} ({driver.phone})'})
 
 
+# URL name -> services.autocomplete index
+AUTOCOMPLETE_KINDS = {
+    'location': 'location',
+    'pickup_location': 'location',
+    'dropoff_location': 'location',
+    'customer': 'customer',
+    'customer_name': 'customer',
+    'passenger': 'passenger',
+    'passenger_name': 'passenger',
+}
+
+
 @app.route('/api/calculate_pricing', methods=['POST'])
+@limiter.limit(policy('RATELIMIT_PRICING'), key_func=user_or_address)
 @login_required
 def calculate_pricing():
     """Calculate pricing for a service and agent combination"""
@@ -1819,6 +2068,125 @@ def calculate_pricing():
         app.logger.error(f'Error calculating pricing: {str(e)}')
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/autocomplete/<kind>', methods=['GET'])
+@login_required
+@read_replica
+def autocomplete_api(kind):
+    """Prefix suggestions for pickup/dropoff locations, customer and passenger names"""
+    if kind not in AUTOCOMPLETE_KINDS:
+        return jsonify({'success': False, 'error': 'Unknown autocomplete field'}), 404
+    q = request.args.get('q', '')
+    limit = min(request.args.get('limit', 10, type=int), 25)
+    suggestions = autocomplete.suggest(AUTOCOMPLETE_KINDS[kind], q, limit)
+    return jsonify({'suggestions': [{'value': value, 'count': count} for value, count in suggestions]})
+
+@app.route('/api/availability', methods=['GET'])
+@login_required
+@read_replica
+def availability_api():
+    """Drivers and vehicles free between start and end (ISO datetimes), or right now if omitted"""
+    start = request.args.get('start')
+    end = request.args.get('end')
+    try:
+        start = datetime.fromisoformat(start) if start else None
+        end = datetime.fromisoformat(end) if end else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'start and end must be ISO dates or datetimes'}), 400
+    if (start is None) != (end is None) or (start and start >= end):
+        return jsonify({'success': False, 'error': 'Give both start and end, with start before end'}), 400
+    drivers = availability.free_drivers(start, end).order_by(Driver.name).all()
+    vehicles = availability.free_vehicles(start, end).filter(Vehicle.status == 'Active').order_by(Vehicle.number).all()
+    return jsonify({
+        'success': True,
+        'drivers': [format_driver(driver) for driver in drivers],
+        'vehicles': [format_vehicle(vehicle) for vehicle in vehicles]
+    })
+
+@app.route('/api/schedule/conflicts', methods=['GET'])
+@login_required
+@read_replica
+def schedule_conflicts_api():
+    """Drivers and vehicles with overlapping bookings on a date (default today)"""
+    try:
+        day = datetime.strptime(request.args.get('date') or date.today().isoformat(), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'success': False, 'error': 'date must be YYYY-MM-DD'}), 400
+    report = conflict_engine.report(day)
+    driver_ids = {resource_id for resource, resource_id, _ in report if resource == 'driver'}
+    vehicle_ids = {resource_id for resource, resource_id, _ in report if resource == 'vehicle'}
+    names = {('driver', d.id): d.name for d in Driver.query.filter(Driver.id.in_(driver_ids))}
+    names.update({('vehicle', v.id): v.number for v in Vehicle.query.filter(Vehicle.id.in_(vehicle_ids))})
+    return jsonify({
+        'success': True,
+        'date': day.isoformat(),
+        'conflicts': [{
+            'resource': resource,
+            'resource_id': resource_id,
+            'name': names.get((resource, resource_id)),
+            'bookings': [{'job_id': b.job_id, 'starts_at': b.start.isoformat(), 'ends_at': b.end.isoformat()}
+                         for b in bookings]
+        } for resource, resource_id, bookings in report]
+    })
+
+@app.route('/api/dispatch/proposal', methods=['GET'])
+@login_required
+@read_replica
+def dispatch_proposal_api():
+    """Proposed drivers and vehicles for the unassigned jobs on a date (default today), for review"""
+    try:
+        day = datetime.strptime(request.args.get('date') or date.today().isoformat(), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'success': False, 'error': 'date must be YYYY-MM-DD'}), 400
+    proposal = dispatch.plan(day)
+    drivers = {d.id: d.name for d in Driver.query.filter(Driver.id.in_({a.driver_id for a in proposal.assignments}))}
+    vehicles = {v.id: v.number for v in Vehicle.query.filter(Vehicle.id.in_({a.vehicle_id for a in proposal.assignments}))}
+    return jsonify({
+        'success': True,
+        'date': day.isoformat(),
+        'assignments': [{
+            'job_id': a.job_id,
+            'driver_id': a.driver_id,
+            'driver_name': drivers.get(a.driver_id),
+            'vehicle_id': a.vehicle_id,
+            'vehicle_number': vehicles.get(a.vehicle_id),
+            'starts_at': a.starts_at.isoformat(),
+            'ends_at': a.ends_at.isoformat()
+        } for a in proposal.assignments],
+        'unassigned': [{'job_id': u.job_id, 'reason': u.reason} for u in proposal.unassigned]
+    })
+
+@app.route('/api/dispatch/apply', methods=['POST'])
+@login_required
+def dispatch_apply_api():
+    """Apply a reviewed proposal: {"assignments": [{"job_id", "driver_id", "vehicle_id"}, ...]}"""
+    data = request.get_json(silent=True) or {}
+    try:
+        errors = dispatch.apply(data.get('assignments') or [])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Each assignment needs a job_id, driver_id and vehicle_id'}), 400
+    if errors:
+        return jsonify({'success': False, 'error': 'The proposal is out of date; review it again', 'errors': errors}), 409
+    return jsonify({'success': True, 'applied': len(data['assignments'])})
+
+@app.route('/api/travel-time', methods=['GET', 'POST'])
+@login_required
+def travel_time_api():
+    """Estimated minutes between locations: ?from=...&to=..., or POST {"pairs": [[from, to], ...]}"""
+    if request.method == 'POST':
+        body = request.get_json(silent=True)
+        pairs = body.get('pairs', []) if isinstance(body, dict) else None
+        if not isinstance(pairs, list) or not all(
+                isinstance(pair, list) and len(pair) == 2 and all(isinstance(location, str) for location in pair)
+                for pair in pairs):
+            return jsonify({'success': False, 'error': 'pairs must be a list of [from, to] locations'}), 400
+    else:
+        pairs = [[request.args.get('from', ''), request.args.get('to', '')]]
+    minutes = travel_times.estimate_many([p[0] for p in pairs], [p[1] for p in pairs])
+    return jsonify({
+        'success': True,
+        'minutes': [None if m != m else round(float(m), 1) for m in minutes]
+    })
+
 @app.route('/api/invoice/<int:billing_id>', methods=['GET'])
 @login_required
 def get_invoice(billing_id):
@@ -1868,6 +2236,7 @@ def download_invoice_pdf(billing_id):
 
 @app.route('/api/billing/report/pdf', methods=['GET'])
 @login_required
+@read_replica
 def generate_billing_report_pdf():
     """Generate PDF report of all invoices"""
     try:
@@ -1897,20 +2266,45 @@ def generate_billing_report_pdf():
 import api_routes
 
 # Chat API Routes
+# /api/chat and /api/chat/stream draw on one budget per user
+chat_limit = limiter.shared_limit(policy('RATELIMIT_CHAT'), scope='chat', key_func=user_or_address)
+
+INVALID_CHAT_CURSOR = 'cursor must be the id of the last row shown'
+
+def chat_request_cursor(data):
+    """The cursor of a chat request as a row id, None for a first page; ValueError when it is neither"""
+    cursor = data.get('cursor')
+    if cursor is None:
+        return None
+    if isinstance(cursor, int) and not isinstance(cursor, bool) and cursor >= 0:
+        return cursor
+    if isinstance(cursor, str) and cursor.isascii() and cursor.isdigit():
+        return int(cursor)
+    raise ValueError(INVALID_CHAT_CURSOR)
+
 @app.route('/api/chat', methods=['POST'])
+@chat_limit
 @login_required
 @csrf.exempt
+@read_replica
 def chat_api():
+    data = request.get_json(silent=True) or {}
+    try:
+        cursor = chat_request_cursor(data)
+    except ValueError:
+        return jsonify({'response': INVALID_CHAT_CURSOR, 'data': None}), 400
     try:
-        data = request.get_json()
         message = data.get('message', '').lower().strip()
         
         # Parse the message and generate response
-        response, data = parse_chat_message(message)
+        response, data, page = parse_chat_message(message, cursor=cursor)
         
         return jsonify({
             'response': response,
-            'data': data
+            'data': data,
+            'total': page['total'] if page else None,
+            'next_cursor': page['next_cursor'] if page else None,
+            'export_token': make_chat_export_token(message) if page else None
         })
         
     except Exception as e:
@@ -1919,214 +2313,368 @@ def chat_api():
             'data': None
         }), 500
 
-@app.route('/api/chat/download', methods=['POST'])
+CHAT_STREAM_PAGE_SIZE = 500
+CHAT_STREAM_BATCH_SIZE = 50
+
+def sse_event(event, payload):
+    return f'event: {event}\ndata: {json.dumps(payload)}\n\n'
+
+@app.route('/api/chat/stream', methods=['POST'])
+@chat_limit
 @login_required
 @csrf.exempt
-def chat_download():
+def chat_stream():
+    """Server-Sent Events variant of /api/chat.
+
+    Sends a "message" event with the answer text as soon as the total is known,
+    then "rows" events of CHAT_STREAM_BATCH_SIZE formatted rows as they are
+    read from the database cursor, and a final "done" event with next_cursor.
+    """
+    data = request.get_json() or {}
+    message = data.get('message', '').lower().strip()
     try:
-        data = request.get_json()
-        query = data.get('query', '')
-        table_data = data.get('data', [])
-        
-        if not table_data:
-            return jsonify({'error': 'No data to download'}), 400
-        
-        # Create CSV content
-        import csv
-        import io
-        
-        output = io.StringIO()
-        if table_data:
-            writer = csv.DictWriter(output, fieldnames=table_data[0].keys())
-            writer.writeheader()
-            writer.writerows(table_data)
-        
-        csv_content = output.getvalue()
-        output.close()
-        
-        # Create response
-        response = make_response(csv_content)
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = f'attachment; filename="{query.replace(" ", "_")}_{datetime.now().strftime("%Y%m%d")}.csv"'
-        
-        return response
-        
-    except Exception as e:
-        return jsonify({'error': f'Download error: {str(e)}'}), 500
-
-def parse_chat_message(message):
-    """Parse chat message and return appropriate response and data"""
-    
-    # Jobs queries
-    if re.search(r'\b(all\s+)?jobs?\b', message):
-        return handle_jobs_query(message)
-    
-    # Driver queries
-    elif re.search(r'\bdrivers?\b', message):
-        return handle_drivers_query(message)
+        cursor = chat_request_cursor(data)
+    except ValueError:
+        return jsonify({'response': INVALID_CHAT_CURSOR}), 400
     
-    # Vehicle queries
-    elif re.search(r'\bvehicles?\b', message):
-        return handle_vehicles_query(message)
-    
-    # Agent queries
-    elif re.search(r'\bagents?\b', message):
-        return handle_agents_query(message)
-    
-    # Service queries
-    elif re.search(r'\bservices?\b', message):
-        return handle_services_query(message)
-    
-    # Billing queries
-    elif re.search(r'\bbilling?\b', message):
-        return handle_billing_query(message)
+    def generate():
+        # The generator outlives the view, so route its reads here rather than with @read_replica
+        with use_replica():
+            try:
+                result = plan_chat_message(message, cursor)
+                if not isinstance(result, ChatListing):
+                    yield sse_event('message', {'response': result[0], 'total': None})
+                    if result[1]:
+                        yield sse_event('rows', result[1])
+                    yield sse_event('done', {'next_cursor': None, 'total': None})
+                    return
+                
+                total = chat_listing_total(result)
+                page_size = min(result.slots.get('limit', CHAT_STREAM_PAGE_SIZE), CHAT_STREAM_PAGE_SIZE)
+                if total is None:
+                    text = f"Here are more {result.label}:"
+                elif total > page_size:
+                    text = f"I found {total} {result.label}, showing the first {page_size}:"
+                else:
+                    text = f"I found {total} {result.label}:"
+                yield sse_event('message', {'response': text, 'total': total,
+                                            'export_token': make_chat_export_token(message)})
+                
+                batch = []
+                sent = 0
+                next_cursor = None
+                for row in chat_listing_rows(result, page_size).yield_per(CHAT_STREAM_BATCH_SIZE):
+                    if sent == page_size:
+                        # The extra row only tells us there is another page
+                        next_cursor = last_id
+                        break
+                    batch.append(result.formatter(row))
+                    last_id = row.id
+                    sent += 1
+                    if len(batch) == CHAT_STREAM_BATCH_SIZE:
+                        yield sse_event('rows', batch)
+                        batch = []
+                if batch:
+                    yield sse_event('rows', batch)
+                yield sse_event('done', {'next_cursor': next_cursor, 'total': total})
+            except Exception as e:
+                app.logger.error(f'Chat stream error: {str(e)}')
+                yield sse_event('error', {'response': str(e)})
     
-    # Payment queries
-    elif re.search(r'\bpayment\b', message):
-        return handle_payment_query(message)
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+CHAT_EXPORT_BATCH_SIZE = 500
+
+def chat_export_serializer():
+    return URLSafeTimedSerializer(app.config['SECRET_KEY'], salt='chat-export')
+
+def make_chat_export_token(message):
+    """Signed token naming the query behind a chat answer, so the download can re-run it"""
+    return chat_export_serializer().dumps({'message': message, 'user_id': current_user.get_id()})
+
+def iter_chat_listing(listing):
+    """Every row matching the listing, formatted, read from the cursor in batches"""
+    model = listing.model
+    query = listing.query.order_by(model.id.desc() if listing.descending else model.id.asc())
+    for row in query.yield_per(CHAT_EXPORT_BATCH_SIZE):
+        yield listing.formatter(row)
+
+@app.route('/api/chat/download', methods=['GET'])
+@login_required
+def chat_download():
+    """Export all rows of a chat answer as CSV or XLSX, re-running its query from the signed token"""
+    try:
+        payload = chat_export_serializer().loads(
+            request.args.get('token', ''), max_age=app.config.get('CHAT_EXPORT_TOKEN_MAX_AGE', 3600))
+    except BadSignature:
+        return jsonify({'error': 'Download link is invalid or has expired'}), 400
+    if payload.get('user_id') != current_user.get_id():
+        return jsonify({'error': 'Download link is invalid or has expired'}), 400
     
-    # Status queries
-    elif re.search(r'\bstatus\b', message):
-        return handle_status_query(message)
+    message = payload['message']
+    export_format = request.args.get('format', 'csv')
+    with use_replica():
+        listing = plan_chat_message(message)
+    if not isinstance(listing, ChatListing):
+        return jsonify({'error': 'No data to download'}), 400
+    filename = re.sub(r'[^\w-]+', '_', message) + datetime.now().strftime('_%Y%m%d')
     
-    # Dashboard/Summary queries
-    elif re.search(r'\b(dashboard|summary|overview)\b', message):
-        return handle_dashboard_query(message)
+    if export_format == 'xlsx':
+        # write_only workbooks stream rows to disk instead of building the sheet in memory
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet('Results')
+        with use_replica():
+            for i, row in enumerate(iter_chat_listing(listing)):
+                if i == 0:
+                    sheet.append(list(row))
+                sheet.append(list(row.values()))
+        output = tempfile.TemporaryFile()
+        workbook.save(output)
+        output.seek(0)
+        return send_file(output, as_attachment=True, download_name=f'{filename}.xlsx',
+                         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     
-    # Help
-    elif re.search(r'\b(help|what can you do)\b', message):
-        return handle_help_query(message)
+    def generate_csv():
+        with use_replica():
+            buffer = io.StringIO()
+            writer = None
+            for row in iter_chat_listing(listing):
+                if writer is None:
+                    writer = csv.DictWriter(buffer, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+                if buffer.tell() >= 64 * 1024:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
     
-    else:
+    response = Response(stream_with_context(generate_csv()), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+def parse_chat_message(message, cursor=None):
+    """Parse chat message and return appropriate response, data and page info"""
+    result = plan_chat_message(message, cursor)
+    if not isinstance(result, ChatListing):
+        return result[0], result[1], None
+    rows, page = paginate_chat_query(result, result.slots)
+    return chat_page_message(result.label, rows, page), [result.formatter(row) for row in rows], page
+
+def plan_chat_message(message, cursor=None):
+    """Route a message to its handler; list answers come back as an unexecuted ChatListing"""
+    intent = chat_intents.parse(message)
+    handler = CHAT_HANDLERS.get(intent.name)
+    if handler is None:
         return "I'm not sure what you're asking for. Try asking about jobs, drivers, vehicles, agents, services, or payment status.", None
+    return handler(dict(intent.slots, cursor=cursor))
+
+# A list answer before it runs: the filtered query plus how to order, count and format it
+ChatListing = namedtuple('ChatListing', 'label query model formatter descending total slots')
+
+# Order status slot -> Job.order_status values
+JOB_STATUS_FILTERS = {
+    'active': ['New', 'In Progress'],
+    'new': ['New'],
+    'in_progress': ['In Progress'],
+    'pending': ['Pending'],
+    'completed': ['Completed'],
+    'cancelled': ['Cancelled'],
+}
 
-def handle_jobs_query(message):
+CHAT_PAGE_SIZE = 10
+CHAT_MAX_PAGE_SIZE = 100
+
+def chat_listing_total(listing):
+    """Number of rows matching the listing (not counted again on later pages)"""
+    if listing.total is not None or listing.slots.get('cursor') is not None:
+        return listing.total
+    return listing.query.order_by(None).count()
+
+def chat_listing_rows(listing, page_size):
+    """Keyset-ordered query for one page of the listing, plus one extra row to detect a next page"""
+    model = listing.model
+    query = listing.query
+    cursor = listing.slots.get('cursor')
+    if cursor is not None:
+        query = query.filter(model.id < cursor if listing.descending else model.id > cursor)
+    return query.order_by(model.id.desc() if listing.descending else model.id.asc()).limit(page_size + 1)
+
+def paginate_chat_query(listing, slots, max_page_size=CHAT_MAX_PAGE_SIZE, default_page_size=CHAT_PAGE_SIZE):
+    """Return one keyset page of listing as (rows, page) where page holds total and next_cursor.
+
+    The cursor is the id of the last row already shown, so later pages seek
+    past it instead of using OFFSET. The total is only counted for the first
+    page; the client keeps it while paging.
+    """
+    total = chat_listing_total(listing)
+    page_size = min(slots.get('limit', default_page_size), max_page_size)
+    rows = chat_listing_rows(listing, page_size).all()
+    next_cursor = rows[page_size - 1].id if len(rows) > page_size else None
+    return rows[:page_size], {'total': total, 'next_cursor': next_cursor}
+
+def chat_page_message(label, rows, page):
+    """"I found 4000 active jobs, showing the first 10:" style summary line"""
+    if page['total'] is None:
+        return f"Here are {len(rows)} more {label}:"
+    if page['total'] > len(rows):
+        return f"I found {page['total']} {label}, showing the first {len(rows)}:"
+    return f"I found {page['total']} {label}:"
+
+def handle_jobs_query(slots):
     """Handle job-related queries"""
     
-    if re.search(r'\bactive\b', message):
-        jobs = Job.query.filter(Job.order_status.in_(['New', 'In Progress'])).limit(10).all()
-        return f"I found {len(jobs)} active jobs:", [format_job(job) for job in jobs]
-    
-    elif re.search(r'\bpending\b', message):
-        jobs = Job.query.filter(Job.order_status == 'Pending').limit(10).all()
-        return f"I found {len(jobs)} pending jobs:", [format_job(job) for job in jobs]
-    
-    elif re.search(r'\bcompleted\b', message):
-        jobs = Job.query.filter(Job.order_status == 'Completed').limit(10).all()
-        return f"I found {len(jobs)} completed jobs:", [format_job(job) for job in jobs]
-    
-    elif re.search(r'\bcancelled\b', message):
-        jobs = Job.query.filter(Job.order_status == 'Cancelled').limit(10).all()
-        return f"I found {len(jobs)} cancelled jobs:", [format_job(job) for job in jobs]
+    query = Job.query
+    label = 'jobs'
+    total = None
+    status = slots.get('status')
+    payment = slots.get('payment')
+    if status:
+        query = query.filter(Job.order_status.in_(JOB_STATUS_FILTERS[status]))
+        label = f"{status.replace('_', ' ')} {label}"
+    if payment:
+        # "unpaid completed jobs": both filters apply
+        query = query.filter(Job.payment_status == payment.capitalize())
+        label = f'{payment} {label}'
     
-    elif re.search(r'\bunpaid\b', message):
-        jobs = Job.query.filter(Job.payment_status == 'Unpaid').limit(10).all()
-        return f"I found {len(jobs)} unpaid jobs:", [format_job(job) for job in jobs]
+    date_range = slots.get('date_range')
+    agent_name = slots.get('agent_name')
+    driver_name = slots.get('driver_name')
+    if date_range:
+        query = query.filter(Job.pickup_date.between(date_range[1], date_range[2]))
+        label += f" {date_range[0].replace('_', ' ')}"
+    if agent_name:
+        query = query.filter(Job.agent_id.in_(db.select(Agent.id).where(Agent.name.icontains(agent_name, autoescape=True))))
+        label += f' for agent "{agent_name}"'
+    if driver_name:
+        query = query.filter(Job.driver_id.in_(db.select(Driver.id).where(Driver.name.icontains(driver_name, autoescape=True))))
+        label += f' for driver "{driver_name}"'
     
-    elif re.search(r'\bpaid\b', message):
-        jobs = Job.query.filter(Job.payment_status == 'Paid').limit(10).all()
-        return f"I found {len(jobs)} paid jobs:", [format_job(job) for job in jobs]
+    if not (date_range or agent_name or driver_name or (status and payment)) and slots.get('cursor') is None:
+        # A single status or payment filter is answered from the cached summary counts;
+        # the summary has no count for both at once, so those are counted by the query
+        summary = chat_summary.get()
+        if status:
+            total = sum(summary.by_order_status[value] for value in JOB_STATUS_FILTERS[status])
+        elif payment:
+            total = summary.by_payment_status[payment.capitalize()]
+        else:
+            total = summary.total_jobs
     
-    else:
-        # All jobs
-        jobs = Job.query.order_by(Job.id.desc()).limit(10).all()
-        return f"I found {len(jobs)} recent jobs:", [format_job(job) for job in jobs]
-
-def handle_drivers_query(message):
+    return ChatListing(label, query, Job, format_job, True, total, slots)
+
+def chat_availability_window(slots):
+    """(start, end) datetimes covering the date_range slot, or (None, None) for right now"""
+    date_range = slots.get('date_range')
+    if not date_range:
+        return None, None
+    start = datetime.strptime(date_range[1], '%Y-%m-%d')
+    end = datetime.strptime(date_range[2], '%Y-%m-%d') + timedelta(days=1)
+    return start, end
+
+def handle_drivers_query(slots):
     """Handle driver-related queries"""
     
-    if re.search(r'\bavailable\b', message):
-        # Drivers not assigned to active jobs
-        active_driver_ids = db.session.query(Job.driver_id).filter(
-            Job.order_status.in_(['New', 'In Progress'])
-        ).distinct().all()
-        active_ids = [id[0] for id in active_driver_ids if id[0]]
-        
-        drivers = Driver.query.filter(~Driver.id.in_(active_ids)).all()
-        return f"I found {len(drivers)} available drivers:", [format_driver(driver) for driver in drivers]
+    query = Driver.query
+    label = 'drivers'
+    if slots.get('available'):
+        # Drivers not booked on an active job (in the requested dates, if any)
+        query = availability.free_drivers(*chat_availability_window(slots))
+        label = 'available drivers'
+        if slots.get('date_range'):
+            label += f" {slots['date_range'][0].replace('_', ' ')}"
+    if slots.get('driver_name'):
+        query = query.filter(Driver.name.icontains(slots['driver_name'], autoescape=True))
+        label += f' named "{slots["driver_name"]}"'
     
-    else:
-        drivers = Driver.query.limit(10).all()
-        return f"I found {len(drivers)} drivers:", [format_driver(driver) for driver in drivers]
+    return ChatListing(label, query, Driver, format_driver, False, None, slots)
 
-def handle_vehicles_query(message):
+def handle_vehicles_query(slots):
     """Handle vehicle-related queries"""
     
-    if re.search(r'\bavailable\b', message):
-        # Get vehicles that are not currently assigned to active jobs
-        # Since Job model doesn't have vehicle_id, we'll check by vehicle number
-        active_jobs = Job.query.filter(Job.order_status.in_(['New', 'In Progress'])).all()
-        active_vehicle_numbers = [job.vehicle_number for job in active_jobs if job.vehicle_number]
-        
-        # Get vehicles not in active jobs
-        available_vehicles = Vehicle.query.filter(~Vehicle.number.in_(active_vehicle_numbers)).all()
-        return f"I found {len(available_vehicles)} available vehicles:", [format_vehicle(vehicle) for vehicle in available_vehicles]
+    query = Vehicle.query
+    label = 'vehicles'
+    if slots.get('available'):
+        # Vehicles not booked on an active job (in the requested dates, if any)
+        query = availability.free_vehicles(*chat_availability_window(slots))
+        label = 'available vehicles'
+        if slots.get('date_range'):
+            label += f" {slots['date_range'][0].replace('_', ' ')}"
     
-    else:
-        vehicles = Vehicle.query.limit(10).all()
-        return f"I found {len(vehicles)} vehicles:", [format_vehicle(vehicle) for vehicle in vehicles]
+    return ChatListing(label, query, Vehicle, format_vehicle, False, None, slots)
 
-def handle_agents_query(message):
+def handle_agents_query(slots):
     """Handle agent-related queries"""
-    agents = Agent.query.limit(10).all()
-    return f"I found {len(agents)} agents:", [format_agent(agent) for agent in agents]
+    query = Agent.query
+    label = 'agents'
+    if slots.get('agent_name'):
+        query = query.filter(Agent.name.icontains(slots['agent_name'], autoescape=True))
+        label += f' named "{slots["agent_name"]}"'
+    return ChatListing(label, query, Agent, format_agent, False, None, slots)
 
-def handle_services_query(message):
+def handle_services_query(slots):
     """Handle service-related queries"""
-    services = Service.query.limit(10).all()
-    return f"I found {len(services)} services:", [format_service(service) for service in services]
+    return ChatListing('services', Service.query, Service, format_service, False, None, slots)
 
-def handle_billing_query(message):
+def handle_billing_query(slots):
     """Handle billing-related queries"""
-    billings = Billing.query.limit(10).all()
-    return f"I found {len(billings)} billing records:", [format_billing(billing) for billing in billings]
-
-def handle_payment_query(message):
+    query = Billing.query
+    label = 'billing records'
+    if slots.get('payment'):
+        # Invoices are Pending or Overdue until paid
+        paid = Billing.payment_status == 'Paid'
+        query = query.filter(paid if slots['payment'] == 'paid' else ~paid)
+        label = f"{slots['payment']} {label}"
+    return ChatListing(label, query, Billing, format_billing, True, None, slots)
+
+def handle_payment_query(slots):
     """Handle payment-related queries"""
     
-    if re.search(r'\bunpaid\b', message):
-        jobs = Job.query.filter(Job.payment_status == 'Unpaid').limit(10).all()
-        return f"I found {len(jobs)} unpaid jobs:", [format_job(job) for job in jobs]
-    
-    elif re.search(r'\bpaid\b', message):
-        jobs = Job.query.filter(Job.payment_status == 'Paid').limit(10).all()
-        return f"I found {len(jobs)} paid jobs:", [format_job(job) for job in jobs]
+    if slots.get('payment') or slots.get('cursor') is not None:
+        return handle_jobs_query(slots)
     
     else:
         # Payment summary
-        total_jobs = Job.query.count()
-        paid_jobs = Job.query.filter(Job.payment_status == 'Paid').count()
-        unpaid_jobs = Job.query.filter(Job.payment_status == 'Unpaid').count()
+        summary = chat_summary.get()
+        total_jobs = summary.total_jobs
+        paid_jobs = summary.by_payment_status['Paid']
+        unpaid_jobs = summary.by_payment_status['Unpaid']
         
         return f"Payment Summary:\n- Total Jobs: {total_jobs}\n- Paid: {paid_jobs}\n- Unpaid: {unpaid_jobs}", None
 
-def handle_status_query(message):
+def handle_status_query(slots):
     """Handle status-related queries"""
     
     # Job status summary
-    new_jobs = Job.query.filter(Job.order_status == 'New').count()
-    in_progress_jobs = Job.query.filter(Job.order_status == 'In Progress').count()
-    completed_jobs = Job.query.filter(Job.order_status == 'Completed').count()
-    cancelled_jobs = Job.query.filter(Job.order_status == 'Cancelled').count()
+    by_status = chat_summary.get().by_order_status
+    new_jobs = by_status['New']
+    in_progress_jobs = by_status['In Progress']
+    completed_jobs = by_status['Completed']
+    cancelled_jobs = by_status['Cancelled']
     
     return f"Job Status Summary:\n- New: {new_jobs}\n- In Progress: {in_progress_jobs}\n- Completed: {completed_jobs}\n- Cancelled: {cancelled_jobs}", None
 
-def handle_dashboard_query(message):
+def handle_dashboard_query(slots):
     """Handle dashboard/summary queries"""
     
     # Overall summary
-    total_jobs = Job.query.count()
-    total_drivers = Driver.query.count()
-    total_vehicles = Vehicle.query.count()
-    total_agents = Agent.query.count()
+    summary = chat_summary.get()
+    total_jobs = summary.total_jobs
+    total_drivers = summary.total_drivers
+    total_vehicles = summary.total_vehicles
+    total_agents = summary.total_agents
     
-    active_jobs = Job.query.filter(Job.order_status.in_(['New', 'In Progress'])).count()
-    completed_jobs = Job.query.filter(Job.order_status == 'Completed').count()
-    unpaid_jobs = Job.query.filter(Job.payment_status == 'Unpaid').count()
+    active_jobs = summary.active_jobs
+    completed_jobs = summary.by_order_status['Completed']
+    unpaid_jobs = summary.by_payment_status['Unpaid']
     
     return f"Fleet Dashboard Summary:\n- Total Jobs: {total_jobs}\n- Active Jobs: {active_jobs}\n- Completed Jobs: {completed_jobs}\n- Unpaid Jobs: {unpaid_jobs}\n- Total Drivers: {total_drivers}\n- Total Vehicles: {total_vehicles}\n- Total Agents: {total_agents}", None
 
-def handle_help_query(message):
+def handle_help_query(slots):
     """Handle help queries"""
     return """I can help you with the following queries:
 
@@ -2136,6 +2684,9 @@ def handle_help_query(message):
 - "Pending jobs"
 - "Completed jobs"
 - "Unpaid jobs"
+- "Completed jobs this week"
+- "Jobs for agent Acme last month"
+- "Top 20 jobs by driver John"
 
 **Drivers:**
 - "All drivers"
@@ -2152,6 +2703,19 @@ def handle_help_query(message):
 
 Try asking me about any of these topics!""", None
 
+CHAT_HANDLERS = {
+    'jobs': handle_jobs_query,
+    'drivers': handle_drivers_query,
+    'vehicles': handle_vehicles_query,
+    'agents': handle_agents_query,
+    'services': handle_services_query,
+    'billing': handle_billing_query,
+    'payment': handle_payment_query,
+    'status': handle_status_query,
+    'dashboard': handle_dashboard_query,
+    'help': handle_help_query,
+}
+
 # Data formatting functions
 def format_job(job):
     return {
@@ -2200,6 +2764,24 @@ def format_service(service):
         'status': service.status
     }
 
+def format_billing_job_option(job):
+    return {
+        'id': job.id,
+        'label': f'Job #{job.id} - {job.customer_name} ({job.pickup_location} → {job.dropoff_location})',
+        'base_price': job.base_price or 0,
+        'base_discount_percent': job.base_discount_percent or 0,
+        'agent_discount_percent': job.agent_discount_percent or 0,
+        'additional_discount_percent': job.additional_discount_percent or 0,
+        'additional_charges': job.additional_charges or 0,
+        'final_price': job.final_price or 0,
+        'agent': job.agent.name if job.agent else 'N/A',
+        'service': job.service.name if job.service else job.type_of_service,
+        'pickup': job.pickup_location,
+        'dropoff': job.dropoff_location,
+        'date': job.pickup_date,
+        'time': job.pickup_time
+    }
+
 def format_billing(billing):
     return {
         'id': billing.id,
@@ -2247,15 +2829,114 @@ def create_admin(username, email, password):
     click.echo(f'Admin user {username} created successfully.')
 
 
+@app.cli.command('sqlite-checkpoint')
+@click.option('--mode', default='TRUNCATE', type=click.Choice(['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'], case_sensitive=False),
+              help='TRUNCATE also shrinks the -wal file; PASSIVE never blocks.')
+@with_appcontext
+def sqlite_checkpoint(mode):
+    """Checkpoint the SQLite WAL (run from cron, e.g. nightly with TRUNCATE)."""
+    for bind_key, engine in db.engines.items():
+        if not sqlite_tuning.is_file_sqlite(engine):
+            continue
+        busy, wal_pages, done = sqlite_tuning.checkpoint(engine, mode)
+        name = bind_key or 'default'
+        click.echo(f'{name}: mode={mode.upper()} busy={busy} wal_pages={wal_pages} checkpointed={done}')
+
+
+@app.cli.command('rebuild-assignments')
+@with_appcontext
+def rebuild_assignments():
+    """Recreate the job_assignment availability table from the jobs table."""
+    count = availability.rebuild()
+    click.echo(f'Rebuilt {count} driver/vehicle assignments.')
+
+
+@app.cli.command('dispatch')
+@click.option('--date', 'day', default=None, help='Pickup date as YYYY-MM-DD (default today).')
+@click.option('--apply', 'apply_', is_flag=True, help='Write the proposal instead of only printing it.')
+@with_appcontext
+def dispatch_jobs(day, apply_):
+    """Propose (and optionally apply) drivers and vehicles for a day's unassigned jobs."""
+    day = datetime.strptime(day, '%Y-%m-%d').date() if day else date.today()
+    proposal = dispatch.plan(day)
+    for a in proposal.assignments:
+        click.echo(f'Job #{a.job_id} {a.starts_at:%H:%M}-{a.ends_at:%H:%M}: driver {a.driver_id}, vehicle {a.vehicle_id}')
+    for u in proposal.unassigned:
+        click.echo(f'Job #{u.job_id}: {u.reason}')
+    click.echo(f'{len(proposal.assignments)} assignable, {len(proposal.unassigned)} left unassigned.')
+    if apply_ and proposal.assignments:
+        errors = dispatch.apply([a._asdict() for a in proposal.assignments])
+        for error in errors:
+            click.echo(error)
+        if not errors:
+            click.echo(f'Applied {len(proposal.assignments)} assignments.')
+
+
+@app.cli.command('build-travel-matrix')
+@with_appcontext
+def build_travel_matrix():
+    """Rebuild the zone-to-zone travel-time matrix from the gazetteer and completed jobs."""
+    used = travel_times.learn()
+    zones = len(travel_times.gazetteer.zones)
+    click.echo(f'Wrote {zones}x{zones} travel times to {travel_times.matrix_path} ({used} completed jobs learned).')
+
+
+@app.cli.command('materialize-recurring')
+@click.option('--days', type=int, default=None, help='Window length in days (default RECURRING_WINDOW_DAYS).')
+@click.option('--start', default=None, help='First day of the window as YYYY-MM-DD (default today).')
+@with_appcontext
+def materialize_recurring(days, start):
+    """Create the upcoming jobs of every active recurring job; safe to re-run (e.g. nightly from cron)."""
+    start = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+    result = recurring_jobs.materialize(start, days)
+    for error in result.errors:
+        click.echo(f'Skipped {error}')
+    click.echo(f'Created {result.created} jobs ({result.existing} already existed, '
+               f'{result.unassigned} left unassigned because of booking clashes).')
+
+
+@app.cli.command('purge-sessions')
+@with_appcontext
+def purge_sessions():
+    """Delete expired server-side sessions (run daily from cron)."""
+    if not isinstance(app.session_interface, session_store.ServerSideSessionInterface):
+        click.echo('SESSION_BACKEND is cookie; nothing to purge.')
+        return
+    app.session_interface.flush()
+    click.echo(f'Deleted {app.session_interface.store.purge()} expired sessions.')
+
+
+@app.cli.command('prune-changes')
+@with_appcontext
+def prune_changes():
+    """Delete change feed events older than CHANGE_FEED_RETENTION_HOURS (run daily from cron)."""
+    click.echo(f'Deleted {change_feed.prune()} change events.')
+
+
+@app.cli.command('build-assets')
+@click.option('--vendor/--no-vendor', default=True, help='Download missing third-party assets into static/vendor first.')
+def build_assets(vendor):
+    """Vendor, fingerprint and precompress static files into static/dist (run on every deploy)."""
+    if vendor:
+        try:
+            fetch_vendor(app.static_folder, log=click.echo)
+        except OSError as e:
+            # Offline builds still fingerprint what is there; the rest keeps loading from the CDN
+            click.echo(f'Could not vendor third-party assets: {e}', err=True)
+    manifest = build_dist(app.static_folder)
+    assets.load_manifest()
+    click.echo(f'Built {len(manifest)} assets into {os.path.join(app.static_folder, "dist")}.')
+
+
 # CSRF token is automatically handled by Flask-WTF and Flask-Security
 
 @app.context_processor
 def inject_role_helpers():
     def has_role(role_name):
-        return any(role.name == role_name for role in getattr(current_user, 'roles', []))
+        return role_name in getattr(current_user, 'role_names', ())
 
     def has_any_role(*role_names):
-        return any(role.name in role_names for role in getattr(current_user, 'roles', []))
+        return not frozenset(role_names).isdisjoint(getattr(current_user, 'role_names', ()))
 
     return dict(has_role=has_role, has_any_role=has_any_role)
 
@@ -0,0 +1,88 @@
+"""
+Gunicorn configuration for the Transport Admin Portal.
+
+Every setting can be overridden from the environment so the same file serves
+Heroku, EC2 and local load testing:
+
+    GUNICORN_PROFILE       sync | gthread | gevent  (default: gthread)
+    WEB_CONCURRENCY        number of worker processes
+    GUNICORN_THREADS       threads per worker for the gthread profile
+    GUNICORN_CONNECTIONS   greenlets per worker for the gevent profile
+    GUNICORN_PRELOAD       1/0, import the app once in the master (default: 1,
+                           0 for gevent)
+    GUNICORN_TIMEOUT       worker timeout in seconds
+
+Run with:  gunicorn -c gunicorn.conf.py app:app
+"""
+import importlib.util
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+profile = os.environ.get('GUNICORN_PROFILE', 'gthread').lower()
+if profile == 'gevent' and importlib.util.find_spec('gevent') is None:
+    # gevent is optional; fall back rather than refusing to boot
+    profile = 'gthread'
+
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+
+if profile == 'gevent':
+    worker_class = 'gevent'
+    worker_connections = int(os.environ.get('GUNICORN_CONNECTIONS', 100))
+elif profile == 'gthread':
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+else:
+    worker_class = 'sync'
+
+# gevent monkey-patches inside each worker, which is too late for modules the
+# master already imported, so preloading is off by default for that profile
+preload_app = os.environ.get('GUNICORN_PRELOAD', '0' if profile == 'gevent' else '1') == '1'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then so slow leaks (pandas report buffers etc.) can't accumulate
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = 100
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    server.log.info(f'Starting gunicorn with profile={profile} workers={workers} preload={preload_app}')
+
+
+def post_fork(server, worker):
+    """Make the worker's database access safe after forking.
+
+    gevent workers need psycopg2 made cooperative, whether or not the app was
+    preloaded (preload is off by default for that profile).
+
+    With --preload the app module (and anything it touched at import time) is
+    created before forking, so pooled sockets would be shared between
+    processes. dispose(close=False) forgets them without closing the parent's
+    copies, and each worker opens fresh connections on first use. That covers
+    every Flask-SQLAlchemy bind (primary and replica) and the SQLite engine of
+    SESSION_BACKEND=sqlite.
+    """
+    if worker_class == 'gevent':
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            server.log.warning('psycogreen not installed; psycopg2 calls will block the gevent loop')
+    if not server.cfg.preload_app:
+        return
+    from app import app
+    from extensions import db
+    with app.app_context():
+        engines = set(db.engines.values())
+    store = getattr(app.session_interface, 'store', None)
+    if store is not None:
+        engines.add(store.engine)
+    for engine in engines:
+        engine.dispose(close=False)
@@ -0,0 +1,26 @@
+"""Add job.completed_at for learned travel times
+
+Revision ID: 3f1b9d6c4e27
+Revises: a7e3c2d91f4b
+Create Date: 2025-07-22 14:03:10.527194
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1b9d6c4e27'
+down_revision = 'a7e3c2d91f4b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('completed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_column('completed_at')
@@ -0,0 +1,64 @@
+"""Add recurring_job templates and job.recurring_job_id
+
+Revision ID: 8b4d2e7f1a93
+Revises: 3f1b9d6c4e27
+Create Date: 2025-07-24 10:41:57.208413
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4d2e7f1a93'
+down_revision = '3f1b9d6c4e27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('recurring_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=128), nullable=False),
+    sa.Column('rrule', sa.String(length=256), nullable=False),
+    sa.Column('starts_on', sa.String(length=32), nullable=False),
+    sa.Column('ends_on', sa.String(length=32), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.Column('customer_name', sa.String(length=128), nullable=True),
+    sa.Column('customer_email', sa.String(length=128), nullable=True),
+    sa.Column('customer_mobile', sa.String(length=32), nullable=True),
+    sa.Column('passenger_name', sa.String(length=128), nullable=True),
+    sa.Column('passenger_mobile', sa.String(length=32), nullable=True),
+    sa.Column('type_of_service', sa.String(length=128), nullable=True),
+    sa.Column('pickup_time', sa.String(length=32), nullable=True),
+    sa.Column('pickup_location', sa.String(length=256), nullable=True),
+    sa.Column('dropoff_location', sa.String(length=256), nullable=True),
+    sa.Column('vehicle_type', sa.String(length=64), nullable=True),
+    sa.Column('payment_mode', sa.String(length=64), nullable=True),
+    sa.Column('remarks', sa.Text(), nullable=True),
+    sa.Column('base_price', sa.Float(), nullable=True),
+    sa.Column('final_price', sa.Float(), nullable=True),
+    sa.Column('agent_id', sa.Integer(), nullable=True),
+    sa.Column('service_id', sa.Integer(), nullable=True),
+    sa.Column('driver_id', sa.Integer(), nullable=True),
+    sa.Column('vehicle_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['agent_id'], ['agent.id'], ),
+    sa.ForeignKeyConstraint(['driver_id'], ['driver.id'], ),
+    sa.ForeignKeyConstraint(['service_id'], ['service.id'], ),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicle.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('recurring_job_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_job_recurring_job_id_recurring_job', 'recurring_job',
+                                    ['recurring_job_id'], ['id'], ondelete='SET NULL')
+        batch_op.create_unique_constraint('uq_job_recurring_occurrence', ['recurring_job_id', 'pickup_date'])
+
+
+def downgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_job_recurring_occurrence', type_='unique')
+        batch_op.drop_constraint('fk_job_recurring_job_id_recurring_job', type_='foreignkey')
+        batch_op.drop_column('recurring_job_id')
+
+    op.drop_table('recurring_job')
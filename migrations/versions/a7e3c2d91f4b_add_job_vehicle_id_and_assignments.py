@@ -0,0 +1,105 @@
+"""Add job.vehicle_id and the job_assignment availability table
+
+Revision ID: a7e3c2d91f4b
+Revises: 5fd0d47b93ca
+Create Date: 2025-07-20 09:12:44.381027
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7e3c2d91f4b'
+down_revision = '5fd0d47b93ca'
+branch_labels = None
+depends_on = None
+
+ACTIVE_STATUSES = ('New', 'In Progress')
+DEFAULT_DURATION = timedelta(minutes=120)
+
+
+def _window(pickup_date, pickup_time):
+    # Same rules as services.availability.job_window, frozen for this migration
+    if not pickup_date:
+        return None, None
+    try:
+        day = datetime.strptime(pickup_date.strip(), '%Y-%m-%d')
+    except ValueError:
+        return None, None
+    if pickup_time:
+        for fmt in ('%H:%M', '%H:%M:%S', '%I:%M %p'):
+            try:
+                at = datetime.strptime(pickup_time.strip(), fmt)
+            except ValueError:
+                continue
+            start = day.replace(hour=at.hour, minute=at.minute, second=at.second)
+            return start, start + DEFAULT_DURATION
+    return day, day + timedelta(days=1)
+
+
+def upgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('vehicle_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_job_vehicle_id_vehicle', 'vehicle', ['vehicle_id'], ['id'])
+        batch_op.create_index(batch_op.f('ix_job_vehicle_id'), ['vehicle_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_job_driver_id'), ['driver_id'], unique=False)
+
+    op.create_table('job_assignment',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('driver_id', sa.Integer(), nullable=True),
+    sa.Column('vehicle_id', sa.Integer(), nullable=True),
+    sa.Column('starts_at', sa.DateTime(), nullable=True),
+    sa.Column('ends_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['driver_id'], ['driver.id'], ),
+    sa.ForeignKeyConstraint(['job_id'], ['job.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicle.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('job_id')
+    )
+    with op.batch_alter_table('job_assignment', schema=None) as batch_op:
+        batch_op.create_index('ix_job_assignment_driver_window', ['driver_id', 'starts_at', 'ends_at'], unique=False)
+        batch_op.create_index('ix_job_assignment_vehicle_window', ['vehicle_id', 'starts_at', 'ends_at'], unique=False)
+
+    # Backfill vehicle_id from the vehicle number copied onto each job
+    bind = op.get_bind()
+    job = sa.table('job', sa.column('id', sa.Integer), sa.column('vehicle_id', sa.Integer),
+                   sa.column('vehicle_number', sa.String), sa.column('driver_id', sa.Integer),
+                   sa.column('order_status', sa.String), sa.column('pickup_date', sa.String),
+                   sa.column('pickup_time', sa.String))
+    vehicle = sa.table('vehicle', sa.column('id', sa.Integer), sa.column('number', sa.String))
+    bind.execute(
+        job.update()
+        .where(job.c.vehicle_id.is_(None), job.c.vehicle_number.isnot(None))
+        .values(vehicle_id=sa.select(vehicle.c.id).where(vehicle.c.number == job.c.vehicle_number)
+                .scalar_subquery()))
+
+    # Backfill assignments for jobs that are currently active
+    assignment = sa.table('job_assignment', sa.column('job_id', sa.Integer), sa.column('driver_id', sa.Integer),
+                          sa.column('vehicle_id', sa.Integer), sa.column('starts_at', sa.DateTime),
+                          sa.column('ends_at', sa.DateTime))
+    rows = []
+    for row in bind.execute(sa.select(job).where(job.c.order_status.in_(ACTIVE_STATUSES))):
+        if not (row.driver_id or row.vehicle_id):
+            continue
+        starts_at, ends_at = _window(row.pickup_date, row.pickup_time)
+        rows.append({'job_id': row.id, 'driver_id': row.driver_id, 'vehicle_id': row.vehicle_id,
+                     'starts_at': starts_at, 'ends_at': ends_at})
+    if rows:
+        op.bulk_insert(assignment, rows)
+
+
+def downgrade():
+    with op.batch_alter_table('job_assignment', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_assignment_vehicle_window')
+        batch_op.drop_index('ix_job_assignment_driver_window')
+
+    op.drop_table('job_assignment')
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_job_driver_id'))
+        batch_op.drop_index(batch_op.f('ix_job_vehicle_id'))
+        batch_op.drop_constraint('fk_job_vehicle_id_vehicle', type_='foreignkey')
+        batch_op.drop_column('vehicle_id')
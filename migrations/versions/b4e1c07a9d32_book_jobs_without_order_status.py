@@ -0,0 +1,71 @@
+"""Book drivers and vehicles for open jobs in any status, including none
+
+Revision ID: b4e1c07a9d32
+Revises: f3b7d92c4e10
+Create Date: 2025-08-01 08:41:17.502913
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e1c07a9d32'
+down_revision = 'f3b7d92c4e10'
+branch_labels = None
+depends_on = None
+
+CLOSED_STATUSES = ('Completed', 'Cancelled')
+PREVIOUS_ACTIVE_STATUSES = ('New', 'In Progress')
+DEFAULT_DURATION = timedelta(minutes=120)
+
+job = sa.table('job', sa.column('id', sa.Integer), sa.column('driver_id', sa.Integer),
+               sa.column('vehicle_id', sa.Integer), sa.column('order_status', sa.String),
+               sa.column('pickup_date', sa.String), sa.column('pickup_time', sa.String))
+assignment = sa.table('job_assignment', sa.column('job_id', sa.Integer), sa.column('driver_id', sa.Integer),
+                      sa.column('vehicle_id', sa.Integer), sa.column('starts_at', sa.DateTime),
+                      sa.column('ends_at', sa.DateTime))
+
+
+def _window(pickup_date, pickup_time):
+    # Same rules as services.availability.job_window, frozen for this migration
+    if not pickup_date:
+        return None, None
+    try:
+        day = datetime.strptime(pickup_date.strip(), '%Y-%m-%d')
+    except ValueError:
+        return None, None
+    if pickup_time:
+        for fmt in ('%H:%M', '%H:%M:%S', '%I:%M %p'):
+            try:
+                at = datetime.strptime(pickup_time.strip(), fmt)
+            except ValueError:
+                continue
+            start = day.replace(hour=at.hour, minute=at.minute, second=at.second)
+            return start, start + DEFAULT_DURATION
+    return day, day + timedelta(days=1)
+
+
+def upgrade():
+    # Jobs saved without an order status (or any other open one) were left out of job_assignment
+    bind = op.get_bind()
+    rows = []
+    for row in bind.execute(
+            sa.select(job)
+            .where(sa.or_(job.c.order_status.is_(None), job.c.order_status.notin_(CLOSED_STATUSES)))
+            .where(sa.or_(job.c.driver_id.isnot(None), job.c.vehicle_id.isnot(None)))
+            .where(job.c.id.notin_(sa.select(assignment.c.job_id)))):
+        starts_at, ends_at = _window(row.pickup_date, row.pickup_time)
+        rows.append({'job_id': row.id, 'driver_id': row.driver_id, 'vehicle_id': row.vehicle_id,
+                     'starts_at': starts_at, 'ends_at': ends_at})
+    if rows:
+        op.bulk_insert(assignment, rows)
+
+
+def downgrade():
+    bind = op.get_bind()
+    bind.execute(assignment.delete().where(assignment.c.job_id.in_(
+        sa.select(job.c.id).where(sa.or_(job.c.order_status.is_(None),
+                                         job.c.order_status.notin_(PREVIOUS_ACTIVE_STATUSES))))))
@@ -0,0 +1,29 @@
+"""Add table_version change counters for conditional GET
+
+Revision ID: e2a94c7b1d58
+Revises: c5e81f0b6d24
+Create Date: 2025-07-30 10:12:47.381652
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a94c7b1d58'
+down_revision = 'c5e81f0b6d24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('table_version',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('table_version')
@@ -0,0 +1,37 @@
+"""Add change_event outbox for the live job board
+
+Revision ID: f3b7d92c4e10
+Revises: e2a94c7b1d58
+Create Date: 2025-07-31 09:24:05.118734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b7d92c4e10'
+down_revision = 'e2a94c7b1d58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=True),
+    sa.Column('op', sa.String(length=8), nullable=False),
+    sa.Column('changes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('change_event', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_change_event_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('change_event', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_change_event_created_at'))
+
+    op.drop_table('change_event')
@@ -9,4 +9,9 @@ from .billing import Billing
 from .discount import Discount
 from .association import roles_users
 from .price import Price
-from .customer_discount import CustomerDiscount 
\ No newline at end of file
+from .customer_discount import CustomerDiscount
+from .assignment import JobAssignment
+from .recurring import RecurringJob
+from .session import UserSession
+from .table_version import TableVersion
+from .change_event import ChangeEvent
@@ -0,0 +1,18 @@
+from extensions import db
+
+
+class JobAssignment(db.Model):
+    """Driver/vehicle booking for an active job, kept in sync by services/availability.py"""
+    __tablename__ = 'job_assignment'
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id', ondelete='CASCADE'), unique=True, nullable=False)
+    driver_id = db.Column(db.Integer, db.ForeignKey('driver.id'))
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'))
+    # Booked window from pickup date/time plus the estimated duration; NULL when the job has no date
+    starts_at = db.Column(db.DateTime)
+    ends_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_job_assignment_driver_window', 'driver_id', 'starts_at', 'ends_at'),
+        db.Index('ix_job_assignment_vehicle_window', 'vehicle_id', 'starts_at', 'ends_at'),
+    )
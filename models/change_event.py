@@ -0,0 +1,12 @@
+from extensions import db
+
+
+class ChangeEvent(db.Model):
+    """Outbox of job and billing changes, written in the changing transaction by services/change_feed.py"""
+    __tablename__ = 'change_event'
+    id = db.Column(db.Integer, primary_key=True)  # feed cursor, sent as the SSE event id
+    table_name = db.Column(db.String(64), nullable=False)  # 'job' or 'billing'
+    row_id = db.Column(db.Integer)  # None for bulk statements
+    op = db.Column(db.String(8), nullable=False)  # insert, update, delete or bulk
+    changes = db.Column(db.Text)  # JSON list of the changed column names (updates only); never values
+    created_at = db.Column(db.DateTime, nullable=False, index=True)  # UTC
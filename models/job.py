@@ -29,8 +29,11 @@ class Job(db.Model):
     reference = db.Column(db.String(128))
     status = db.Column(db.String(32), default='Inactive')
     date = db.Column(db.String(64))
-    driver_id = db.Column(db.Integer, db.ForeignKey('driver.id'))
+    completed_at = db.Column(db.DateTime)  # set when the job is marked Completed
+    driver_id = db.Column(db.Integer, db.ForeignKey('driver.id'), index=True)
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'), index=True)
     agent_id = db.Column(db.Integer, db.ForeignKey('agent.id'))
+    recurring_job_id = db.Column(db.Integer, db.ForeignKey('recurring_job.id', ondelete='SET NULL'))
     
     # Billing fields
     base_price = db.Column(db.Float, default=0.0)
@@ -43,4 +46,10 @@ class Job(db.Model):
     
     # Relationships
     service = db.relationship('Service', backref='jobs')
-    billing = db.relationship('Billing', backref='job', uselist=False, cascade='all, delete-orphan') 
\ No newline at end of file
+    vehicle = db.relationship('Vehicle', backref='jobs')
+    billing = db.relationship('Billing', backref='job', uselist=False, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        # One generated job per template and day, so materializing twice is harmless
+        db.UniqueConstraint('recurring_job_id', 'pickup_date', name='uq_job_recurring_occurrence'),
+    )
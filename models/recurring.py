@@ -0,0 +1,38 @@
+from extensions import db
+
+
+class RecurringJob(db.Model):
+    """Standing booking; services/recurring.py materializes its upcoming Job rows"""
+    __tablename__ = 'recurring_job'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(128), nullable=False)
+    # RFC 5545 recurrence rule, e.g. FREQ=WEEKLY;BYDAY=MO,WE,FR or FREQ=DAILY;INTERVAL=2
+    rrule = db.Column(db.String(256), nullable=False)
+    starts_on = db.Column(db.String(32), nullable=False)  # YYYY-MM-DD, first possible occurrence
+    ends_on = db.Column(db.String(32))  # YYYY-MM-DD, last possible occurrence
+    active = db.Column(db.Boolean, default=True, nullable=False)
+
+    # Copied onto every generated job
+    customer_name = db.Column(db.String(128))
+    customer_email = db.Column(db.String(128))
+    customer_mobile = db.Column(db.String(32))
+    passenger_name = db.Column(db.String(128))
+    passenger_mobile = db.Column(db.String(32))
+    type_of_service = db.Column(db.String(128))
+    pickup_time = db.Column(db.String(32))
+    pickup_location = db.Column(db.String(256))
+    dropoff_location = db.Column(db.String(256))
+    vehicle_type = db.Column(db.String(64))
+    payment_mode = db.Column(db.String(64))
+    remarks = db.Column(db.Text)
+    base_price = db.Column(db.Float, default=0.0)
+    final_price = db.Column(db.Float, default=0.0)
+    agent_id = db.Column(db.Integer, db.ForeignKey('agent.id'))
+    service_id = db.Column(db.Integer, db.ForeignKey('service.id'))
+    driver_id = db.Column(db.Integer, db.ForeignKey('driver.id'))
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'))
+
+    jobs = db.relationship('Job', backref='recurring_job', lazy='dynamic')
+
+    def __repr__(self):
+        return f'<RecurringJob {self.name}>'
@@ -0,0 +1,10 @@
+from extensions import db
+
+
+class UserSession(db.Model):
+    """Server-side session record, read and written by services/session_store.py"""
+    __tablename__ = 'user_session'
+    id = db.Column(db.String(64), primary_key=True)  # random token, also the cookie value
+    user_id = db.Column(db.Integer, index=True)  # copy of _user_id, for "log out everywhere"
+    data = db.Column(db.Text, nullable=False)  # tagged JSON of the session dict
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -0,0 +1,9 @@
+from extensions import db
+
+
+class TableVersion(db.Model):
+    """Change counter per table, bumped in the writing transaction by services/conditional_get.py"""
+    __tablename__ = 'table_version'
+    name = db.Column(db.String(64), primary_key=True)  # table name, e.g. 'job'
+    version = db.Column(db.Integer, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime, nullable=False)  # UTC
@@ -14,13 +14,20 @@ class User(UserMixin, db.Model):
     confirmed_at = db.Column(db.DateTime())
     roles = db.relationship('Role', secondary=roles_users, backref=db.backref('users', lazy='dynamic'))
     
+    @property
+    def role_names(self):
+        """Role names as a frozenset, matching services.principal_cache.Principal"""
+        return frozenset(role.name for role in self.roles)
+
     def check_password(self, password):
-        """Simple plaintext password check - no hashing"""
-        return self.password == password
+        """Check password against the stored hash (or legacy plaintext); see services/passwords.py"""
+        from services.passwords import passwords
+        return passwords.verify(self.password, password)
     
     def set_password(self, password):
-        """Set password without hashing"""
-        self.password = password
+        """Hash and set password with the configured scheme and cost"""
+        from services.passwords import passwords
+        self.password = passwords.hash(password)
     
     def get_id(self):
         """Flask-Login method to return user ID as string"""
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the per-request authentication overhead.
+
+Replays what every logged-in request does before the view runs: open the
+session from the cookie, load the user and check roles for the navigation
+bar, then save the session. It compares the old path (signed cookie session,
+User.query.get and lazy current_user.roles) with the new one (server-side
+session and cached Principal). Runs against throwaway SQLite files.
+
+Usage:
+    python scripts/bench_auth_overhead.py --requests 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+TMP = tempfile.mkdtemp(prefix='bench_auth_')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(TMP, 'app.db'))
+os.environ['SESSION_BACKEND'] = 'cookie'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Response
+from flask.sessions import SecureCookieSessionInterface
+from sqlalchemy import create_engine
+
+from app import app, db
+from models import Role, User, UserSession
+from services.principal_cache import principal_cache
+from services.session_store import ServerSideSessionInterface, SessionStore
+
+NAV_ROLES = ('fleet_manager', 'system_admin', 'fleet_employee', 'accountant', 'customer_service')
+
+
+def old_load(user_id):
+    user = User.query.get(user_id)
+    # base.html calls has_any_role five times, each walking current_user.roles
+    for _ in range(5):
+        any(role.name in NAV_ROLES for role in user.roles)
+    return user
+
+
+def new_load(user_id):
+    principal = principal_cache.get(user_id)
+    for _ in range(5):
+        not principal.role_names.isdisjoint(NAV_ROLES)
+    return principal
+
+
+def cookie_for(interface, user_id):
+    with app.test_request_context('/') as ctx:
+        session = interface.open_session(app, ctx.request)
+        session.update({'_user_id': str(user_id), '_fresh': True, 'csrf_token': 'x' * 40})
+        response = Response()
+        interface.save_session(app, session, response)
+        return response.headers['Set-Cookie'].split(';')[0]
+
+
+def run(interface, load, cookie, requests):
+    started = time.perf_counter()
+    for _ in range(requests):
+        with app.test_request_context('/', headers={'Cookie': cookie}) as ctx:
+            session = interface.open_session(app, ctx.request)
+            load(int(session['_user_id']))
+            interface.save_session(app, session, Response())
+            db.session.remove()
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        user = User(email='bench@example.com', password='benchmark', username='bench')
+        user.roles = [Role(name='fleet_manager'), Role(name='accountant')]
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    engine = create_engine('sqlite:///' + os.path.join(TMP, 'sessions.db'))
+    UserSession.__table__.create(engine, checkfirst=True)
+    cookie_interface = SecureCookieSessionInterface()
+    server_interface = ServerSideSessionInterface(SessionStore(engine))
+
+    # Baseline: the same request context cost with no auth work at all
+    signed_cookie = cookie_for(cookie_interface, user_id)
+    baseline = run(cookie_interface, lambda user_id: None, signed_cookie, args.requests)
+    old = run(cookie_interface, old_load, signed_cookie, args.requests)
+    new = run(server_interface, new_load, cookie_for(server_interface, user_id), args.requests)
+    print(f'{args.requests} requests')
+    print(f'signed cookie, no user lookup    {baseline:8.1f} us/request')
+    print(f'before: cookie + User + roles     {old:8.1f} us/request')
+    print(f'after:  server-side + Principal   {new:8.1f} us/request')
+
+
+if __name__ == '__main__':
+    main()
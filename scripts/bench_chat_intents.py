@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the chat intent router.
+
+Routes a corpus of real chat queries through the old sequential re.search
+chain (kept here for comparison) and through services/chat_intents.py, and
+prints per-message latency plus the queries the two routers disagree on.
+
+Usage:
+    python scripts/bench_chat_intents.py --rounds 2000
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services import chat_intents
+
+CORPUS = [
+    "Show all jobs", "Active jobs", "Pending jobs", "Completed jobs", "Unpaid jobs",
+    "All drivers", "Available drivers", "All vehicles", "Available vehicles",
+    "Payment status", "Job status", "Dashboard summary", "Help", "what can you do",
+    "show me the unpaid payments", "paid payments", "cancelled jobs", "list services",
+    "agents", "billing records", "jobs in progress", "top 5 completed jobs",
+    "unpaid jobs this week", "jobs today", "how many drivers are free today",
+    "give me an overview of the fleet", "status", "jobs for tomorrow",
+    "show 20 paid jobs last month", "hello", "any new bookings?",
+]
+
+# The routing chain parse_chat_message used before the intent engine
+LEGACY_ROUTES = [
+    (r'\b(all\s+)?jobs?\b', 'jobs'),
+    (r'\bdrivers?\b', 'drivers'),
+    (r'\bvehicles?\b', 'vehicles'),
+    (r'\bagents?\b', 'agents'),
+    (r'\bservices?\b', 'services'),
+    (r'\bbilling?\b', 'billing'),
+    (r'\bpayment\b', 'payment'),
+    (r'\bstatus\b', 'status'),
+    (r'\b(dashboard|summary|overview)\b', 'dashboard'),
+    (r'\b(help|what can you do)\b', 'help'),
+]
+LEGACY_SLOTS = [
+    (r'\bactive\b', 'active'), (r'\bpending\b', 'pending'), (r'\bcompleted\b', 'completed'),
+    (r'\bcancelled\b', 'cancelled'), (r'\bunpaid\b', 'unpaid'), (r'\bpaid\b', 'paid'),
+    (r'\bavailable\b', 'available'),
+]
+
+
+def legacy_route(message):
+    message = message.lower().strip()
+    for pattern, name in LEGACY_ROUTES:
+        if re.search(pattern, message):
+            # The handler then scanned its own status patterns in order
+            for slot_pattern, slot in LEGACY_SLOTS:
+                if re.search(slot_pattern, message):
+                    return name, slot
+            return name, None
+    return None, None
+
+
+def time_router(route, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for message in CORPUS:
+            route(message)
+    return (time.perf_counter() - started) / (rounds * len(CORPUS)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f'{len(CORPUS)} queries x {args.rounds} rounds')
+    legacy = time_router(legacy_route, args.rounds)
+    engine = time_router(chat_intents.parse, args.rounds)
+    print(f'legacy re.search chain   {legacy:7.2f} us/message')
+    print(f'intent engine            {engine:7.2f} us/message')
+
+    print('\nRouting differences:')
+    for message in CORPUS:
+        old = legacy_route(message)
+        new = chat_intents.parse(message)
+        if old[0] != new.name:
+            print(f'  {message!r:45} {old[0]} -> {new.name} {new.slots}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Bytes on the wire and latency of the main views with response compression.
+
+Seeds throwaway SQLite data and requests each view twice per round: once
+with Accept-Encoding: identity and once with the best encoding the server
+offers (br if the brotli package is installed, else gzip). It reports the body
+sizes, the server time per request (which includes the compression CPU), and
+the estimated transfer time at --mbps. Conditional GET and the rate limiter
+are disabled so every request renders.
+
+Usage:
+    python scripts/bench_compression.py --jobs 500 --requests 50 --mbps 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+TMP = tempfile.mkdtemp(prefix='bench_compression_')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(TMP, 'app.db'))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, chat_export_serializer, db
+from models import Driver, Job, User
+from services.conditional_get import table_versions
+from services.rate_limit import limiter
+
+
+def seed(jobs):
+    db.create_all()
+    db.session.add(User(email='bench@example.com', password='benchmark', username='bench'))
+    db.session.add_all([Driver(name=f'Driver {i}', phone=f'+65 8000 {i:04d}') for i in range(50)])
+    db.session.add_all([Job(customer_name=f'Customer {i}', customer_mobile='+65 9000 0000', passenger_name=f'Passenger {i}',
+                            type_of_service='Airport Transfer', pickup_date='2025-08-01', pickup_time='09:30',
+                            pickup_location='Changi Airport Terminal 3 Arrival Hall',
+                            dropoff_location='Marina Bay Sands Hotel', base_price=80, final_price=74,
+                            payment_status='Unpaid', status='Scheduled') for i in range(jobs)])
+    db.session.commit()
+
+
+def views():
+    token = chat_export_serializer().dumps({'message': 'list all jobs', 'user_id': '1'})
+    return [
+        ('dashboard', 'GET', '/dashboard', {}),
+        ('jobs page', 'GET', '/jobs', {}),
+        ('jobs table (htmx)', 'GET', '/jobs/table', {'headers': {'HX-Request': 'true'}}),
+        ('drivers', 'GET', '/drivers', {}),
+        ('chat json', 'POST', '/api/chat', {'json': {'message': 'list all jobs'}}),
+        ('chat stream (sse)', 'POST', '/api/chat/stream', {'json': {'message': 'list all jobs'}}),
+        ('csv export', 'GET', f'/api/chat/download?format=csv&token={token}', {}),
+        ('xlsx export', 'GET', f'/api/chat/download?format=xlsx&token={token}', {}),
+    ]
+
+
+def measure(client, method, path, kwargs, encoding, requests):
+    headers = dict(kwargs.get('headers', {}), **{'Accept-Encoding': encoding})
+    options = dict(kwargs, headers=headers)
+    client.open(path, method=method, **options)  # warm up
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = client.open(path, method=method, **options)
+        size = len(response.get_data())
+        used = response.headers.get('Content-Encoding', 'identity')
+    return size, (time.perf_counter() - started) / requests * 1000, used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--mbps', type=float, default=10.0, help='link speed for the transfer estimate')
+    args = parser.parse_args()
+
+    limiter.enabled = False
+    table_versions.enabled = False
+    with app.app_context():
+        seed(args.jobs)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+
+    bytes_per_ms = args.mbps * 1e6 / 8 / 1000
+    print(f'{args.jobs} jobs, {args.requests} requests per view, transfer at {args.mbps:g} Mbit/s')
+    print(f'{"view":<20} {"plain B":>9} {"sent B":>9} {"enc":>8} {"ratio":>6} '
+          f'{"server ms":>15} {"transfer ms":>15}')
+    for name, method, path, kwargs in views():
+        plain, plain_ms, _ = measure(client, method, path, kwargs, 'identity', args.requests)
+        sent, sent_ms, used = measure(client, method, path, kwargs, 'br, gzip', args.requests)
+        print(f'{name:<20} {plain:9d} {sent:9d} {used:>8} {sent / plain:6.2f} '
+              f'{plain_ms:6.2f} -> {sent_ms:6.2f} {plain / bytes_per_ms:6.1f} -> {sent / bytes_per_ms:6.1f}')
+
+
+if __name__ == '__main__':
+    main()
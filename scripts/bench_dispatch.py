@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the auto-dispatch solver.
+
+Generates a synthetic day of unassigned jobs plus a fleet with some existing
+bookings and times services/dispatch.solve on it (no database needed).
+
+Usage:
+    python scripts/bench_dispatch.py --jobs 3000 --drivers 400 --vehicles 400
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.dispatch import DispatchJob, solve
+
+VEHICLE_TYPES = ['Sedan', 'MPV', 'Van', 'Bus']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=3000)
+    parser.add_argument('--drivers', type=int, default=400)
+    parser.add_argument('--vehicles', type=int, default=400)
+    parser.add_argument('--booked', type=int, default=1000, help='existing bookings on the day')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    day = date(2025, 7, 16)
+    day_start = datetime.combine(day, datetime.min.time())
+    duration = timedelta(minutes=120)
+
+    def window():
+        start = day_start + timedelta(minutes=rng.randrange(6 * 60, 22 * 60, 5))
+        return start, start + duration
+
+    driver_ids = list(range(1, args.drivers + 1))
+    vehicles = [(vehicle_id, rng.choice(VEHICLE_TYPES)) for vehicle_id in range(1, args.vehicles + 1)]
+    bookings = [window() + (rng.choice(driver_ids), rng.choice(vehicles)[0]) for _ in range(args.booked)]
+    jobs = [DispatchJob(job_id, *window(), rng.choice(VEHICLE_TYPES + [None]), None, None)
+            for job_id in range(1, args.jobs + 1)]
+
+    started = time.perf_counter()
+    assignments, unassigned = solve(day, jobs, driver_ids, vehicles, bookings)
+    elapsed = time.perf_counter() - started
+    print(f'{args.jobs} jobs, {args.drivers} drivers, {args.vehicles} vehicles, {args.booked} existing bookings')
+    print(f'solved in {elapsed:.3f}s: {len(assignments)} assigned, {len(unassigned)} left unassigned')
+
+
+if __name__ == '__main__':
+    main()
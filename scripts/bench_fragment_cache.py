@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the row fragment cache on the jobs table and billing pages.
+
+Seeds throwaway SQLite data, then times /jobs/table (HTMX partial) and
+/billing with the fragment cache off and warm. Conditional GET is disabled so
+every request renders. Also checks that both modes return the same page,
+apart from the time-stamped CSRF token in base.html.
+
+Usage:
+    python scripts/bench_fragment_cache.py --requests 300 --jobs 200
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+TMP = tempfile.mkdtemp(prefix='bench_fragments_')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(TMP, 'app.db'))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, db
+from models import Agent, Billing, Job, Service, User
+from services.conditional_get import table_versions
+from services.fragment_cache import fragment_cache
+from services.rate_limit import limiter
+
+
+def seed(jobs):
+    db.create_all()
+    db.session.add(User(email='bench@example.com', password='benchmark', username='bench'))
+    agent = Agent(name='Bench Agent', status='Active')
+    service = Service(name='Airport Transfer', status='Active', base_price=80)
+    db.session.add_all([agent, service])
+    rows = [Job(customer_name=f'Customer {i}', customer_mobile='+65 9000 0000', passenger_name=f'Passenger {i}',
+                type_of_service='Airport Transfer', pickup_date='2025-08-01', pickup_time='09:30',
+                pickup_location='Changi Airport Terminal 3 Arrival Hall', dropoff_location='Marina Bay Sands Hotel',
+                base_price=80, base_discount_percent=5, agent_discount_percent=2.5, final_price=74,
+                payment_status='Unpaid', status='Scheduled', agent=agent, service=service) for i in range(jobs)]
+    db.session.add_all(rows)
+    db.session.flush()
+    db.session.add_all([Billing(job_id=job.id, invoice_number=f'INV-{job.id}', base_price=80, base_discount_amount=4,
+                                total_amount=76) for job in rows])
+    db.session.commit()
+
+
+CSRF_META = re.compile(rb'<meta name="csrf-token" content="[^"]*">')
+
+
+def run(client, path, requests):
+    headers = {'HX-Request': 'true'} if path == '/jobs/table' else {}
+    body = CSRF_META.sub(b'', client.get(path, headers=headers).data)
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get(path, headers=headers)
+    return (time.perf_counter() - started) / requests * 1000, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--jobs', type=int, default=200)
+    args = parser.parse_args()
+
+    limiter.enabled = False
+    table_versions.enabled = False
+    with app.app_context():
+        seed(args.jobs)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+
+    print(f'{args.requests} requests, {args.jobs} jobs and invoices')
+    for path in ('/jobs/table', '/billing'):
+        fragment_cache.enabled = False
+        uncached, plain = run(client, path, args.requests)
+        fragment_cache.enabled = True
+        cached, body = run(client, path, args.requests)
+        print(f'{path:<12} uncached {uncached:7.2f} ms   cached {cached:7.2f} ms   identical: {plain == body}')
+
+
+if __name__ == '__main__':
+    main()
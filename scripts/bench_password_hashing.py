@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark for picking PASSWORD_SCHEME, PASSWORD_ROUNDS and PASSWORD_THREADS.
+
+For each scheme and cost it reports the time of one verification (the login
+latency it adds) and the verifications per second of a login burst run
+inline and through a thread pool. hashlib releases the GIL while hashing, so
+the pool scales with the CPU cores instead of queueing every login behind
+one another.
+
+Usage:
+    python scripts/bench_password_hashing.py --threads 4 --logins 64
+    python scripts/bench_password_hashing.py --scheme pbkdf2_sha256:29000 --scheme scrypt:14
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+from passlib.exc import MissingBackendError
+
+DEFAULT_CANDIDATES = ('pbkdf2_sha256:10000', 'pbkdf2_sha256:29000', 'pbkdf2_sha256:100000',
+                      'scrypt:14', 'scrypt:16', 'argon2:2')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scheme', action='append', help='scheme:rounds, repeatable')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--logins', type=int, default=32, help='logins per burst')
+    args = parser.parse_args()
+
+    print(f'{"scheme":<22} {"verify ms":>10} {"inline/s":>10} {"pool/s":>10}')
+    for candidate in args.scheme or DEFAULT_CANDIDATES:
+        scheme, rounds = candidate.split(':')
+        context = CryptContext(schemes=[scheme], **{f'{scheme}__rounds': int(rounds)})
+        try:
+            stored = context.hash('correct horse battery staple')
+        except MissingBackendError:
+            print(f'{candidate:<22} backend not installed')
+            continue
+
+        started = time.perf_counter()
+        for _ in range(args.logins):
+            context.verify('correct horse battery staple', stored)
+        inline = time.perf_counter() - started
+
+        with ThreadPoolExecutor(args.threads) as pool:
+            started = time.perf_counter()
+            list(pool.map(lambda _: context.verify('correct horse battery staple', stored), range(args.logins)))
+            pooled = time.perf_counter() - started
+
+        print(f'{candidate:<22} {inline / args.logins * 1000:10.1f} '
+              f'{args.logins / inline:10.1f} {args.logins / pooled:10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for the SQLite production profile.
+
+Runs reader and writer processes (like gunicorn workers) against a scratch
+copy of the job table, once with SQLite defaults (rollback journal) and once
+with services/sqlite_tuning.py applied, and prints throughput, write latency
+and "database is locked" errors.
+
+Usage:
+    python scripts/bench_sqlite_concurrency.py --readers 6 --writers 2 --duration 10
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+
+from models import Job
+from services import sqlite_tuning
+
+
+def make_engine(path, tuned):
+    # The baseline keeps pysqlite's defaults (rollback journal, 5s lock timeout)
+    engine = create_engine(f'sqlite:///{path}')
+    if tuned:
+        sqlite_tuning.configure_engine(engine)
+    return engine
+
+
+def reader(path, tuned, stop_at, results):
+    engine = make_engine(path, tuned)
+    ops = errors = 0
+    while time.time() < stop_at:
+        try:
+            with engine.connect() as conn:
+                conn.execute(select(Job.__table__).order_by(Job.id.desc()).limit(20)).fetchall()
+                conn.execute(select(Job.order_status, func.count()).group_by(Job.order_status)).fetchall()
+            ops += 1
+        except OperationalError:
+            errors += 1
+    results.put(('read', ops, errors, []))
+
+
+def writer(path, tuned, stop_at, results):
+    engine = make_engine(path, tuned)
+    ops = errors = 0
+    latencies = []
+    while time.time() < stop_at:
+        started = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(Job.__table__).values(
+                    customer_name='Bench Customer', pickup_location='Changi Airport T1',
+                    dropoff_location='Marina Bay Sands', pickup_date='2025-07-01',
+                    order_status='New', payment_status='Unpaid'))
+            latencies.append(time.perf_counter() - started)
+            ops += 1
+        except OperationalError:
+            errors += 1
+    results.put(('write', ops, errors, latencies))
+
+
+def run(tuned, args):
+    workdir = tempfile.mkdtemp(prefix='sqlite-bench-')
+    path = os.path.join(workdir, 'bench.db')
+    engine = make_engine(path, tuned)
+    Job.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Job.__table__), [
+            {'customer_name': f'Seed {i}', 'order_status': ('New', 'Completed')[i % 2]} for i in range(5000)])
+    engine.dispose()
+
+    results = multiprocessing.Queue()
+    stop_at = time.time() + args.duration
+    procs = [multiprocessing.Process(target=reader, args=(path, tuned, stop_at, results)) for _ in range(args.readers)]
+    procs += [multiprocessing.Process(target=writer, args=(path, tuned, stop_at, results)) for _ in range(args.writers)]
+    for p in procs:
+        p.start()
+    collected = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    reads = sum(r[1] for r in collected if r[0] == 'read')
+    writes = sum(r[1] for r in collected if r[0] == 'write')
+    errors = sum(r[2] for r in collected)
+    latencies = sorted(l for r in collected for l in r[3])
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else float('nan')
+    label = 'WAL tuned' if tuned else 'default'
+    print(f'{label:<10} reads/s {reads / args.duration:9.1f}   writes/s {writes / args.duration:8.1f}   '
+          f'write p95 {p95:7.1f} ms   locked errors {errors}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=6)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=int, default=10)
+    args = parser.parse_args()
+    print(f'{args.readers} reader and {args.writers} writer processes, {args.duration}s each')
+    run(False, args)
+    run(True, args)
+
+
+if __name__ == '__main__':
+    main()
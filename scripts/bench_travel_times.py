@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the travel-time lookups.
+
+Writes a matrix for data/gazetteer.csv to a temporary directory, maps it the
+way the app does and times zone matching and batch estimates over a corpus
+of free-text locations (no database needed).
+
+Usage:
+    python scripts/bench_travel_times.py --pairs 10000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from services.travel import Gazetteer, TravelTimeService
+
+LOCATIONS = [
+    'Changi Airport T3', 'Changi Airport Terminal 1 Arrival Hall', 'Orchard Hotel', 'Raffles Place',
+    'Marina Bay Sands Tower 2', 'Blk 123 Yishun Ave 1', 'Resorts World Sentosa', 'Jurong East MRT',
+    'NUS Kent Ridge', 'Tampines Mall', 'Changi Village Hotel', 'Vivocity', 'Woodlands Checkpoint',
+    '1 Fusionopolis Way, one-north', 'Unknown Street 5',
+]
+
+
+def timed(fn, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pairs', type=int, default=10000)
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    service = TravelTimeService()
+    service.gazetteer = Gazetteer(os.path.join(ROOT, 'data', 'gazetteer.csv'))
+    with tempfile.TemporaryDirectory() as tmp:
+        service.matrix_path = os.path.join(tmp, 'matrix.npy')
+        zones = len(service.gazetteer.zones)
+        np.save(service.matrix_path, np.stack([service.prior(), np.zeros((zones, zones), dtype=np.float32)]))
+
+        pickups = [rng.choice(LOCATIONS) for _ in range(args.pairs)]
+        dropoffs = [rng.choice(LOCATIONS) for _ in range(args.pairs)]
+        print(f'{zones} zones, {args.pairs} location pairs, {type(service.matrix()).__name__} matrix')
+
+        service.gazetteer.zone_of.cache_clear()
+        cold = timed(lambda: [service.gazetteer._zone_of(location) for location in LOCATIONS], args.rounds)
+        print(f'zone match, uncached        {cold / len(LOCATIONS) * 1e6:8.2f} us/location')
+        batch = timed(lambda: service.estimate_many(pickups, dropoffs), args.rounds)
+        print(f'estimate_many (text)        {batch / args.pairs * 1e6:8.3f} us/pair')
+        origins, destinations = service.zones(pickups), service.zones(dropoffs)
+        matrix = service.matrix()[0]
+        lookup = timed(lambda: matrix[origins, destinations], args.rounds)
+        print(f'matrix lookup (zones)       {lookup / args.pairs * 1e6:8.3f} us/pair')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Load-test comparison of the gunicorn profiles in gunicorn.conf.py.
+
+Starts gunicorn once per profile, logs in (when credentials are given), then
+hammers a few pages from concurrent clients and prints throughput and latency.
+
+Usage:
+    python scripts/load_test.py
+    python scripts/load_test.py --profiles sync gthread --clients 32 --duration 20 \
+        --user fleetmanager --password manager123 --paths /dashboard /jobs/table
+"""
+import argparse
+import http.cookiejar
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def wait_for_server(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'{base_url}/login', timeout=2)
+            return True
+        except Exception:
+            time.sleep(0.3)
+    return False
+
+
+def make_opener(base_url, user, password):
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    if user:
+        # The login page embeds the CSRF token in a meta tag
+        page = opener.open(f'{base_url}/login').read().decode()
+        token = ''
+        marker = 'name="csrf-token" content="'
+        if marker in page:
+            token = page.split(marker, 1)[1].split('"', 1)[0]
+        body = urllib.parse.urlencode({'username': user, 'password': password, 'csrf_token': token}).encode()
+        opener.open(f'{base_url}/login', data=body)
+    return opener
+
+
+def run_clients(base_url, paths, clients, duration, user, password):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def worker():
+        opener = make_opener(base_url, user, password)
+        local = []
+        i = 0
+        while time.time() < stop_at:
+            path = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                opener.open(f'{base_url}{path}', timeout=30).read()
+                local.append(time.perf_counter() - started)
+            except (urllib.error.URLError, OSError):
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0]
+
+
+def summarize(profile, latencies, errors, duration):
+    if not latencies:
+        return f'{profile:<8} no successful requests ({errors} errors)'
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return (f'{profile:<8} {len(latencies) / duration:8.1f} req/s   '
+            f'p50 {statistics.median(latencies) * 1000:7.1f} ms   '
+            f'p95 {p95 * 1000:7.1f} ms   errors {errors}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=int, default=10)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--user', default=os.environ.get('LOAD_TEST_USER'))
+    parser.add_argument('--password', default=os.environ.get('LOAD_TEST_PASSWORD'))
+    parser.add_argument('--paths', nargs='+', default=None)
+    args = parser.parse_args()
+
+    paths = args.paths or (['/dashboard', '/jobs/table', '/drivers'] if args.user else ['/login'])
+    base_url = f'http://127.0.0.1:{args.port}'
+    results = []
+
+    for profile in args.profiles:
+        env = dict(os.environ,
+                   PORT=str(args.port),
+                   GUNICORN_PROFILE=profile,
+                   WEB_CONCURRENCY=str(args.workers),
+                   GUNICORN_THREADS=str(args.threads),
+                   GUNICORN_LOG_LEVEL='warning')
+        proc = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--access-logfile', os.devnull, 'app:app'],
+            cwd=ROOT, env=env)
+        try:
+            if not wait_for_server(base_url):
+                results.append(f'{profile:<8} server did not start')
+                continue
+            latencies, errors = run_clients(base_url, paths, args.clients, args.duration, args.user, args.password)
+            results.append(summarize(profile, latencies, errors, args.duration))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    print(f'\n{args.workers} workers, {args.clients} clients, {args.duration}s per profile, paths: {" ".join(paths)}')
+    print('-' * 78)
+    for line in results:
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
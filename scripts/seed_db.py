@@ -99,9 +99,11 @@ with app.app_context():
     db.session.add_all([fleet_manager, system_admin, fleet_employee, accountant, customer_service])
     db.session.commit()
     
-    # Print created users for verification
+    # Print created users for verification, then replace the plaintext with hashes
     for user in [fleet_manager, system_admin, fleet_employee, accountant, customer_service]:
         print(f"{user.username}, Password: {user.password}")
+        user.set_password(user.password)
+    db.session.commit()
 
     # Vehicles
     vehicle1 = get_or_create(Vehicle, number='SGX1234A', defaults={'name': 'Toyota Hiace', 'type': '13-Seater', 'status': 'Active'})
@@ -0,0 +1,217 @@
+"""
+Static asset pipeline.
+
+`flask build-assets` does three things:
+
+  1. vendors the third-party files base.html used to load from jsdelivr and
+     unpkg into static/vendor/ (VENDOR below; files already there are kept),
+  2. copies every file under static/ to static/dist/ with a content hash in
+     its name (css/style.css -> css/style.3f9c0a1b2d4e.css), rewriting url()
+     references inside CSS to the hashed names, and writes
+     static/dist/manifest.json,
+  3. stores a .gz next to every compressible file, and a .br too when the
+     optional brotli package is installed.
+
+Templates link assets with asset_url('css/style.css'). Once a manifest
+exists, this returns /assets/<hashed name>. That URL changes whenever the
+content does. A WSGI middleware in front of Flask serves /assets with the .br
+or .gz variant the client accepts and Cache-Control: public,
+max-age=31536000, immutable. It sets no session cookie and sends no
+Vary: Cookie. Without a build, asset_url falls back to /static/<name>, or to
+the CDN URL for vendored files that were never fetched. A reverse proxy can
+also serve static/dist directly (nginx: gzip_static on).
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import urllib.request
+
+from flask import url_for
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+from werkzeug.utils import send_from_directory
+from werkzeug.wrappers import Request
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# static/ path -> where it was loaded from before vendoring
+VENDOR = {
+    'vendor/bootstrap/bootstrap.min.css': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css',
+    'vendor/bootstrap/bootstrap.bundle.min.js':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js',
+    'vendor/bootstrap-icons/bootstrap-icons.css':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/bootstrap-icons.css',
+    'vendor/bootstrap-icons/fonts/bootstrap-icons.woff2':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/fonts/bootstrap-icons.woff2',
+    'vendor/bootstrap-icons/fonts/bootstrap-icons.woff':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/fonts/bootstrap-icons.woff',
+    'vendor/htmx/htmx.min.js': 'https://unpkg.com/htmx.org@1.9.2/dist/htmx.min.js',
+}
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.ico', '.ttf', '.eot')
+# Smaller files aren't worth a compressed copy
+MIN_COMPRESS_BYTES = 512
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def fetch_vendor(static_folder, log=print):
+    """Download the VENDOR files missing from static_folder; returns how many were fetched."""
+    fetched = 0
+    for path, source in VENDOR.items():
+        target = os.path.join(static_folder, path)
+        if os.path.exists(target):
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with urllib.request.urlopen(source, timeout=30) as response:
+            data = response.read()
+        with open(target + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(target + '.tmp', target)
+        log(f'vendored {path} ({len(data)} bytes)')
+        fetched += 1
+    return fetched
+
+
+def hashed_name(path, data):
+    root, ext = posixpath.splitext(path)
+    return f'{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+
+
+def _rewrite_css(path, css, manifest):
+    """Point relative url()s in the CSS at path to their hashed names."""
+    def replace(match):
+        quote, url = match.groups()
+        target, sep, suffix = re.match(r'([^?#]*)([?#]?)(.*)', url).groups()
+        if target.startswith(('data:', 'http:', 'https:', '//', '/')):
+            return match.group(0)
+        resolved = posixpath.normpath(posixpath.join(posixpath.dirname(path), target))
+        if resolved not in manifest:
+            return match.group(0)
+        relative = posixpath.relpath(manifest[resolved], posixpath.dirname(path) or '.')
+        return f'url({quote}{relative}{sep}{suffix}{quote})'
+    return CSS_URL.sub(replace, css)
+
+
+def _compress(target, data):
+    if len(data) < MIN_COMPRESS_BYTES or not target.endswith(COMPRESSIBLE):
+        return
+    with open(target + '.gz', 'wb') as f:
+        # mtime=0 keeps builds of the same content byte-identical
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(target + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def build_dist(static_folder):
+    """Write hashed, precompressed copies of static_folder into static_folder/dist; returns the manifest."""
+    sources = []
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder:
+            dirs[:] = [d for d in dirs if d not in (DIST, DIST + '.tmp')]
+        for name in files:
+            if not name.endswith('.tmp'):
+                sources.append(os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/'))
+    # CSS last, so the files it references already have their hashed names
+    sources.sort(key=lambda path: (path.endswith('.css'), path))
+
+    staging = os.path.join(static_folder, DIST + '.tmp')
+    shutil.rmtree(staging, ignore_errors=True)
+    manifest = {}
+    for path in sources:
+        with open(os.path.join(static_folder, path), 'rb') as f:
+            data = f.read()
+        if path.endswith('.css'):
+            data = _rewrite_css(path, data.decode('utf-8'), manifest).encode('utf-8')
+        manifest[path] = hashed_name(path, data)
+        target = os.path.join(staging, manifest[path])
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(data)
+        _compress(target, data)
+    with open(os.path.join(staging, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+    dist = os.path.join(static_folder, DIST)
+    shutil.rmtree(dist, ignore_errors=True)
+    os.replace(staging, dist)
+    return manifest
+
+
+class AssetMiddleware:
+    """Serves /assets/ from static/dist in front of Flask: no session, hooks or database for a file."""
+
+    prefix = '/assets/'
+
+    def __init__(self, wsgi_app, dist, max_age):
+        self.wsgi_app = wsgi_app
+        self.dist = dist
+        self.max_age = max_age
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not path.startswith(self.prefix) or environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            return self.wsgi_app(environ, start_response)
+        filename = path[len(self.prefix):]
+        encodings = Request(environ).accept_encodings
+        try:
+            for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+                if encodings[encoding] and os.path.isfile(safe_join(self.dist, filename + suffix) or ''):
+                    # Type from the original name; send_file would guess from the suffix
+                    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                    response = send_from_directory(self.dist, filename + suffix, environ, mimetype=mimetype,
+                                                   max_age=self.max_age)
+                    response.headers['Content-Encoding'] = encoding
+                    break
+            else:
+                response = send_from_directory(self.dist, filename, environ, max_age=self.max_age)
+        except NotFound as e:
+            return e(environ, start_response)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response(environ, start_response)
+
+
+class Assets:
+    def __init__(self):
+        self.static_folder = None
+        self.manifest = {}
+        self.unvendored = set()
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        self.load_manifest()
+        # URL building only; AssetMiddleware answers these requests before they reach Flask
+        app.add_url_rule(AssetMiddleware.prefix + '<path:filename>', 'assets', build_only=True)
+        app.wsgi_app = AssetMiddleware(app.wsgi_app, os.path.join(self.static_folder, DIST),
+                                       app.config.get('ASSETS_MAX_AGE', 31536000))
+        app.jinja_env.globals['asset_url'] = self.url
+
+    def load_manifest(self):
+        try:
+            with open(os.path.join(self.static_folder, DIST, MANIFEST)) as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+        self.unvendored = {path for path in VENDOR if not os.path.exists(os.path.join(self.static_folder, path))}
+
+    def url(self, path):
+        """URL for a file under static/: hashed when built, else plain static or the CDN for unvendored files."""
+        if path in self.manifest:
+            return url_for('assets', filename=self.manifest[path])
+        if path in self.unvendored:
+            return VENDOR[path]
+        return url_for('static', filename=path)
+
+
+assets = Assets()
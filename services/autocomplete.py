@@ -0,0 +1,148 @@
+"""
+In-memory autocomplete for locations, customer names and passenger names.
+
+Each index keeps the distinct values of its columns in a sorted list of
+lowercased keys plus a usage count, so a prefix lookup is two bisects and a
+top-k over the matching slice, with no database round-trip. Indexes are built
+per worker on first use from GROUP BY counts, updated in place when jobs are
+committed through db.session, and rebuilt every AUTOCOMPLETE_REFRESH_SECONDS
+to pick up writes made by other workers.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+
+from sqlalchemy import func, inspect
+
+from extensions import db
+from models import Job
+from services.invalidation import on_commit
+
+# index name -> Job columns that feed it
+INDEX_COLUMNS = {
+    'location': ('pickup_location', 'dropoff_location'),
+    'customer': ('customer_name',),
+    'passenger': ('passenger_name',),
+}
+INDEXED_COLUMNS = [column for columns in INDEX_COLUMNS.values() for column in columns]
+
+
+def _normalize(value):
+    return ' '.join(value.split()).lower()
+
+
+class PrefixIndex:
+    """Sorted array of normalized keys with bisect prefix search and usage counts."""
+
+    def __init__(self):
+        self._keys = []
+        self._entries = {}  # key -> [display value, count]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def load(self, counts):
+        """Replace the contents from an iterable of (value, count)."""
+        entries = {}
+        for value, count in counts:
+            if not value or not value.strip():
+                continue
+            key = _normalize(value)
+            entry = entries.get(key)
+            if entry:
+                entry[1] += count
+                # Show the most common spelling
+                if count > entry[2]:
+                    entry[0], entry[2] = value.strip(), count
+            else:
+                entries[key] = [value.strip(), count, count]
+        with self._lock:
+            self._entries = {key: [display, total] for key, (display, total, _) in entries.items()}
+            self._keys = sorted(self._entries)
+
+    def add(self, value, count=1):
+        if not value or not value.strip():
+            return
+        key = _normalize(value)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                entry[1] += count
+            else:
+                self._entries[key] = [value.strip(), count]
+                insort(self._keys, key)
+
+    def search(self, prefix, limit=10):
+        """Most used values starting with prefix (case and whitespace insensitive)."""
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            lo = bisect_left(self._keys, prefix)
+            hi = bisect_left(self._keys, prefix + '\uffff', lo)
+            entries = self._entries
+            top = heapq.nlargest(limit, self._keys[lo:hi], key=lambda k: entries[k][1])
+            return [(entries[k][0], entries[k][1]) for k in top]
+
+
+class AutocompleteService:
+    def __init__(self):
+        self.indexes = {name: PrefixIndex() for name in INDEX_COLUMNS}
+        self._built_at = None
+        self._build_lock = threading.Lock()
+        self.refresh_seconds = 600
+
+    def init_app(self, app):
+        self.refresh_seconds = app.config.get('AUTOCOMPLETE_REFRESH_SECONDS', 600)
+
+    def rebuild(self):
+        for name, columns in INDEX_COLUMNS.items():
+            counts = []
+            for column_name in columns:
+                column = getattr(Job, column_name)
+                counts.extend(db.session.query(column, func.count()).filter(column.isnot(None)).group_by(column).all())
+            self.indexes[name].load(counts)
+        self._built_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._built_at is not None and time.monotonic() - self._built_at < self.refresh_seconds:
+            return
+        with self._build_lock:
+            if self._built_at is None or time.monotonic() - self._built_at >= self.refresh_seconds:
+                self.rebuild()
+
+    def suggest(self, index_name, prefix, limit=10):
+        self._ensure_fresh()
+        return self.indexes[index_name].search(prefix, limit)
+
+    def record_job(self, values):
+        """Fold a committed job's field values into the live indexes."""
+        if self._built_at is None:
+            return
+        for name, columns in INDEX_COLUMNS.items():
+            for column_name in columns:
+                self.indexes[name].add(values.get(column_name))
+
+
+autocomplete = AutocompleteService()
+
+
+def _job_values(job, op):
+    if op == 'new':
+        return {column: getattr(job, column) for column in INDEXED_COLUMNS}
+    if op == 'dirty':
+        # Only count values that actually changed on edit
+        state = inspect(job)
+        return {column: getattr(job, column) for column in INDEXED_COLUMNS
+                if state.attrs[column].history.has_changes()}
+    return None
+
+
+def _apply_job_values(pending):
+    for values in pending:
+        autocomplete.record_job(values)
+
+
+on_commit([Job], _apply_job_values, collect=_job_values)
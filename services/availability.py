@@ -0,0 +1,142 @@
+"""
+Driver and vehicle availability.
+
+Every booked job with a driver or vehicle has one row in job_assignment holding its booked window: pickup date/time
+to pickup + JOB_DEFAULT_DURATION_MINUTES (default 120). Jobs with a date but
+no time book the whole day; jobs with no date book every window. The rows
+are written by mapper events in the same transaction as the job, so the
+table always matches the jobs committed through the ORM. `flask
+rebuild-assignments` recreates it after bulk SQL changes.
+
+A job books its driver and vehicle unless its order_status is in
+CLOSED_STATUSES. Jobs saved without a status (the add and bulk forms have no
+status input) book too. is_booked() and booked_clause() are the one
+definition of this rule, and the conflict checks (services/scheduling.py) and
+auto-dispatch use them as well.
+
+"Who is free between T1 and T2" is then an anti-join against the
+(driver_id, starts_at, ends_at) and (vehicle_id, starts_at, ends_at) indexes.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, insert, inspect, or_, select
+
+from extensions import db
+from models import Driver, Job, JobAssignment, Vehicle
+
+CLOSED_STATUSES = ('Completed', 'Cancelled')
+# Job columns that decide whether and when a job books its driver/vehicle
+ASSIGNMENT_FIELDS = ('order_status', 'driver_id', 'vehicle_id', 'pickup_date', 'pickup_time')
+
+
+def is_booked(order_status):
+    """Whether a job in order_status holds its driver and vehicle (None and '' do)."""
+    return order_status not in CLOSED_STATUSES
+
+
+def booked_clause(column=Job.order_status):
+    """SQL form of is_booked() over an order_status column."""
+    return column.is_(None) | column.notin_(CLOSED_STATUSES)
+
+
+def job_window(pickup_date, pickup_time, duration):
+    """Booked (start, end) for a job, or (None, None) if the pickup date is missing or unparseable."""
+    if not pickup_date:
+        return None, None
+    try:
+        day = datetime.strptime(pickup_date.strip(), '%Y-%m-%d')
+    except ValueError:
+        return None, None
+    if pickup_time:
+        for fmt in ('%H:%M', '%H:%M:%S', '%I:%M %p'):
+            try:
+                at = datetime.strptime(pickup_time.strip(), fmt)
+            except ValueError:
+                continue
+            start = day.replace(hour=at.hour, minute=at.minute, second=at.second)
+            return start, start + duration
+    return day, day + timedelta(days=1)
+
+
+class AvailabilityService:
+    def __init__(self):
+        self.duration = timedelta(minutes=120)
+
+    def init_app(self, app):
+        self.duration = timedelta(minutes=app.config.get('JOB_DEFAULT_DURATION_MINUTES', 120))
+
+    def assignment_values(self, job):
+        """job_assignment row for a job, or None if it doesn't book anyone."""
+        if not is_booked(job.order_status) or not (job.driver_id or job.vehicle_id):
+            return None
+        starts_at, ends_at = job_window(job.pickup_date, job.pickup_time, self.duration)
+        return {'job_id': job.id, 'driver_id': job.driver_id, 'vehicle_id': job.vehicle_id,
+                'starts_at': starts_at, 'ends_at': ends_at}
+
+    @staticmethod
+    def _busy(column, start=None, end=None):
+        """Ids in column booked at any point in [start, end), or booked at all when no window is given."""
+        query = select(column).where(column.isnot(None))
+        if start is not None and end is not None:
+            query = query.where(or_(JobAssignment.starts_at.is_(None),
+                                    (JobAssignment.starts_at < end) & (JobAssignment.ends_at > start)))
+        return query
+
+    def busy_driver_ids(self, start=None, end=None):
+        return self._busy(JobAssignment.driver_id, start, end)
+
+    def busy_vehicle_ids(self, start=None, end=None):
+        return self._busy(JobAssignment.vehicle_id, start, end)
+
+    def free_drivers(self, start=None, end=None):
+        """Driver query excluding drivers booked in the window (or on any booked job)."""
+        return Driver.query.filter(~Driver.id.in_(self.busy_driver_ids(start, end)))
+
+    def free_vehicles(self, start=None, end=None):
+        """Vehicle query excluding vehicles booked in the window (or on any booked job)."""
+        return Vehicle.query.filter(~Vehicle.id.in_(self.busy_vehicle_ids(start, end)))
+
+    def sync(self, job_ids):
+        """Rewrite the job_assignment rows of job_ids after a bulk UPDATE, which skips the mapper events."""
+        jobs = db.session.execute(
+            select(Job.id, Job.driver_id, Job.vehicle_id, Job.order_status, Job.pickup_date, Job.pickup_time)
+            .where(Job.id.in_(job_ids))).all()
+        rows = [values for values in map(self.assignment_values, jobs) if values]
+        db.session.execute(delete(JobAssignment).where(JobAssignment.job_id.in_(job_ids)))
+        if rows:
+            db.session.execute(insert(JobAssignment), rows)
+
+    def rebuild(self):
+        """Recreate job_assignment from the jobs table; returns the number of rows written."""
+        jobs = db.session.execute(
+            select(Job.id, Job.driver_id, Job.vehicle_id, Job.order_status, Job.pickup_date, Job.pickup_time)
+            .where(booked_clause())).all()
+        rows = [values for values in map(self.assignment_values, jobs) if values]
+        db.session.execute(delete(JobAssignment))
+        if rows:
+            db.session.execute(insert(JobAssignment), rows)
+        db.session.commit()
+        return len(rows)
+
+
+availability = AvailabilityService()
+
+
+@event.listens_for(Job, 'after_update')
+def _sync_assignment_on_update(mapper, connection, job):
+    state = inspect(job)
+    if any(state.attrs[field].history.has_changes() for field in ASSIGNMENT_FIELDS):
+        _sync_assignment(mapper, connection, job)
+
+
+@event.listens_for(Job, 'after_insert')
+def _sync_assignment(mapper, connection, job):
+    connection.execute(delete(JobAssignment).where(JobAssignment.job_id == job.id))
+    values = availability.assignment_values(job)
+    if values:
+        connection.execute(insert(JobAssignment).values(**values))
+
+
+@event.listens_for(Job, 'after_delete')
+def _drop_assignment(mapper, connection, job):
+    connection.execute(delete(JobAssignment).where(JobAssignment.job_id == job.id))
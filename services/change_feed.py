@@ -0,0 +1,282 @@
+"""
+Change feed for the live job board.
+
+Every flush that inserts, updates or deletes a Job or Billing row also writes
+a change_event row in the same transaction, so the outbox can never disagree
+with what was committed. Updates record the names of the changed columns,
+never their values. Browsers get only table, row id and operation, and then
+fetch the row through the normal, permission-checked views; the job board
+collects the ids of half a second and fetches their rows in one request
+(/jobs/rows), so a burst of changes is not one request per change per open
+board. ORM bulk
+statements (recurring jobs, dispatch) write a single 'bulk' event without a
+row id, and pages reload the table when they receive one.
+
+/api/changes/stream is a Server-Sent Events endpoint. In each worker, one
+poller thread runs while at least one browser is connected. It reads new
+change_event rows once per CHANGE_FEED_POLL_SECONDS (default 1) and keeps the
+last CHANGE_FEED_BUFFER events (default 1000) in memory. Every stream in
+that worker is served from this buffer, so the database sees one query per
+interval per worker whatever the number of open dashboards.
+
+The event id is the change_event id. A reconnecting EventSource sends it back
+as Last-Event-ID and resumes from the buffer. When its id has already left
+the buffer, the stream sends 'reset' and the page reloads what it shows.
+Streams close after CHANGE_FEED_STREAM_SECONDS (default 300) so workers can
+be recycled, and the browser reconnects on its own.
+
+An open stream holds a gthread worker thread, which would otherwise serve
+ordinary requests. CHANGE_FEED_MAX_STREAMS caps the streams per worker, and a
+browser over the cap gets 503 with a retry hint and tries again later. The
+default leaves most of a worker for ordinary requests: half of
+GUNICORN_THREADS under gthread, 0 (feed off) under sync, and 500 under
+gevent, where a stream is only a greenlet.
+
+Ids are handed out when a transaction inserts, not when it commits. On
+PostgreSQL a lower id can therefore become visible after a higher one. The
+poller keeps re-reading such a gap for CHANGE_FEED_GAP_SECONDS (default 10)
+before it gives up on it, as it does for ids of rolled back transactions.
+`flask prune-changes` deletes events older than CHANGE_FEED_RETENTION_HOURS
+(default 24).
+"""
+import importlib.util
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, event, func, inspect, insert, select
+
+from extensions import db
+from models import Billing, ChangeEvent, Job
+from services.db_routing import RoutingSession
+
+FEED_TABLES = frozenset({Job.__tablename__, Billing.__tablename__})
+HEARTBEAT_SECONDS = 15
+POLL_BATCH = 500
+# Seconds an over-the-cap browser waits before trying again
+BUSY_RETRY_SECONDS = 30
+
+
+def default_max_streams():
+    """Streams per worker that leave it room for ordinary requests, by gunicorn profile (gunicorn.conf.py)."""
+    profile = os.environ.get('GUNICORN_PROFILE', 'gthread').lower()
+    if profile == 'gevent' and importlib.util.find_spec('gevent') is not None:
+        return 500
+    if profile == 'sync':
+        return 0
+    return int(os.environ.get('GUNICORN_THREADS', 4)) // 2
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _changed_columns(obj):
+    """Names of the columns of obj changed in this flush."""
+    state = inspect(obj)
+    return [attr.key for attr in state.mapper.column_attrs
+            if state.attrs[attr.key].history.has_changes()]
+
+
+def _event_row(table, op, row_id=None, columns=None):
+    return {'table_name': table, 'row_id': row_id, 'op': op, 'created_at': _utcnow(),
+            'changes': json.dumps(columns) if columns else None}
+
+
+def sse_message(change):
+    # No column values: every logged-in browser receives every event
+    payload = {'table': change.table_name, 'row': change.row_id, 'op': change.op}
+    return f'id: {change.id}\nevent: change\ndata: {json.dumps(payload, separators=(",", ":"))}\n\n'
+
+
+class ChangeFeed:
+    def __init__(self):
+        self.poll_seconds = 1.0
+        self.gap_seconds = 10
+        self.stream_seconds = 300
+        self.max_streams = 2
+        self.retention = timedelta(hours=24)
+        self.app = None
+        self._buffer = deque(maxlen=1000)  # (sequence, event id, message)
+        self._sequence = 0
+        self._reset()
+        self._subscribers = 0
+        self._thread = None
+        self._cond = threading.Condition()
+
+    def init_app(self, app):
+        self.app = app
+        self.poll_seconds = app.config.get('CHANGE_FEED_POLL_SECONDS', 1.0)
+        self.gap_seconds = app.config.get('CHANGE_FEED_GAP_SECONDS', 10)
+        self.stream_seconds = app.config.get('CHANGE_FEED_STREAM_SECONDS', 300)
+        max_streams = app.config.get('CHANGE_FEED_MAX_STREAMS')
+        self.max_streams = default_max_streams() if max_streams is None else max_streams
+        self.retention = timedelta(hours=app.config.get('CHANGE_FEED_RETENTION_HOURS', 24))
+        self._buffer = deque(maxlen=app.config.get('CHANGE_FEED_BUFFER', 1000))
+
+    def _reset(self):
+        self.settled = None  # every id up to here has been read or given up on
+        self.floor = None  # the head when polling started; older events were never buffered
+        self.evicted = 0  # highest event id pushed out of the buffer
+        self._buffer.clear()
+        self._seen = set()  # read ids above settled
+        self._gaps = {}  # missing id above settled -> monotonic time first noticed
+
+    def poll(self):
+        """Read change_event rows after the settled cursor into the buffer; returns how many were new."""
+        if self.settled is None:
+            # Start at the head: history before the first subscriber is the pages' initial render
+            head = db.session.execute(select(func.max(ChangeEvent.id))).scalar() or 0
+            with self._cond:
+                self.settled = self.floor = head
+                self._cond.notify_all()
+            return 0
+        rows = db.session.execute(select(ChangeEvent).where(ChangeEvent.id > self.settled)
+                                  .order_by(ChangeEvent.id).limit(POLL_BATCH)).scalars().all()
+        fresh = [row for row in rows if row.id not in self._seen]
+        with self._cond:
+            for row in fresh:
+                if len(self._buffer) == self._buffer.maxlen:
+                    self.evicted = max(self.evicted, self._buffer[0][1])
+                self._sequence += 1
+                self._buffer.append((self._sequence, row.id, sse_message(row)))
+            if fresh:
+                self._cond.notify_all()
+        self._advance([row.id for row in fresh], time.monotonic())
+        return len(fresh)
+
+    def _advance(self, ids, now):
+        self._seen.update(ids)
+        top = max(self._seen, default=self.settled)
+        for missing in range(self.settled + 1, top):
+            if missing not in self._seen:
+                self._gaps.setdefault(missing, now)
+        while True:
+            next_id = self.settled + 1
+            if next_id in self._seen:
+                # Read late: no longer a gap
+                self._seen.discard(next_id)
+                self._gaps.pop(next_id, None)
+            elif next_id in self._gaps and now - self._gaps[next_id] >= self.gap_seconds:
+                del self._gaps[next_id]
+            else:
+                break
+            self.settled = next_id
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            try:
+                with self.app.app_context():
+                    self.poll()
+            except Exception as e:
+                self.app.logger.error(f'Change feed poll failed: {str(e)}')
+            time.sleep(self.poll_seconds)
+
+    def subscribe(self):
+        """Take a stream slot in this worker; False when CHANGE_FEED_MAX_STREAMS are already open."""
+        with self._cond:
+            if self._subscribers >= self.max_streams:
+                return False
+            self._subscribers += 1
+            if self._thread is None:
+                # Nobody listened since the last thread stopped: start again from the head
+                self._reset()
+                self._thread = threading.Thread(target=self._run, name='change-feed', daemon=True)
+                self._thread.start()
+            return True
+
+    def unsubscribe(self):
+        with self._cond:
+            self._subscribers -= 1
+
+    def _start(self, last_id):
+        """Buffer sequence to stream after, or None when events after last_id are no longer buffered."""
+        with self._cond:
+            if last_id is None:
+                return self._sequence
+            if last_id < self.floor or last_id < self.evicted:
+                return None
+            # Resume after the events the client already has
+            for sequence, event_id, _ in self._buffer:
+                if event_id > last_id:
+                    return sequence - 1
+            return self._sequence
+
+    def stream(self, last_id=None):
+        """SSE messages for one browser that holds a subscribe() slot.
+
+        New changes, heartbeats, and a reset when it fell too far behind. The
+        caller releases the slot with unsubscribe() when the response closes,
+        which also covers a stream that never started.
+        """
+        yield f'retry: {int(self.poll_seconds * 1000) + 1000}\n\n'
+        with self._cond:
+            while self.settled is None:
+                self._cond.wait(self.poll_seconds)
+        position = self._start(last_id)
+        if position is None:
+            yield 'event: reset\ndata: {}\n\n'
+            position = self._sequence
+        deadline = time.monotonic() + self.stream_seconds
+        while time.monotonic() < deadline:
+            with self._cond:
+                if not self._buffer or self._buffer[-1][0] <= position:
+                    self._cond.wait(HEARTBEAT_SECONDS)
+                pending = [item for item in self._buffer if item[0] > position]
+                dropped = bool(self._buffer) and self._buffer[0][0] > position + 1
+            if dropped:
+                # This client fell behind the buffer between two waits
+                yield 'event: reset\ndata: {}\n\n'
+            if pending:
+                position = pending[-1][0]
+                yield ''.join(message for _, _, message in pending)
+            elif not dropped:
+                yield ': keepalive\n\n'
+
+    def prune(self, now=None):
+        """Delete events older than the retention window; returns how many."""
+        cutoff = (now or _utcnow()) - self.retention
+        result = db.session.execute(delete(ChangeEvent).where(ChangeEvent.created_at < cutoff))
+        db.session.commit()
+        return result.rowcount
+
+
+change_feed = ChangeFeed()
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _record_flushed_changes(session, flush_context):
+    rows = []
+    for obj in session.new:
+        if obj.__table__.name in FEED_TABLES:
+            rows.append(_event_row(obj.__table__.name, 'insert', obj.id))
+    for obj in session.dirty:
+        if obj.__table__.name in FEED_TABLES:
+            columns = _changed_columns(obj)
+            if columns:
+                rows.append(_event_row(obj.__table__.name, 'update', obj.id, columns))
+    for obj in session.deleted:
+        if obj.__table__.name in FEED_TABLES:
+            rows.append(_event_row(obj.__table__.name, 'delete', obj.id))
+    if rows:
+        session.connection().execute(insert(ChangeEvent.__table__), rows)
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _record_bulk_changes(orm_execute_state):
+    # ORM bulk INSERT/UPDATE/DELETE statements skip the flush hooks
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.local_table.name not in FEED_TABLES:
+        return None
+    connection = orm_execute_state.session.connection(bind_arguments=orm_execute_state.bind_arguments)
+    connection.execute(insert(ChangeEvent.__table__), [_event_row(mapper.local_table.name, 'bulk')])
+    return None
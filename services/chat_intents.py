@@ -0,0 +1,158 @@
+"""
+Intent engine for the chat assistant.
+
+A message is tokenized once and matched against precompiled keyword tables,
+so routing no longer depends on the order of a chain of re.search calls
+("unpaid" is its own token and never matches "paid"). parse() returns an
+Intent with the handler name and the slots the handlers need:
+
+    status      order status filter: active, pending, new, in_progress,
+                completed, cancelled
+    payment     payment status filter: paid, unpaid
+    available   True for "available drivers/vehicles"
+    date_range  (label, start, end) with ISO date strings, inclusive
+    limit       requested number of rows
+    agent_name  words after "agent", e.g. "jobs for agent acme travel"
+    driver_name words after "driver", e.g. "completed jobs by driver john tan"
+"""
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+
+Intent = namedtuple('Intent', 'name slots')
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Multi-word phrases are matched with one combined alternation before tokenizing
+PHRASES = {
+    'in progress': ('status', 'in_progress'),
+    'what can you do': ('intent', 'help'),
+    'this week': ('date_range', 'this_week'),
+    'last week': ('date_range', 'last_week'),
+    'this month': ('date_range', 'this_month'),
+    'last month': ('date_range', 'last_month'),
+}
+PHRASE_RE = re.compile(r'\b(' + '|'.join(re.escape(p).replace(r'\ ', r'\s+') for p in PHRASES) + r')\b')
+
+# Intent keywords in priority order: when a message names several entities the
+# first one listed wins ("payment status" is a payment query).
+INTENT_KEYWORDS = (
+    ('jobs', {'job', 'jobs'}),
+    ('drivers', {'driver', 'drivers'}),
+    ('vehicles', {'vehicle', 'vehicles'}),
+    ('agents', {'agent', 'agents'}),
+    ('services', {'service', 'services'}),
+    ('billing', {'billing', 'billin', 'invoice', 'invoices'}),
+    ('payment', {'payment', 'payments'}),
+    ('status', {'status'}),
+    ('dashboard', {'dashboard', 'summary', 'overview'}),
+    ('help', {'help'}),
+)
+INTENT_PRIORITY = {name: rank for rank, (name, _) in enumerate(INTENT_KEYWORDS)}
+KEYWORD_INTENTS = {word: name for name, words in INTENT_KEYWORDS for word in words}
+
+SLOT_KEYWORDS = {
+    'active': ('status', 'active'),
+    'pending': ('status', 'pending'),
+    'new': ('status', 'new'),
+    'completed': ('status', 'completed'),
+    'complete': ('status', 'completed'),
+    'cancelled': ('status', 'cancelled'),
+    'canceled': ('status', 'cancelled'),
+    'paid': ('payment', 'paid'),
+    'unpaid': ('payment', 'unpaid'),
+    'available': ('available', True),
+    'free': ('available', True),
+    'today': ('date_range', 'today'),
+    'yesterday': ('date_range', 'yesterday'),
+    'tomorrow': ('date_range', 'tomorrow'),
+}
+
+# "agent <name>" / "driver <name>"; the name runs until the next keyword or filler word
+NAME_SLOTS = {'agent': 'agent_name', 'driver': 'driver_name'}
+NAME_STOP_WORDS = {'for', 'by', 'with', 'from', 'on', 'in', 'at', 'of', 'and', 'the', 'to',
+                   'top', 'first', 'last', 'latest', 'recent', 'show', 'list', 'limit', 'all'}
+
+LIMIT_RE = re.compile(
+    r'\b(?:top|first|last|latest|recent|show|limit)\s+(\d{1,4})\b'
+    r'|\b(\d{1,4})\s+(?:jobs?|drivers?|vehicles?|agents?|services?|records?|invoices?)\b')
+MAX_LIMIT = 500
+
+
+def resolve_date_range(label, today=None):
+    """Turn a date-range label into (label, start, end) ISO strings, inclusive."""
+    today = today or date.today()
+    if label == 'today':
+        start = end = today
+    elif label == 'yesterday':
+        start = end = today - timedelta(days=1)
+    elif label == 'tomorrow':
+        start = end = today + timedelta(days=1)
+    elif label == 'this_week':
+        start = today - timedelta(days=today.weekday())
+        end = start + timedelta(days=6)
+    elif label == 'last_week':
+        start = today - timedelta(days=today.weekday() + 7)
+        end = start + timedelta(days=6)
+    elif label == 'this_month':
+        start = today.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    elif label == 'last_month':
+        end = today.replace(day=1) - timedelta(days=1)
+        start = end.replace(day=1)
+    else:
+        raise ValueError(f'Unknown date range: {label}')
+    return label, start.isoformat(), end.isoformat()
+
+
+def parse(message, today=None):
+    """Route a chat message to an Intent(name, slots); name is None when nothing matched."""
+    text = (message or '').lower()
+    slots = {}
+    intent_name = None
+
+    for phrase in PHRASE_RE.findall(text):
+        kind, value = PHRASES[' '.join(phrase.split())]
+        if kind == 'intent':
+            intent_name = value
+        else:
+            slots[kind] = value
+    text = PHRASE_RE.sub(' ', text)
+
+    best_rank = len(INTENT_KEYWORDS)
+    if intent_name:
+        best_rank = INTENT_PRIORITY[intent_name]
+    tokens = TOKEN_RE.findall(text)
+    for token in tokens:
+        name = KEYWORD_INTENTS.get(token)
+        if name is not None and INTENT_PRIORITY[name] < best_rank:
+            intent_name, best_rank = name, INTENT_PRIORITY[name]
+        slot = SLOT_KEYWORDS.get(token)
+        if slot is not None:
+            slots[slot[0]] = slot[1]
+
+    for i, token in enumerate(tokens):
+        slot_name = NAME_SLOTS.get(token)
+        if slot_name is None:
+            continue
+        words = []
+        for word in tokens[i + 1:]:
+            if word in KEYWORD_INTENTS or word in SLOT_KEYWORDS or word in NAME_STOP_WORDS or word.isdigit():
+                break
+            words.append(word)
+        if words:
+            slots[slot_name] = ' '.join(words)
+
+    match = LIMIT_RE.search(text)
+    if match:
+        slots['limit'] = max(1, min(int(match.group(1) or match.group(2)), MAX_LIMIT))
+
+    if 'date_range' in slots:
+        slots['date_range'] = resolve_date_range(slots['date_range'], today)
+
+    # "job status" asks for the status breakdown, not a list of jobs
+    if intent_name == 'jobs' and 'status' in tokens \
+            and 'status' not in slots and 'payment' not in slots:
+        intent_name = 'status'
+
+    return Intent(intent_name, slots)
@@ -0,0 +1,82 @@
+"""
+Cached counts behind the chat status, payment and dashboard summaries.
+
+A snapshot is two round-trips: one GROUP BY order_status, payment_status over
+jobs and one SELECT of scalar COUNT subqueries for the driver, vehicle and
+agent totals. It is kept per worker for CHAT_SUMMARY_TTL seconds (default 30)
+and dropped early when this worker commits a change to one of those tables.
+"""
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import func, select
+
+from extensions import db
+from models import Agent, Driver, Job, Vehicle
+from services.invalidation import on_commit
+
+ACTIVE_STATUSES = ('New', 'In Progress')
+SUMMARY_MODELS = (Job, Driver, Vehicle, Agent)
+
+
+class Summary:
+    """Job counts by order and payment status plus entity totals."""
+
+    def __init__(self, rows, totals):
+        self.by_order_status = Counter()
+        self.by_payment_status = Counter()
+        for order_status, payment_status, count in rows:
+            self.by_order_status[order_status] += count
+            self.by_payment_status[payment_status] += count
+        self.total_jobs = sum(self.by_order_status.values())
+        self.total_drivers, self.total_vehicles, self.total_agents = totals
+
+    @property
+    def active_jobs(self):
+        return sum(self.by_order_status[status] for status in ACTIVE_STATUSES)
+
+
+class ChatSummaryService:
+    def __init__(self):
+        self._summary = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+        self.ttl = 30
+
+    def init_app(self, app):
+        self.ttl = app.config.get('CHAT_SUMMARY_TTL', 30)
+
+    def load(self):
+        rows = db.session.execute(
+            select(Job.order_status, Job.payment_status, func.count())
+            .group_by(Job.order_status, Job.payment_status)).all()
+        totals = db.session.execute(select(
+            select(func.count()).select_from(Driver).scalar_subquery(),
+            select(func.count()).select_from(Vehicle).scalar_subquery(),
+            select(func.count()).select_from(Agent).scalar_subquery())).one()
+        return Summary(rows, totals)
+
+    def get(self):
+        """Return the cached Summary, reloading it once the TTL has passed."""
+        summary = self._summary
+        if summary is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return summary
+        with self._lock:
+            if self._summary is None or time.monotonic() - self._loaded_at >= self.ttl:
+                self._summary = self.load()
+                self._loaded_at = time.monotonic()
+            return self._summary
+
+    def invalidate(self):
+        self._summary = None
+
+
+chat_summary = ChatSummaryService()
+
+
+def _invalidate_summary(changes):
+    chat_summary.invalidate()
+
+
+on_commit(SUMMARY_MODELS, _invalidate_summary)
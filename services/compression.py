@@ -0,0 +1,121 @@
+"""
+Response compression.
+
+An after_request hook compresses text responses (HTML pages and HTMX
+partials, JSON, CSV exports, the chat event stream) for clients that accept
+it: brotli when the optional brotli package is installed and the client sends
+br, otherwise gzip.
+
+  * Bodies under COMPRESS_MIN_SIZE bytes (default 500) are sent as they are,
+    and so are responses that are already compressed: xlsx (a zip), images,
+    send_file passthroughs, anything with a Content-Encoding.
+  * BREACH: a page that renders the CSRF token is sent uncompressed when the
+    request carried input (a query string or a form post) that the page may
+    echo. Otherwise an attacker could guess the token byte by byte from
+    compressed sizes. Pages without the token, or requested without input,
+    are still compressed.
+  * Streamed responses are compressed chunk by chunk as the generator yields.
+    text/event-stream is flushed after every event, so the browser still
+    receives each one immediately.
+  * A strong ETag becomes weak, since the bytes differ per encoding;
+    If-None-Match compares weakly (services/conditional_get.py).
+
+COMPRESS_LEVEL (gzip, default 6) and COMPRESS_BR_LEVEL (default 4) trade
+CPU for size. Set COMPRESS=False when a reverse proxy already compresses.
+"""
+import gzip
+import zlib
+
+from flask import current_app, g, request
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml',
+                      'image/svg+xml')
+# Streams whose chunks must reach the client as soon as they are yielded
+FLUSHED_TYPES = ('text/event-stream',)
+
+
+def _exposes_csrf_token():
+    """True when the response carries this request's CSRF token next to input the client chose."""
+    if current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token') not in g:
+        return False
+    return bool(request.query_string) or request.method not in ('GET', 'HEAD', 'OPTIONS')
+
+
+def _choose_encoding(accept_encodings):
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress_stream(chunks, encoding, level, flush_each):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip framing
+        process, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = process(chunk)
+        if flush_each:
+            data += flush()
+        if data:
+            yield data
+    yield finish()
+
+
+class Compression:
+    def __init__(self):
+        self.min_size = 500
+        self.gzip_level = 6
+        self.br_level = 4
+
+    def init_app(self, app):
+        if not app.config.get('COMPRESS', True):
+            return
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+        self.gzip_level = app.config.get('COMPRESS_LEVEL', 6)
+        self.br_level = app.config.get('COMPRESS_BR_LEVEL', 4)
+        app.after_request(self.compress_response)
+
+    def compress_response(self, response):
+        if (request.method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 304)
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)
+                or response.cache_control.no_transform or _exposes_csrf_token()):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = _choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        level = self.br_level if encoding == 'br' else self.gzip_level
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, encoding, level,
+                                                 response.mimetype in FLUSHED_TYPES)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            if encoding == 'br':
+                response.set_data(brotli.compress(data, quality=level))
+            else:
+                response.set_data(gzip.compress(data, compresslevel=level, mtime=0))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+compression = Compression()
@@ -0,0 +1,138 @@
+"""
+Conditional GET for list pages and table partials.
+
+Every commit that inserts, updates or deletes rows bumps that table's row in
+table_version, in the same transaction: flushes through the after_flush
+hook, ORM bulk statements (dispatch, recurring jobs) through do_orm_execute.
+A view decorated with @conditional('job') first reads those counters, which
+is one primary-key query, and builds an ETag and Last-Modified from them. It
+returns 304 Not Modified without running its own queries or rendering a
+template when the browser already holds that version. The ETag covers:
+
+  * the versions of the tables the view reads;
+  * the URL with its filters and page, whether it is an HTMX partial and
+    which element it targets (the jobs table answers #jobs-rows with rows only);
+  * the user and their role names (base.html renders the navigation from them);
+  * a CONDITIONAL_GET_TTL time bucket (seconds, default 300), which bounds
+    staleness for writes made outside the app (manual SQL) and keeps the
+    CSRF tokens in cached pages well inside their time limit.
+
+Responses are sent with Cache-Control: private, no-cache, so browsers (and
+htmx's XHRs through them) revalidate every time and get a 304 whenever
+nothing changed. Requests with pending flashed messages are always rendered.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import Response, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from models import TableVersion
+from services.db_routing import RoutingSession
+
+VERSION_TABLE = TableVersion.__tablename__
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def bump(connection, tables):
+    """Increment the counters of tables on connection, inside the caller's transaction."""
+    table = TableVersion.__table__
+    now = _utcnow()
+    for name in sorted(tables):
+        if connection.execute(update(table).where(table.c.name == name)
+                              .values(version=table.c.version + 1, changed_at=now)).rowcount:
+            continue
+        # First write to this table since table_version was created
+        dialects = {'postgresql': postgresql, 'sqlite': sqlite}
+        if connection.dialect.name in dialects:
+            stmt = dialects[connection.dialect.name].insert(table).on_conflict_do_nothing()
+        else:
+            stmt = table.insert()
+        connection.execute(stmt.values(name=name, version=1, changed_at=now))
+
+
+class TableVersions:
+    def __init__(self):
+        self.ttl = 300
+        self.enabled = True
+
+    def init_app(self, app):
+        self.ttl = app.config.get('CONDITIONAL_GET_TTL', 300)
+        self.enabled = app.config.get('CONDITIONAL_GET', True)
+
+    def get(self, tables):
+        """{table: (version, changed_at)} for tables; tables never written are absent."""
+        rows = db.session.execute(
+            select(TableVersion.name, TableVersion.version, TableVersion.changed_at)
+            .where(TableVersion.name.in_(tables))).all()
+        return {row.name: (row.version, row.changed_at) for row in rows}
+
+    def validators(self, tables):
+        """(etag, last_modified) for the current request over tables."""
+        versions = self.get(tables)
+        bucket = int(time.time() // self.ttl)
+        user = (current_user.get_id(), sorted(current_user.role_names)) if current_user.is_authenticated else None
+        key = repr((sorted(versions.items()), request.full_path, request.headers.get('HX-Request'),
+                    request.headers.get('HX-Target'), user, bucket))
+        etag = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        changed = [changed_at.replace(tzinfo=timezone.utc) for _, changed_at in versions.values()]
+        last_modified = max(changed + [datetime.fromtimestamp(bucket * self.ttl, timezone.utc)])
+        return etag, last_modified.replace(microsecond=0)
+
+
+table_versions = TableVersions()
+
+
+def conditional(*tables):
+    """Answer GETs of the decorated view with 304 while tables and the request's context are unchanged."""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if request.method != 'GET' or not table_versions.enabled or session.get('_flashes'):
+                return view(*args, **kwargs)
+            etag, last_modified = table_versions.validators(tables)
+            if request.if_none_match:
+                # Weak comparison, as RFC 9110 specifies: compression turns the ETag weak
+                fresh = request.if_none_match.contains_weak(etag)
+            else:
+                fresh = request.if_modified_since is not None and request.if_modified_since >= last_modified
+            response = Response(status=304) if fresh else make_response(view(*args, **kwargs))
+            if response.status_code in (200, 304):
+                response.set_etag(etag)
+                response.last_modified = last_modified
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+                response.vary.update(('Cookie', 'HX-Request', 'HX-Target'))
+            return response
+        return wrapped
+    return decorator
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _bump_flushed_tables(session, flush_context):
+    tables = {obj.__table__.name for obj in list(session.new) + list(session.dirty) + list(session.deleted)}
+    tables.discard(VERSION_TABLE)
+    if tables:
+        bump(session.connection(), tables)
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _bump_bulk_tables(orm_execute_state):
+    # ORM bulk INSERT/UPDATE/DELETE statements skip the flush hooks
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.local_table.name == VERSION_TABLE:
+        return None
+    result = orm_execute_state.invoke_statement()
+    bump(orm_execute_state.session.connection(bind_arguments=orm_execute_state.bind_arguments),
+         {mapper.local_table.name})
+    return result
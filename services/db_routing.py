@@ -0,0 +1,100 @@
+"""
+Read-replica routing for db.session.
+
+When DATABASE_REPLICA_URL is configured it is registered as the 'replica'
+bind. Views decorated with @read_replica (and code inside `with use_replica():`)
+send their SELECTs there; everything else, every flush, and any read that
+follows a write stays on the primary. Without a replica configured all of this
+is a no-op and every query goes to DATABASE_URL.
+"""
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_app_context, has_request_context, session
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that can send read-only work to the replica bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_replica():
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_replica(self):
+        if self._flushing or REPLICA_BIND not in self._db.engines:
+            return False
+        if not has_app_context() or not g.get('_db_route_replica'):
+            return False
+        # Read-your-writes: once this request has written anything, or the
+        # user wrote something a moment ago, the replica may still be behind.
+        if g.get('_db_wrote') or _pinned_to_primary():
+            return False
+        return True
+
+    def flush(self, objects=None):
+        if has_app_context() and (self.new or self.dirty or self.deleted):
+            g._db_wrote = True
+        super().flush(objects)
+
+
+def _pinned_to_primary():
+    """Whether the user wrote within REPLICA_STICKY_SECONDS; the session is read once per request, and only here."""
+    if '_db_pin_primary' not in g:
+        until = session.get('_db_primary_until') if has_request_context() else None
+        g._db_pin_primary = bool(until and until > time.time())
+    return g._db_pin_primary
+
+
+def replica_enabled():
+    from extensions import db
+    return REPLICA_BIND in db.engines
+
+
+@contextmanager
+def use_replica():
+    """Route reads inside the block to the replica when one is configured."""
+    previous = g.get('_db_route_replica', False)
+    g._db_route_replica = True
+    try:
+        yield
+    finally:
+        g._db_route_replica = previous
+
+
+@contextmanager
+def use_primary():
+    """Force reads inside the block to the primary, e.g. inside a replica view."""
+    previous = g.get('_db_route_replica', False)
+    g._db_route_replica = False
+    try:
+        yield
+    finally:
+        g._db_route_replica = previous
+
+
+def read_replica(f):
+    """Mark a view as read-only so its queries may be served by the replica."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with use_replica():
+            return f(*args, **kwargs)
+
+    return decorated_function
+
+
+def init_app(app):
+    """Pin a user to the primary for REPLICA_STICKY_SECONDS after they write."""
+    sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 5)
+    if REPLICA_BIND not in app.config.get('SQLALCHEMY_BINDS', {}) or not sticky_seconds:
+        return
+
+    @app.after_request
+    def _remember_writes(response):
+        if g.get('_db_wrote'):
+            session['_db_primary_until'] = time.time() + sticky_seconds
+        return response
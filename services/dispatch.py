@@ -0,0 +1,202 @@
+"""
+Automatic dispatch of unassigned jobs.
+
+plan(day) loads the day's open jobs that are missing a driver or a vehicle,
+every driver and active vehicle, and the bookings already made around that
+day, and proposes an assignment:
+
+- a vehicle must match the job's vehicle_type (case-insensitive) when it has one;
+- neither the driver nor the vehicle may be booked anywhere in the job's window
+  (services.availability.job_window);
+- among the feasible candidates the least-loaded one (fewest booked minutes
+  that day) wins, so work is spread over the fleet.
+
+The solver is greedy interval scheduling: jobs are taken in pickup order. Each
+driver and vehicle is a row in a NumPy boolean matrix of booked minutes, so
+one job is checked against the whole fleet with a slice and any() instead of
+a Python loop per resource. A few thousand jobs against a few hundred
+drivers take well under a second (scripts/bench_dispatch.py).
+
+The proposal is only a suggestion; apply() re-checks it against the conflict
+engine and writes it in one bulk UPDATE.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select, update
+
+from extensions import db
+from models import Driver, Job, Vehicle
+from services.availability import availability, booked_clause, is_booked, job_window
+from services.scheduling import conflict_engine
+
+# The grid covers the day and the next one, for windows running past midnight
+GRID_MINUTES = 2 * 24 * 60
+DAY_MINUTES = 24 * 60
+
+DispatchJob = namedtuple('DispatchJob', 'job_id start end vehicle_type driver_id vehicle_id')
+Assignment = namedtuple('Assignment', 'job_id driver_id vehicle_id starts_at ends_at')
+Unassigned = namedtuple('Unassigned', 'job_id reason')
+Proposal = namedtuple('Proposal', 'day assignments unassigned')
+
+
+def _slots(start, end, day_start):
+    """Grid columns [lo, hi) covered by a window, clipped to the grid."""
+    lo = int((start - day_start).total_seconds() // 60)
+    hi = int(-(-(end - day_start).total_seconds() // 60))
+    return max(lo, 0), min(hi, GRID_MINUTES)
+
+
+def _normalize_type(vehicle_type):
+    return ' '.join(vehicle_type.split()).lower() if vehicle_type else ''
+
+
+def solve(day, jobs, driver_ids, vehicles, bookings):
+    """Greedy assignment for one day.
+
+    jobs are DispatchJobs to complete (driver_id/vehicle_id already set are
+    kept), vehicles are (id, type) pairs and bookings are (start, end,
+    driver_id, vehicle_id) windows already on the books, including those of
+    partly assigned jobs. Returns (assignments, unassigned).
+    """
+    day_start = datetime.combine(day, datetime.min.time())
+    driver_pos = {driver_id: i for i, driver_id in enumerate(driver_ids)}
+    vehicle_pos = {vehicle_id: i for i, (vehicle_id, _) in enumerate(vehicles)}
+    driver_busy = np.zeros((len(driver_ids), GRID_MINUTES), dtype=bool)
+    vehicle_busy = np.zeros((len(vehicles), GRID_MINUTES), dtype=bool)
+
+    for start, end, driver_id, vehicle_id in bookings:
+        lo, hi = _slots(start, end, day_start)
+        if hi <= lo:
+            continue
+        if driver_id in driver_pos:
+            driver_busy[driver_pos[driver_id], lo:hi] = True
+        if vehicle_id in vehicle_pos:
+            vehicle_busy[vehicle_pos[vehicle_id], lo:hi] = True
+    driver_load = driver_busy[:, :DAY_MINUTES].sum(axis=1)
+    vehicle_load = vehicle_busy[:, :DAY_MINUTES].sum(axis=1)
+
+    vehicle_types = np.array([_normalize_type(vehicle_type) for _, vehicle_type in vehicles], dtype=object)
+    type_masks = {}
+    unavailable = np.iinfo(driver_load.dtype).max
+
+    assignments, unassigned = [], []
+    for job in sorted(jobs, key=lambda job: (job.start, job.end, job.job_id)):
+        lo, hi = _slots(job.start, job.end, day_start)
+        driver_id, vehicle_id = job.driver_id, job.vehicle_id
+        driver_index = vehicle_index = None
+
+        if driver_id is None:
+            free = ~driver_busy[:, lo:hi].any(axis=1)
+            if not free.any():
+                unassigned.append(Unassigned(job.job_id, 'No driver is free for this window'))
+                continue
+            driver_index = int(np.where(free, driver_load, unavailable).argmin())
+
+        if vehicle_id is None:
+            wanted = _normalize_type(job.vehicle_type)
+            free = ~vehicle_busy[:, lo:hi].any(axis=1)
+            if wanted:
+                if wanted not in type_masks:
+                    type_masks[wanted] = vehicle_types == wanted
+                free &= type_masks[wanted]
+            if not free.any():
+                reason = f'No {job.vehicle_type} vehicle is free for this window' if wanted \
+                    else 'No vehicle is free for this window'
+                unassigned.append(Unassigned(job.job_id, reason))
+                continue
+            vehicle_index = int(np.where(free, vehicle_load, unavailable).argmin())
+
+        if driver_index is not None:
+            driver_busy[driver_index, lo:hi] = True
+            driver_load[driver_index] += min(hi, DAY_MINUTES) - min(lo, DAY_MINUTES)
+            driver_id = driver_ids[driver_index]
+        if vehicle_index is not None:
+            vehicle_busy[vehicle_index, lo:hi] = True
+            vehicle_load[vehicle_index] += min(hi, DAY_MINUTES) - min(lo, DAY_MINUTES)
+            vehicle_id = vehicles[vehicle_index][0]
+        assignments.append(Assignment(job.job_id, driver_id, vehicle_id, job.start, job.end))
+    return assignments, unassigned
+
+
+class DispatchService:
+    def plan(self, day):
+        """Proposal for the open jobs picked up on day that lack a driver or a vehicle."""
+        dates = [(day + timedelta(days=offset)).isoformat() for offset in (-1, 0, 1)]
+        rows = db.session.execute(
+            select(Job.id, Job.driver_id, Job.vehicle_id, Job.vehicle_type, Job.pickup_date, Job.pickup_time)
+            .where(booked_clause())
+            .where(Job.pickup_date.in_(dates))).all()
+        driver_ids = db.session.execute(select(Driver.id).order_by(Driver.id)).scalars().all()
+        vehicles = db.session.execute(
+            select(Vehicle.id, Vehicle.type).where(Vehicle.status == 'Active').order_by(Vehicle.id)).all()
+
+        jobs, bookings = [], []
+        for row in rows:
+            start, end = job_window(row.pickup_date, row.pickup_time, availability.duration)
+            if start is None:
+                continue
+            if row.driver_id or row.vehicle_id:
+                bookings.append((start, end, row.driver_id, row.vehicle_id))
+            if start.date() != day or (row.driver_id and row.vehicle_id):
+                continue
+            jobs.append(DispatchJob(row.id, start, end, row.vehicle_type, row.driver_id, row.vehicle_id))
+
+        assignments, unassigned = solve(day, jobs, driver_ids, vehicles, bookings)
+        return Proposal(day, assignments, unassigned)
+
+    def apply(self, assignments):
+        """Write a reviewed proposal: assignments are dicts with job_id, driver_id and vehicle_id.
+
+        Everything is re-checked first, since jobs may have changed since the
+        proposal was made. Returns a list of error messages; nothing is
+        written unless it is empty. Malformed entries raise KeyError,
+        TypeError or ValueError.
+        """
+        wanted = {int(a['job_id']): (int(a['driver_id']), int(a['vehicle_id'])) for a in assignments}
+        jobs = {job.id: job for job in db.session.execute(
+            select(Job.id, Job.driver_id, Job.vehicle_id, Job.order_status, Job.pickup_date, Job.pickup_time)
+            .where(Job.id.in_(wanted))).all()}
+        drivers = dict(db.session.execute(
+            select(Driver.id, Driver.name).where(Driver.id.in_({d for d, _ in wanted.values()}))).all())
+        vehicles = {vehicle.id: vehicle for vehicle in db.session.execute(
+            select(Vehicle.id, Vehicle.number, Vehicle.type)
+            .where(Vehicle.id.in_({v for _, v in wanted.values()}))).all()}
+
+        errors, candidates, values = [], [], []
+        for job_id, (driver_id, vehicle_id) in wanted.items():
+            job = jobs.get(job_id)
+            if job is None or not is_booked(job.order_status):
+                errors.append(f'Job #{job_id} no longer exists or is closed')
+                continue
+            if (job.driver_id and job.driver_id != driver_id) or (job.vehicle_id and job.vehicle_id != vehicle_id):
+                errors.append(f'Job #{job_id} was assigned since the proposal was made')
+                continue
+            if driver_id not in drivers or vehicle_id not in vehicles:
+                errors.append(f'Job #{job_id} has an unknown driver or vehicle')
+                continue
+            start, end = job_window(job.pickup_date, job.pickup_time, availability.duration)
+            candidates.append({'job_id': job_id, 'driver_id': driver_id, 'vehicle_id': vehicle_id,
+                               'start': start, 'end': end})
+            vehicle = vehicles[vehicle_id]
+            values.append({'id': job_id, 'driver_id': driver_id, 'driver_contact': drivers[driver_id],
+                           'vehicle_id': vehicle_id, 'vehicle_number': vehicle.number,
+                           'vehicle_type': vehicle.type})
+
+        for candidate, conflicts in zip(candidates, conflict_engine.check_batch(candidates)):
+            if conflicts:
+                errors.append(f"Job #{candidate['job_id']} now clashes with another booking")
+        if errors:
+            return errors
+
+        if values:
+            # ORM bulk UPDATE by primary key: one executemany, no per-job flush
+            db.session.execute(update(Job), values)
+            availability.sync(list(wanted))
+            db.session.commit()
+            conflict_engine.invalidate()
+        return []
+
+
+dispatch = DispatchService()
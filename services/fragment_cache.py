@@ -0,0 +1,106 @@
+"""
+Per-worker cache of rendered template fragments.
+
+A Jinja extension adds a {% fragment %} block. Its body is rendered once per
+distinct key and then reused until evicted:
+
+    {% for job in jobs %}
+      {% fragment job|row_version %}
+        <tr>...formatting, discount sums, badges...</tr>
+      {% endfragment %}
+    {% endfor %}
+
+The key is the template and line of the block plus whatever the tag lists.
+row_version(obj) is the entity name, id and the current value of every
+column of an ORM instance. An updated row therefore gets a new key no
+matter how it was written: through the ORM, a bulk statement or by hand.
+Nothing has to be invalidated, and stale entries simply age out of the LRU
+(FRAGMENT_CACHE_SIZE entries, default 5000). Fragments that show related
+rows add those tables' services/conditional_get.py counters to the key,
+e.g. billing rows also depend on job, agent and service.
+
+Only cache markup that is the same for every user: no CSRF tokens,
+current_user or request arguments inside a fragment. FRAGMENT_CACHE=False
+renders every fragment.
+"""
+import threading
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from sqlalchemy import inspect
+
+
+def row_version(obj):
+    """(entity, id, column values) of an ORM instance: changes whenever the row does."""
+    mapper = inspect(obj).mapper
+    return (mapper.local_table.name,) + tuple(getattr(obj, attr.key) for attr in mapper.column_attrs)
+
+
+class FragmentCache:
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self.enabled = True
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('FRAGMENT_CACHE_SIZE', 5000)
+        self.enabled = app.config.get('FRAGMENT_CACHE', True)
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.jinja_env.fragment_cache = self
+        app.jinja_env.filters['row_version'] = row_version
+
+    def get(self, key):
+        with self._lock:
+            markup = self._entries.get(key)
+            if markup is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return markup
+
+    def set(self, key, markup):
+        with self._lock:
+            self._entries[key] = markup
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+class FragmentCacheExtension(Extension):
+    tags = {'fragment'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        keys = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            keys.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endfragment',), drop_needle=True)
+        args = [nodes.Const(f'{parser.name}:{lineno}'), nodes.Tuple(keys, 'load')]
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, location, keys, caller):
+        cache = self.environment.fragment_cache
+        if cache is None or not cache.enabled:
+            return caller()
+        key = (location, keys)
+        markup = cache.get(key)
+        if markup is None:
+            markup = caller()
+            cache.set(key, markup)
+        return markup
+
+
+fragment_cache = FragmentCache()
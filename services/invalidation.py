@@ -0,0 +1,105 @@
+"""
+Commit-time invalidation shared by the per-worker caches.
+
+on_commit(tables, callback) registers a cache with the one after_flush /
+after_commit / after_rollback trio on RoutingSession. Every flush collects
+what changed in the given tables into session.info. After the transaction
+commits, the cache's callback receives the collected items, and a rollback
+discards them, so a cache never drops its copy for a write that did not
+happen.
+
+Stamp is the cross-worker half: a file in the instance cache folder holding
+a random token that the committing worker replaces. The other gunicorn
+workers compare it on their next read and reload when it changed. Contents
+rather than mtimes, since two bumps within one mtime tick (1-2 s on some
+filesystems) would look like none. Caches read the stamp before loading, so
+a bump that lands while they load still triggers the next reload.
+"""
+import os
+import secrets
+
+from sqlalchemy import event
+
+from services.db_routing import RoutingSession
+
+PENDING_KEY = 'invalidation_pending'
+
+_registrations = []  # (table names, callback, collect)
+
+
+def _table_name(table):
+    return table if isinstance(table, str) else table.__table__.name
+
+
+def _changed_table(obj, op):
+    return obj.__table__.name
+
+
+def on_commit(tables, callback, collect=None):
+    """Call callback(items) after each commit that flushed a change to one of tables.
+
+    tables are models or table names. collect(obj, op) turns a flushed object
+    into an item, with op 'new', 'dirty' or 'deleted'; returning None skips
+    it. By default the item is the object's table name. Items are in flush
+    order and may repeat.
+    """
+    _registrations.append((frozenset(_table_name(table) for table in tables), callback,
+                           collect or _changed_table))
+
+
+class Stamp:
+    """Cross-worker change marker: the token in <instance>/cache/<name>."""
+
+    def __init__(self, name):
+        self.name = name
+        self.path = None
+
+    def init_app(self, app):
+        stamp_dir = os.path.join(app.instance_path, 'cache')
+        os.makedirs(stamp_dir, exist_ok=True)
+        self.path = os.path.join(stamp_dir, self.name)
+
+    def read(self):
+        """Current stamp; '' before init_app or before the first bump."""
+        if not self.path:
+            return ''
+        try:
+            with open(self.path) as f:
+                return f.read()
+        except FileNotFoundError:
+            return ''
+
+    def bump(self):
+        if self.path:
+            # Readers see either the old token or the new one, never a partial write
+            tmp_path = f'{self.path}.{os.getpid()}.{secrets.token_hex(4)}'
+            with open(tmp_path, 'w') as f:
+                f.write(secrets.token_hex(16))
+            os.replace(tmp_path, self.path)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault(PENDING_KEY, {})
+    for op, objects in (('new', session.new), ('dirty', session.dirty), ('deleted', session.deleted)):
+        for obj in objects:
+            table = getattr(obj, '__table__', None)
+            if table is None:
+                continue
+            for index, (tables, _, collect) in enumerate(_registrations):
+                if table.name in tables:
+                    item = collect(obj, op)
+                    if item is not None:
+                        pending.setdefault(index, []).append(item)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _invalidate_on_commit(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    for index, items in sorted((pending or {}).items()):
+        _registrations[index][1](items)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop(PENDING_KEY, None)
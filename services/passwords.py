@@ -0,0 +1,102 @@
+"""
+Password hashing.
+
+Passwords are hashed with passlib. PASSWORD_SCHEME picks the algorithm:
+pbkdf2_sha256 (default) and scrypt use the standard library, argon2 needs
+argon2-cffi. PASSWORD_ROUNDS sets its cost, so each environment can trade
+login latency for strength (pbkdf2 iterations, log2 of scrypt's N, argon2
+time cost). The other schemes stay verifiable, and so do the plaintext
+passwords the user table held until now.
+
+A successful login whose stored value is plaintext, another scheme or
+another cost is rehashed with the current settings. The new hash is written
+with a compare-and-set UPDATE, so a password changed meanwhile is left alone.
+
+With PASSWORD_THREADS > 0, verification and rehashing run in a pool of that
+many threads. hashlib releases the GIL while hashing, so a gthread worker keeps
+serving its other requests during a login burst, at most PASSWORD_THREADS
+hashes run at once per worker, and the rehash happens after the response
+has gone. With 0 (the default, right for sync workers) everything runs inline.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+from passlib.exc import MissingBackendError
+from sqlalchemy import update
+
+from extensions import db
+from models import User
+
+SCHEMES = ('pbkdf2_sha256', 'scrypt', 'argon2')
+
+
+class PasswordService:
+    def __init__(self):
+        self.app = None
+        self.context = CryptContext(schemes=['pbkdf2_sha256', 'plaintext'], deprecated=['auto'])
+        self.executor = None
+
+    def init_app(self, app):
+        self.app = app
+        scheme = app.config.get('PASSWORD_SCHEME', 'pbkdf2_sha256')
+        if scheme not in SCHEMES:
+            raise RuntimeError(f'PASSWORD_SCHEME must be one of {", ".join(SCHEMES)}, not {scheme!r}')
+        # Current scheme first (it hashes), the others only verify; plaintext last, it matches anything
+        schemes = [scheme] + [s for s in SCHEMES if s != scheme]
+        settings = {}
+        rounds = app.config.get('PASSWORD_ROUNDS')
+        if rounds:
+            settings[f'{scheme}__rounds'] = int(rounds)
+        try:
+            self.context = CryptContext(schemes=schemes + ['plaintext'], default=scheme,
+                                        deprecated=['auto'], **settings)
+            self.context.hash('')  # fail at startup, not on the first login, if the backend is missing
+        except MissingBackendError as e:
+            raise RuntimeError(f'PASSWORD_SCHEME {scheme!r} is not available: {e}') from e
+        threads = app.config.get('PASSWORD_THREADS', 0)
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='passwords') if threads else None
+
+    def hash(self, password):
+        return self.context.hash(password)
+
+    def is_hashed(self, value):
+        return self.context.identify(value) not in (None, 'plaintext')
+
+    def _run(self, fn, *args):
+        if self.executor is None:
+            return fn(*args)
+        return self.executor.submit(fn, *args).result()
+
+    def verify(self, stored, password):
+        """Whether password matches the stored hash (or legacy plaintext)."""
+        if not stored:
+            # Spend the same time as a real check, so unknown users can't be told apart
+            self._run(self.context.dummy_verify)
+            return False
+        return self._run(self.context.verify, password, stored)
+
+    def check(self, user, password):
+        """Verify a login for user (None for an unknown name) and upgrade an outdated hash."""
+        stored = user.password if user is not None else None
+        if not self.verify(stored, password):
+            return False
+        if self.context.needs_update(stored):
+            if self.executor is None:
+                self._rehash(user.id, stored, password)
+            else:
+                self.executor.submit(self._rehash, user.id, stored, password)
+        return True
+
+    def _rehash(self, user_id, stored, password):
+        # Own app context, and so its own session: this may run after the request is gone
+        with self.app.app_context():
+            try:
+                db.session.execute(update(User).where(User.id == user_id, User.password == stored)
+                                   .values(password=self.hash(password)))
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.error(f'Password rehash failed for user {user_id}: {e}')
+
+
+passwords = PasswordService()
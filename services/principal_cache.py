@@ -0,0 +1,112 @@
+"""
+Per-worker cache of the logged-in user and their role names.
+
+Flask-Login calls load_user on every request, and the role checks in
+base.html and AdminModelView used to walk current_user.roles, a lazy load
+through roles_users. load_user now returns a Principal: a small read-only
+stand-in for User holding its identity fields and a frozenset of role
+names, loaded with one query and kept here for AUTH_CACHE_TTL seconds
+(default 60). A cached request makes no auth queries at all.
+
+Invalidation goes through services/invalidation.py: committing a change to a
+User drops that user, any Role change drops everyone, and both bump a stamp
+file so the other workers drop their copies too. The TTL bounds staleness
+for changes made outside the app (e.g. roles_users edited by hand).
+"""
+import threading
+import time
+
+from flask_login import UserMixin
+from sqlalchemy import select
+
+from extensions import db
+from models import Role, User, roles_users
+from services.invalidation import Stamp, on_commit
+
+EVERYONE = '*'
+
+
+class Principal(UserMixin):
+    """What a request needs to know about the logged-in user, without an ORM instance."""
+
+    def __init__(self, id, email, username, active, role_names):
+        self.id = id
+        self.email = email
+        self.username = username
+        self.active = active
+        self.role_names = role_names
+
+    @property
+    def is_active(self):
+        return bool(self.active)
+
+    def __repr__(self):
+        return f'<Principal {self.username or self.email}>'
+
+
+class PrincipalCache:
+    def __init__(self):
+        self._entries = {}  # user id -> (loaded_at, stamp, Principal)
+        self._lock = threading.Lock()
+        self.stamp = Stamp('principals.stamp')
+        self.ttl = 60
+
+    def init_app(self, app):
+        self.ttl = app.config.get('AUTH_CACHE_TTL', 60)
+        self.stamp.init_app(app)
+
+    @staticmethod
+    def load(user_id):
+        """Principal for user_id from one users-roles query, or None if there is no such user."""
+        rows = db.session.execute(
+            select(User.id, User.email, User.username, User.active, Role.name)
+            .outerjoin(roles_users, roles_users.c.user_id == User.id)
+            .outerjoin(Role, Role.id == roles_users.c.role_id)
+            .where(User.id == user_id)).all()
+        if not rows:
+            return None
+        first = rows[0]
+        return Principal(first.id, first.email, first.username, first.active,
+                         frozenset(row.name for row in rows if row.name))
+
+    def get(self, user_id):
+        now = time.monotonic()
+        stamp = self.stamp.read()
+        entry = self._entries.get(user_id)
+        if entry and entry[1] == stamp and now - entry[0] < self.ttl:
+            return entry[2]
+        principal = self.load(user_id)
+        with self._lock:
+            if principal is None:
+                self._entries.pop(user_id, None)
+            else:
+                self._entries[user_id] = (now, stamp, principal)
+        return principal
+
+    def invalidate(self, *user_ids):
+        """Drop the given users, or everyone when called without ids, in every worker."""
+        with self._lock:
+            if user_ids:
+                for user_id in user_ids:
+                    self._entries.pop(user_id, None)
+            else:
+                self._entries.clear()
+        self.stamp.bump()
+
+
+principal_cache = PrincipalCache()
+
+
+def _changed_user(obj, op):
+    # A role change can affect any user
+    return obj.id if isinstance(obj, User) else EVERYONE
+
+
+def _invalidate_principals(user_ids):
+    if EVERYONE in user_ids:
+        principal_cache.invalidate()
+    else:
+        principal_cache.invalidate(*set(user_ids))
+
+
+on_commit([User, Role], _invalidate_principals, collect=_changed_user)
@@ -0,0 +1,209 @@
+"""
+Rate limiting for the login form and the expensive endpoints.
+
+Flask-Limiter checks every limit in a before_request hook, using keys taken
+from the request alone: the client address, the login form's username, and a
+hash of the session-id cookie (or the signed cookie's _user_id with
+SESSION_BACKEND=cookie). Server-side sessions are read only on first use
+(services/session_store.py), so a limited request is answered with a 429
+before a view, load_user, the session row or any other main-database query
+is read.
+
+Limits use the sliding-window-counter strategy: two counters per key (this
+window and the previous one, weighted by overlap), so there are no bursts
+at window edges and no per-hit event lists to store. Where the counters live
+is RATELIMIT_STORAGE_URI:
+
+    sqlite:///path  (default instance/ratelimits.db) shared by every worker on
+                    the host; the whole check is one short IMMEDIATE
+                    transaction on a synchronous=OFF WAL database
+    memory://       in-process; fastest, for a single worker
+    redis://...     any other storage Flask-Limiter supports
+
+Policies are config strings, so each environment can tune them:
+
+    RATELIMIT_LOGIN           per client address, on POST /login
+    RATELIMIT_LOGIN_USERNAME  per username tried, on POST /login
+    RATELIMIT_CHAT            per user, shared by /api/chat and /api/chat/stream
+    RATELIMIT_PRICING         per user, on /api/calculate_pricing
+    RATELIMIT_JOBS_TABLE      per user, on the HTMX /jobs/table filter
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from math import floor
+
+from flask import current_app, request, session
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from limits.storage import SlidingWindowCounterSupport, Storage
+from limits.storage.base import TimestampedSlidingWindow
+
+from services.session_store import SESSION_ID_LENGTH, ServerSideSessionInterface
+
+POLICIES = {
+    'RATELIMIT_LOGIN': '10 per minute;50 per hour',
+    'RATELIMIT_LOGIN_USERNAME': '5 per minute;20 per hour',
+    'RATELIMIT_CHAT': '30 per minute',
+    'RATELIMIT_PRICING': '60 per minute',
+    'RATELIMIT_JOBS_TABLE': '120 per minute',
+}
+# Expired counters are deleted at most this often per process
+PURGE_SECONDS = 60
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Fixed and sliding window counters in a local SQLite file shared by all workers."""
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        # sqlite:///relative.db or sqlite:////absolute/path.db, as in SQLAlchemy URLs
+        self.path = uri.split('://', 1)[1][1:] if uri else ':memory:'
+        self._local = threading.local()
+        self._purged_at = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._connection().execute('CREATE TABLE IF NOT EXISTS ratelimit '
+                                   '(key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL)')
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        # One connection per thread and process: a connection opened before gunicorn forks is not reused
+        conn, pid = getattr(self._local, 'conn', (None, None))
+        if conn is None or pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Counters are disposable, so never wait on fsync for them
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = (conn, os.getpid())
+        return conn
+
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        return conn
+
+    def _purge(self, conn, now):
+        if now - self._purged_at > PURGE_SECONDS:
+            self._purged_at = now
+            conn.execute('DELETE FROM ratelimit WHERE expires_at <= ?', (now,))
+
+    @staticmethod
+    def _get(conn, key, now):
+        row = conn.execute('SELECT count, expires_at FROM ratelimit WHERE key = ?', (key,)).fetchone()
+        return row if row and row[1] > now else (0, now)
+
+    @staticmethod
+    def _incr(conn, key, expiry, amount, now):
+        # A new or expired key starts over with a fresh expiry
+        return conn.execute(
+            'INSERT INTO ratelimit (key, count, expires_at) VALUES (?1, ?2, ?3) '
+            'ON CONFLICT(key) DO UPDATE SET '
+            'count = CASE WHEN expires_at <= ?4 THEN ?2 ELSE count + ?2 END, '
+            'expires_at = CASE WHEN expires_at <= ?4 THEN ?3 ELSE expires_at END '
+            'RETURNING count', (key, amount, now + expiry, now)).fetchone()[0]
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        conn = self._transaction()
+        try:
+            count = self._incr(conn, key, expiry, amount, now)
+            self._purge(conn, now)
+        finally:
+            conn.execute('COMMIT')
+        return count
+
+    def get(self, key):
+        return self._get(self._connection(), key, time.time())[0]
+
+    def get_expiry(self, key):
+        return self._get(self._connection(), key, time.time())[1]
+
+    def clear(self, key):
+        self._connection().execute('DELETE FROM ratelimit WHERE key = ?', (key,))
+
+    def reset(self):
+        return self._connection().execute('DELETE FROM ratelimit').rowcount
+
+    def check(self):
+        try:
+            self._connection().execute('SELECT 1')
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _window(self, conn, key, expiry, now):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._get(conn, previous_key, now)[0]
+        current_count = self._get(conn, current_key, now)[0]
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_key, current_key, previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        # Read both windows and increment in one transaction, so workers can't race past the limit
+        conn = self._transaction()
+        try:
+            _, current_key, previous_count, previous_ttl, current_count, _ = self._window(conn, key, expiry, now)
+            if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                return False
+            self._incr(conn, current_key, 2 * expiry, amount, now)
+            self._purge(conn, now)
+            return True
+        finally:
+            conn.execute('COMMIT')
+
+    def get_sliding_window(self, key, expiry):
+        return self._window(self._connection(), key, expiry, time.time())[2:]
+
+    def clear_sliding_window(self, key, expiry):
+        for window_key in self.sliding_window_keys(key, expiry, time.time()):
+            self.clear(window_key)
+
+
+def user_or_address():
+    """Per-login key for the expensive endpoints, falling back to the client address; never touches the database.
+
+    With server-side sessions it is a hash of the session-id cookie, so the
+    session row is not loaded (ids rotate on login, so one login is one key).
+    Cookie sessions already carry the user id in the signed cookie.
+    """
+    interface = current_app.session_interface
+    if isinstance(interface, ServerSideSessionInterface):
+        sid = request.cookies.get(interface.get_cookie_name(current_app))
+        if sid and len(sid) == SESSION_ID_LENGTH:
+            return 'session:' + hashlib.sha256(sid.encode()).hexdigest()[:32]
+    else:
+        user_id = session.get('_user_id')
+        if user_id:
+            return f'user:{user_id}'
+    return f'ip:{get_remote_address()}'
+
+
+def login_username():
+    return 'login:' + (request.form.get('username') or '').strip().lower()
+
+
+def policy(name):
+    """Limit string for a POLICIES key, read from app.config at request time."""
+    return lambda: current_app.config.get(name, POLICIES[name])
+
+
+limiter = Limiter(key_func=get_remote_address)
+
+
+def init_app(app):
+    app.config.setdefault('RATELIMIT_STRATEGY', 'sliding-window-counter')
+    if not app.config.get('RATELIMIT_STORAGE_URI'):
+        os.makedirs(app.instance_path, exist_ok=True)
+        app.config['RATELIMIT_STORAGE_URI'] = 'sqlite:///' + os.path.join(app.instance_path, 'ratelimits.db')
+    app.config.setdefault('RATELIMIT_HEADERS_ENABLED', True)
+    limiter.init_app(app)
@@ -0,0 +1,134 @@
+"""
+Materialization of recurring jobs.
+
+Each active RecurringJob has an RFC 5545 recurrence rule (parsed with
+dateutil.rrule) anchored on its starts_on date. materialize() expands every
+template over a rolling window, today to today + RECURRING_WINDOW_DAYS
+(default 30), drops the occurrences that already have a job and writes the
+rest in one bulk INSERT. Generated jobs carry recurring_job_id, and the
+(recurring_job_id, pickup_date) unique constraint on job keeps a repeated or
+concurrent run from creating a duplicate.
+
+An occurrence that would double-book its template's driver or vehicle is
+still created, but without them, so it shows up as unassigned for
+services/dispatch.py instead of clashing.
+"""
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from dateutil.rrule import rrulestr
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Driver, Job, RecurringJob, Vehicle
+from services.autocomplete import autocomplete
+from services.availability import availability, job_window
+from services.chat_summary import chat_summary
+from services.scheduling import conflict_engine
+
+# RecurringJob columns copied onto each generated job
+TEMPLATE_FIELDS = (
+    'customer_name', 'customer_email', 'customer_mobile', 'passenger_name', 'passenger_mobile',
+    'type_of_service', 'pickup_time', 'pickup_location', 'dropoff_location', 'vehicle_type',
+    'payment_mode', 'remarks', 'base_price', 'final_price', 'agent_id', 'service_id',
+    'driver_id', 'vehicle_id',
+)
+
+Materialized = namedtuple('Materialized', 'created existing unassigned errors')
+
+
+def parse_rule(rule, starts_on):
+    """dateutil rrule for a template; raises ValueError for a bad rule or start date."""
+    first = datetime.strptime(starts_on.strip(), '%Y-%m-%d')
+    return rrulestr(rule.strip(), dtstart=first)
+
+
+def occurrences(template, start, end):
+    """Dates on which template recurs between start and end, inclusive."""
+    if template.ends_on:
+        end = min(end, datetime.strptime(template.ends_on.strip(), '%Y-%m-%d').date())
+    rule = parse_rule(template.rrule, template.starts_on)
+    return [moment.date() for moment in rule.between(
+        datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time()), inc=True)]
+
+
+class RecurringJobService:
+    def __init__(self):
+        self.window_days = 30
+
+    def init_app(self, app):
+        self.window_days = app.config.get('RECURRING_WINDOW_DAYS', 30)
+
+    def materialize(self, start=None, days=None, _retry=True):
+        """Create the missing jobs of every active template for the window; returns a Materialized."""
+        start = start or date.today()
+        end = start + timedelta(days=(days or self.window_days) - 1)
+        templates = RecurringJob.query.filter(
+            RecurringJob.active.is_(True),
+            RecurringJob.starts_on <= end.isoformat(),
+            or_(RecurringJob.ends_on.is_(None), RecurringJob.ends_on == '',
+                RecurringJob.ends_on >= start.isoformat())).all()
+        if not templates:
+            return Materialized(0, 0, 0, [])
+
+        template_ids = [template.id for template in templates]
+        existing = set(db.session.execute(
+            select(Job.recurring_job_id, Job.pickup_date)
+            .where(Job.recurring_job_id.in_(template_ids),
+                   Job.pickup_date.between(start.isoformat(), end.isoformat()))).all())
+        drivers = dict(db.session.execute(select(Driver.id, Driver.name).where(
+            Driver.id.in_({t.driver_id for t in templates if t.driver_id}))).all())
+        vehicles = dict(db.session.execute(select(Vehicle.id, Vehicle.number).where(
+            Vehicle.id.in_({t.vehicle_id for t in templates if t.vehicle_id}))).all())
+
+        rows, errors, skipped = [], [], 0
+        for template in templates:
+            try:
+                days_due = occurrences(template, start, end)
+            except ValueError as e:
+                errors.append(f'{template.name}: {e}')
+                continue
+            for day in days_due:
+                if (template.id, day.isoformat()) in existing:
+                    skipped += 1
+                    continue
+                row = {field: getattr(template, field) for field in TEMPLATE_FIELDS}
+                row.update(recurring_job_id=template.id, pickup_date=day.isoformat(), date=day.isoformat(),
+                           order_status='New', payment_status='Unpaid',
+                           driver_contact=drivers.get(template.driver_id),
+                           vehicle_number=vehicles.get(template.vehicle_id))
+                rows.append(row)
+        if not rows:
+            return Materialized(0, skipped, 0, errors)
+
+        candidates = []
+        for row in rows:
+            window_start, window_end = job_window(row['pickup_date'], row['pickup_time'], availability.duration)
+            candidates.append({'driver_id': row['driver_id'], 'vehicle_id': row['vehicle_id'],
+                               'start': window_start, 'end': window_end})
+        unassigned = 0
+        for row, conflicts in zip(rows, conflict_engine.check_batch(candidates)):
+            if conflicts:
+                row.update(driver_id=None, vehicle_id=None, driver_contact=None, vehicle_number=None)
+                unassigned += 1
+
+        try:
+            # ORM bulk INSERT: one executemany; mapper and flush events don't fire for it
+            job_ids = db.session.execute(insert(Job).returning(Job.id), rows).scalars().all()
+            availability.sync(job_ids)
+            db.session.commit()
+        except IntegrityError:
+            # Another run inserted some of the same occurrences first
+            db.session.rollback()
+            if _retry:
+                return self.materialize(start, days, _retry=False)
+            raise
+        conflict_engine.invalidate()
+        chat_summary.invalidate()
+        for row in rows:
+            autocomplete.record_job(row)
+        return Materialized(len(job_ids), skipped, unassigned, errors)
+
+
+recurring_jobs = RecurringJobService()
@@ -0,0 +1,122 @@
+"""
+Per-worker cache of the reference lists used by job form dropdowns.
+
+add_job, add_bulk_jobs, edit_job and the job form error path all need the
+active agents, services and vehicles plus every driver. Instead of four
+queries per render, each list is kept in memory as lightweight RefItem tuples
+(id, label, attrs) and rebuilt only when that entity type changes.
+
+Invalidation:
+  * committing an insert/update/delete of Agent/Service/Vehicle/Driver through
+    db.session drops the local copy and bumps a stamp file in the instance
+    folder, which tells the other gunicorn workers to reload on next read
+    (services/invalidation.py);
+  * REFERENCE_CACHE_TTL (seconds, default 300) bounds staleness for changes
+    made outside the app, e.g. seed scripts or manual SQL.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from extensions import db
+from models import Agent, Driver, Service, Vehicle
+from services.invalidation import Stamp, on_commit
+
+
+class RefItem(namedtuple('RefItem', 'id label attrs')):
+    """(id, label, attrs) with attribute access to attrs, so templates can keep using agent.email etc."""
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        try:
+            return self.attrs[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def _load_agents():
+    rows = db.session.query(Agent.id, Agent.name, Agent.email, Agent.mobile, Agent.agent_discount_percent) \
+        .filter(Agent.status == 'Active').order_by(Agent.id).all()
+    return [RefItem(r.id, r.name, {'name': r.name, 'email': r.email, 'mobile': r.mobile,
+                                   'agent_discount_percent': r.agent_discount_percent}) for r in rows]
+
+
+def _load_services():
+    rows = db.session.query(Service.id, Service.name, Service.base_price) \
+        .filter(Service.status == 'Active').order_by(Service.id).all()
+    return [RefItem(r.id, r.name, {'name': r.name, 'base_price': r.base_price}) for r in rows]
+
+
+def _load_vehicles():
+    rows = db.session.query(Vehicle.id, Vehicle.name, Vehicle.number, Vehicle.type) \
+        .filter(Vehicle.status == 'Active').order_by(Vehicle.id).all()
+    return [RefItem(r.id, f'{r.number} ({r.name})', {'name': r.name, 'number': r.number, 'type': r.type})
+            for r in rows]
+
+
+def _load_drivers():
+    rows = db.session.query(Driver.id, Driver.name, Driver.phone).order_by(Driver.id).all()
+    return [RefItem(r.id, f'{r.name} ({r.phone})', {'name': r.name, 'phone': r.phone}) for r in rows]
+
+
+LOADERS = {
+    'agents': _load_agents,
+    'services': _load_services,
+    'vehicles': _load_vehicles,
+    'drivers': _load_drivers,
+}
+
+MODEL_ENTITIES = {
+    Agent: 'agents',
+    Service: 'services',
+    Vehicle: 'vehicles',
+    Driver: 'drivers',
+}
+
+
+class ReferenceCache:
+    def __init__(self):
+        self._entries = {}  # entity -> (loaded_at, stamp, items)
+        self._lock = threading.Lock()
+        self.stamps = {entity: Stamp(f'refcache-{entity}.stamp') for entity in LOADERS}
+        self.ttl = 300
+
+    def init_app(self, app):
+        self.ttl = app.config.get('REFERENCE_CACHE_TTL', 300)
+        for stamp in self.stamps.values():
+            stamp.init_app(app)
+
+    def get(self, entity):
+        """Return the cached RefItem list for entity, loading it if missing or stale."""
+        now = time.monotonic()
+        stamp = self.stamps[entity].read()
+        entry = self._entries.get(entity)
+        if entry and entry[1] == stamp and now - entry[0] < self.ttl:
+            return entry[2]
+        with self._lock:
+            items = LOADERS[entity]()
+            self._entries[entity] = (now, stamp, items)
+        return items
+
+    def get_all(self):
+        """Dropdown lists for the job forms, as template keyword arguments."""
+        return {entity: self.get(entity) for entity in LOADERS}
+
+    def invalidate(self, *entities):
+        for entity in entities or tuple(LOADERS):
+            self._entries.pop(entity, None)
+            self.stamps[entity].bump()
+
+
+reference_cache = ReferenceCache()
+
+
+def _changed_entity(obj, op):
+    return MODEL_ENTITIES[type(obj)]
+
+
+def _invalidate_entities(entities):
+    reference_cache.invalidate(*set(entities))
+
+
+on_commit(MODEL_ENTITIES, _invalidate_entities, collect=_changed_entity)
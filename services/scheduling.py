@@ -0,0 +1,201 @@
+"""
+Driver and vehicle double-booking detection.
+
+Every booked job (services.availability.is_booked) with a pickup date books its
+driver and vehicle for [pickup, pickup + JOB_DEFAULT_DURATION_MINUTES), or
+the whole day when it has no pickup time (see services.availability.job_window).
+The engine keeps one IntervalIndex per driver and per vehicle, built per
+worker from jobs picked up within SCHEDULE_LOOKBACK_DAYS (default 2) or later.
+
+Invalidation goes through services/invalidation.py: committing a job change
+that affects bookings drops the local indexes and bumps a stamp file so the
+other workers reload on their next check; SCHEDULE_INDEX_TTL (default 300s)
+bounds staleness for changes made outside the app.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict, namedtuple
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import inspect, select
+
+from extensions import db
+from models import Job
+from services.availability import ASSIGNMENT_FIELDS, availability, booked_clause, job_window
+from services.invalidation import Stamp, on_commit
+
+Booking = namedtuple('Booking', 'start end job_id')
+Conflict = namedtuple('Conflict', 'resource resource_id job_id starts_at ends_at')
+
+
+class IntervalIndex:
+    """Booked windows of one driver or vehicle, sorted by start.
+
+    No window is longer than max_length, so anything overlapping [start, end)
+    must start in (start - max_length, end): two bisects and a scan of only
+    the candidates, O(log n + k).
+    """
+
+    def __init__(self):
+        self._bookings = []
+        self.max_length = timedelta(0)
+
+    def __len__(self):
+        return len(self._bookings)
+
+    def add(self, start, end, job_id):
+        insort(self._bookings, Booking(start, end, job_id))
+        self.max_length = max(self.max_length, end - start)
+
+    def overlapping(self, start, end, exclude_job_id=None):
+        lo = bisect_right(self._bookings, (start - self.max_length,))
+        hi = bisect_left(self._bookings, (end,), lo)
+        return [b for b in self._bookings[lo:hi]
+                if b.end > start and b.job_id != exclude_job_id]
+
+
+def _open_jobs_query():
+    return select(Job.id, Job.driver_id, Job.vehicle_id, Job.pickup_date, Job.pickup_time) \
+        .where(booked_clause()) \
+        .where((Job.driver_id.isnot(None)) | (Job.vehicle_id.isnot(None)))
+
+
+class ConflictEngine:
+    def __init__(self):
+        self._indexes = None  # {('driver'|'vehicle', id): IntervalIndex}
+        self._loaded = (0, '')  # (monotonic time, stamp)
+        self._lock = threading.Lock()
+        self.stamp = Stamp('schedule.stamp')
+        self.ttl = 300
+        self.lookback_days = 2
+
+    def init_app(self, app):
+        self.ttl = app.config.get('SCHEDULE_INDEX_TTL', 300)
+        self.lookback_days = app.config.get('SCHEDULE_LOOKBACK_DAYS', 2)
+        self.stamp.init_app(app)
+
+    def _build(self):
+        since = (date.today() - timedelta(days=self.lookback_days)).isoformat()
+        indexes = defaultdict(IntervalIndex)
+        # Don't flush a job that is being validated against the index
+        with db.session.no_autoflush:
+            rows = db.session.execute(_open_jobs_query().where(Job.pickup_date >= since)).all()
+        for row in rows:
+            start, end = job_window(row.pickup_date, row.pickup_time, availability.duration)
+            if start is None:
+                continue
+            if row.driver_id:
+                indexes[('driver', row.driver_id)].add(start, end, row.id)
+            if row.vehicle_id:
+                indexes[('vehicle', row.vehicle_id)].add(start, end, row.id)
+        return indexes
+
+    def indexes(self):
+        now = time.monotonic()
+        stamp = self.stamp.read()
+        if self._indexes is not None and self._loaded[1] == stamp and now - self._loaded[0] < self.ttl:
+            return self._indexes
+        with self._lock:
+            self._indexes = self._build()
+            self._loaded = (now, stamp)
+        return self._indexes
+
+    def invalidate(self):
+        self._indexes = None
+        self.stamp.bump()
+
+    def check(self, driver_id, vehicle_id, start, end, exclude_job_id=None):
+        """Existing bookings that a job for driver/vehicle in [start, end) would collide with."""
+        if start is None:
+            return []
+        return self._check(self.indexes(), driver_id, vehicle_id, start, end, exclude_job_id)
+
+    @staticmethod
+    def _check(indexes, driver_id, vehicle_id, start, end, exclude_job_id=None):
+        if start is None:
+            return []
+        conflicts = []
+        for resource, resource_id in (('driver', driver_id), ('vehicle', vehicle_id)):
+            index = indexes.get((resource, resource_id)) if resource_id else None
+            if index:
+                conflicts.extend(Conflict(resource, resource_id, b.job_id, b.start, b.end)
+                                 for b in index.overlapping(start, end, exclude_job_id))
+        return conflicts
+
+    def check_batch(self, candidates):
+        """Conflicts for several new jobs at once, including clashes within the batch.
+
+        candidates is a list of dicts with driver_id, vehicle_id, start, end and
+        optionally job_id, whose own booking is then ignored. Returns one list of Conflict per candidate; a clash with an earlier
+        candidate has job_id -n, where n is that candidate's 1-based position.
+        """
+        indexes = self.indexes()
+        batch = defaultdict(IntervalIndex)
+        results = []
+        for position, candidate in enumerate(candidates, start=1):
+            start, end = candidate['start'], candidate['end']
+            conflicts = self._check(indexes, candidate.get('driver_id'), candidate.get('vehicle_id'),
+                                    start, end, candidate.get('job_id'))
+            if start is not None:
+                for resource in ('driver', 'vehicle'):
+                    resource_id = candidate.get(f'{resource}_id')
+                    if not resource_id:
+                        continue
+                    key = (resource, resource_id)
+                    if key in batch:
+                        conflicts.extend(Conflict(resource, resource_id, b.job_id, b.start, b.end)
+                                         for b in batch[key].overlapping(start, end))
+                    batch[key].add(start, end, -position)
+            results.append(conflicts)
+        return results
+
+    def report(self, day):
+        """Overlapping bookings on a date, grouped per driver/vehicle, read straight from the database."""
+        day_start = datetime.combine(day, datetime.min.time())
+        day_end = day_start + timedelta(days=1)
+        dates = [(day - timedelta(days=1)).isoformat(), day.isoformat()]
+        per_resource = defaultdict(list)
+        for row in db.session.execute(_open_jobs_query().where(Job.pickup_date.in_(dates))).all():
+            start, end = job_window(row.pickup_date, row.pickup_time, availability.duration)
+            if start is None or end <= day_start or start >= day_end:
+                continue
+            if row.driver_id:
+                per_resource[('driver', row.driver_id)].append(Booking(start, end, row.id))
+            if row.vehicle_id:
+                per_resource[('vehicle', row.vehicle_id)].append(Booking(start, end, row.id))
+
+        report = []
+        for (resource, resource_id), bookings in sorted(per_resource.items()):
+            # Sweep in start order, grouping bookings that chain into one overlap
+            bookings.sort()
+            group, group_end = [bookings[0]], bookings[0].end
+            for booking in bookings[1:]:
+                if booking.start < group_end:
+                    group.append(booking)
+                    group_end = max(group_end, booking.end)
+                else:
+                    if len(group) > 1:
+                        report.append((resource, resource_id, group))
+                    group, group_end = [booking], booking.end
+            if len(group) > 1:
+                report.append((resource, resource_id, group))
+        return report
+
+
+conflict_engine = ConflictEngine()
+
+
+def _booking_change(job, op):
+    """Inserts and deletes always affect bookings; edits only when an assignment field moved."""
+    if op != 'dirty':
+        return True
+    state = inspect(job)
+    return any(state.attrs[field].history.has_changes() for field in ASSIGNMENT_FIELDS) or None
+
+
+def _invalidate_schedule(changes):
+    conflict_engine.invalidate()
+
+
+on_commit([Job], _invalidate_schedule, collect=_booking_change)
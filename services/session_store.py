@@ -0,0 +1,232 @@
+"""
+Server-side sessions.
+
+Flask's default session is the whole dict in a signed cookie: every request
+decodes it, verifies its HMAC and parses it, and every change re-signs and
+resends it. With SESSION_BACKEND set to 'database' (the default) or
+'sqlite', the cookie carries only a random session id and the dict
+(Flask-Login's _user_id, the CSRF secret, flashed messages) lives in a
+user_session row:
+
+    database  the main database, shared by every host and kept across restarts
+    sqlite    instance/sessions.db, local to one host and lost with its disk
+              (opt-in; not for Heroku dynos or several app hosts)
+    cookie    Flask's signed cookie, as before
+
+The row is read on first use of the session, with one primary-key read.
+A request that never touches the session makes no query at all, such as
+one the rate limiter rejects (services/rate_limit.py). Unchanged sessions
+are not
+written back: their sliding expiry (SESSION_IDLE_MINUTES, default 720) is
+kept in memory and flushed as one executemany UPDATE at most every
+SESSION_TOUCH_SECONDS (default 60). The id is rotated whenever the
+logged-in user changes, and `flask purge-sessions` deletes expired rows.
+
+Role names deliberately stay out of the session record:
+services/principal_cache.py holds them with invalidation, so a revoked role
+never waits for a session to expire.
+"""
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+from sqlalchemy import bindparam, create_engine, delete, insert, select, update
+
+from extensions import db
+from models import UserSession
+from services import sqlite_tuning
+
+BACKENDS = ('sqlite', 'database', 'cookie')
+SESSION_ID_BYTES = 32
+SESSION_ID_LENGTH = 43  # len(secrets.token_urlsafe(SESSION_ID_BYTES))
+
+
+class ServerSideSession(SecureCookieSession):
+    """Session dict whose stored data is read only when something first uses it."""
+
+    def __init__(self, initial=None, sid=None, loader=None):
+        super().__init__(initial)
+        self.sid = sid
+        self._loader = loader  # returns the stored dict, or None for an unknown or expired id
+        self.loaded_user_id = None if loader else dict.get(self, '_user_id')
+
+    @property
+    def pending(self):
+        """True while the stored data has not been read yet."""
+        return self._loader is not None
+
+    def _load(self):
+        loader, self._loader = self._loader, None
+        data = loader()
+        if data is None:
+            self.sid = None
+        else:
+            # Not through update(): loading is not a modification
+            dict.update(self, data)
+            self.loaded_user_id = data.get('_user_id')
+
+
+def _loads_first(name):
+    method = getattr(SecureCookieSession, name)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._loader is not None:
+            self._load()
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+for _name in ('__getitem__', '__setitem__', '__delitem__', '__contains__', '__iter__', '__len__',
+              '__eq__', '__ne__', '__repr__', 'get', 'setdefault', 'pop', 'popitem', 'update', 'clear',
+              'keys', 'values', 'items', 'copy'):
+    setattr(ServerSideSession, _name, _loads_first(_name))
+
+
+class SessionStore:
+    """user_session rows behind one engine."""
+
+    table = UserSession.__table__
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def load(self, sid):
+        with self.engine.connect() as conn:
+            return conn.execute(select(self.table.c.data, self.table.c.expires_at)
+                                .where(self.table.c.id == sid)).first()
+
+    def save(self, sid, user_id, data, expires_at):
+        values = {'user_id': user_id, 'data': data, 'expires_at': expires_at}
+        with self.engine.begin() as conn:
+            if not conn.execute(update(self.table).where(self.table.c.id == sid).values(**values)).rowcount:
+                conn.execute(insert(self.table).values(id=sid, **values))
+
+    def delete(self, sid):
+        with self.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.id == sid))
+
+    def touch(self, expiries):
+        """Push back the expiry of many sessions in one executemany UPDATE."""
+        with self.engine.begin() as conn:
+            conn.execute(update(self.table).where(self.table.c.id == bindparam('sid'))
+                         .values(expires_at=bindparam('new_expires_at')),
+                         [{'sid': sid, 'new_expires_at': expires_at} for sid, expires_at in expiries.items()])
+
+    def purge(self, now=None):
+        with self.engine.begin() as conn:
+            return conn.execute(delete(self.table).where(self.table.c.expires_at < (now or datetime.now()))).rowcount
+
+
+class ServerSideSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+    session_class = ServerSideSession
+
+    def __init__(self, store, idle=timedelta(minutes=720), touch_seconds=60):
+        self.store = store
+        self.idle = idle
+        self.touch_seconds = touch_seconds
+        self._touches = {}  # sid -> expires_at not yet written back
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and len(sid) == SESSION_ID_LENGTH:
+            return self.session_class(sid=sid, loader=lambda: self._load(sid))
+        return self.session_class()
+
+    def _load(self, sid):
+        record = self.store.load(sid)
+        if record is not None:
+            expires_at = max(record.expires_at, self._touches.get(sid, record.expires_at))
+            if expires_at > datetime.now():
+                return self.serializer.loads(record.data)
+        return None
+
+    def save_session(self, app, session, response):
+        if session.pending:
+            # Never read in this request, so nothing changed and the expiry stays as it is
+            return
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+        if not session:
+            if session.sid and session.modified:
+                # Cleared, e.g. on logout
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+            return
+
+        expires_at = datetime.now() + self.idle
+        sid = session.sid
+        if sid and session.get('_user_id') != session.loaded_user_id:
+            # Logged in or switched user: new id, so a planted cookie is useless
+            self.store.delete(sid)
+            sid = None
+        if sid is None or session.modified:
+            new_sid = sid is None
+            sid = sid or secrets.token_urlsafe(SESSION_ID_BYTES)
+            self.store.save(sid, session.get('_user_id'), self.serializer.dumps(dict(session)), expires_at)
+            self._touches.pop(sid, None)
+            if new_sid:
+                response.set_cookie(name, sid, expires=self.get_expiration_time(app, session),
+                                    domain=domain, path=path, secure=secure, samesite=samesite,
+                                    httponly=httponly)
+        else:
+            self._touch(sid, expires_at)
+
+    def _touch(self, sid, expires_at):
+        with self._lock:
+            self._touches[sid] = expires_at
+            if time.monotonic() - self._flushed_at < self.touch_seconds:
+                return
+            touches, self._touches = self._touches, {}
+            self._flushed_at = time.monotonic()
+        self.store.touch(touches)
+
+    def flush(self):
+        """Write back all pending expiry updates now."""
+        with self._lock:
+            touches, self._touches = self._touches, {}
+            self._flushed_at = time.monotonic()
+        if touches:
+            self.store.touch(touches)
+
+
+def init_app(app):
+    """Install the server-side session interface selected by SESSION_BACKEND."""
+    backend = app.config.get('SESSION_BACKEND', 'database')
+    if backend not in BACKENDS:
+        raise RuntimeError(f'SESSION_BACKEND must be one of {", ".join(BACKENDS)}, not {backend!r}')
+    if backend == 'cookie':
+        return None
+    if backend == 'database':
+        with app.app_context():
+            engine = db.engine
+    else:
+        os.makedirs(app.instance_path, exist_ok=True)
+        engine = create_engine('sqlite:///' + os.path.join(app.instance_path, 'sessions.db'))
+        if app.config.get('SQLITE_TUNING', True):
+            sqlite_tuning.configure_engine(engine, app.config)
+        UserSession.__table__.create(engine, checkfirst=True)
+        # No pooled SQLite handle may survive into gunicorn's forked workers;
+        # each process opens its own on first use (see also gunicorn.conf.py post_fork)
+        engine.dispose()
+    app.session_interface = ServerSideSessionInterface(
+        SessionStore(engine),
+        idle=timedelta(minutes=app.config.get('SESSION_IDLE_MINUTES', 720)),
+        touch_seconds=app.config.get('SESSION_TOUCH_SECONDS', 60))
+    return app.session_interface
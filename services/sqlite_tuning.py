@@ -0,0 +1,94 @@
+"""
+SQLite production profile.
+
+Smaller depots run straight off `sqlite:///app.db`. With the default rollback
+journal every writer blocks every reader and concurrent gunicorn workers see
+"database is locked". This module switches SQLite engines to WAL with
+production pragmas on every new connection, and provides a checkpoint helper
+so the -wal file doesn't grow without bound.
+
+Settings (all optional, read from app.config):
+
+    SQLITE_TUNING              enable the profile (default True)
+    SQLITE_BUSY_TIMEOUT_MS     how long a connection waits on a lock (5000)
+    SQLITE_CACHE_SIZE_KB       page cache per connection (65536)
+    SQLITE_MMAP_SIZE           bytes of the file to memory-map (268435456)
+    SQLITE_WAL_AUTOCHECKPOINT  pages in the WAL before an automatic
+                               PASSIVE checkpoint (1000)
+    SQLITE_JOURNAL_SIZE_LIMIT  bytes the WAL is truncated back to after a
+                               checkpoint (67108864)
+"""
+from sqlalchemy import event, text
+
+DEFAULTS = {
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,
+    'SQLITE_CACHE_SIZE_KB': 65536,
+    'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,
+    'SQLITE_WAL_AUTOCHECKPOINT': 1000,
+    'SQLITE_JOURNAL_SIZE_LIMIT': 64 * 1024 * 1024,
+}
+
+
+def build_pragmas(config=None):
+    """Return the ordered list of PRAGMA statements for a new connection."""
+    settings = dict(DEFAULTS)
+    if config:
+        settings.update({key: config[key] for key in DEFAULTS if config.get(key) is not None})
+    return [
+        # busy_timeout first so the journal_mode switch itself waits on a lock
+        f"PRAGMA busy_timeout={int(settings['SQLITE_BUSY_TIMEOUT_MS'])}",
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA cache_size=-{int(settings['SQLITE_CACHE_SIZE_KB'])}",
+        f"PRAGMA mmap_size={int(settings['SQLITE_MMAP_SIZE'])}",
+        'PRAGMA temp_store=MEMORY',
+        f"PRAGMA wal_autocheckpoint={int(settings['SQLITE_WAL_AUTOCHECKPOINT'])}",
+        f"PRAGMA journal_size_limit={int(settings['SQLITE_JOURNAL_SIZE_LIMIT'])}",
+    ]
+
+
+def is_file_sqlite(engine):
+    database = engine.url.database
+    return engine.dialect.name == 'sqlite' and bool(database) and database != ':memory:'
+
+
+def configure_engine(engine, config=None):
+    """Apply the pragmas to every connection the engine opens. No-op for other databases."""
+    if not is_file_sqlite(engine):
+        return False
+    pragmas = build_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return True
+
+
+def checkpoint(engine, mode='PASSIVE'):
+    """Run a WAL checkpoint and return (busy, wal_pages, checkpointed_pages).
+
+    PASSIVE never blocks readers or writers and is safe to run at any time.
+    TRUNCATE waits for readers to finish and then resets the -wal file to
+    zero bytes, which is what the nightly maintenance job should use.
+    """
+    mode = mode.upper()
+    if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+        raise ValueError(f'Unknown checkpoint mode: {mode}')
+    with engine.connect() as conn:
+        row = conn.execute(text(f'PRAGMA wal_checkpoint({mode})')).fetchone()
+    return tuple(row)
+
+
+def init_app(app, db):
+    """Configure every SQLite engine registered on db (default and replica binds)."""
+    if not app.config.get('SQLITE_TUNING', True):
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            configure_engine(engine, app.config)
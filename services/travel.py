@@ -0,0 +1,195 @@
+"""
+Offline travel-time estimates between pickup and dropoff locations.
+
+Locations are free text, so they are first normalized into zones with the
+gazetteer in data/gazetteer.csv: one row per zone with its centroid and the
+place names inside it. A location belongs to the zone of the first place
+name it mentions, preferring the longest name at that position ("changi
+village" over "changi").
+
+Zone-to-zone durations live in instance/travel/matrix.npy, a float32 array
+of shape (2, zones, zones) holding minutes and the number of completed jobs
+behind each estimate. Workers open it with mmap_mode='r', so it is shared
+through the page cache and a batch lookup is one fancy-index into it.
+`flask build-travel-matrix` writes it: the prior is the straight-line
+distance between centroids times TRAVEL_ROAD_FACTOR (default 1.4) at
+TRAVEL_AVERAGE_KMH (default 35), blended with the actual durations of
+completed jobs (pickup to completed_at), each pair weighted by its number of
+jobs against TRAVEL_PRIOR_WEIGHT (default 5). Until the file exists, the
+prior is used.
+"""
+import csv
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import event, select
+
+from extensions import db
+from models import Job
+from services.availability import availability, job_window
+
+EARTH_RADIUS_KM = 6371.0
+# Jobs whose pickup-to-completion time falls outside this range are bad data
+MIN_ACTUAL_MINUTES = 5
+MAX_ACTUAL_MINUTES = 6 * 60
+
+
+class Gazetteer:
+    """Zones with their centroids, and a matcher from free-text locations to zone numbers."""
+
+    def __init__(self, path):
+        self.zones, latitudes, longitudes, place_zones = [], [], [], {}
+        with open(path, newline='', encoding='utf-8') as f:
+            for number, row in enumerate(csv.DictReader(f)):
+                self.zones.append(row['zone'])
+                latitudes.append(float(row['latitude']))
+                longitudes.append(float(row['longitude']))
+                for place in [row['zone']] + row['places'].split('|'):
+                    place_zones.setdefault(self.normalize(place), number)
+        self.latitudes = np.radians(np.array(latitudes))
+        self.longitudes = np.radians(np.array(longitudes))
+        self._place_zones = place_zones
+        # Longest names first, so the alternation prefers them at the same position
+        names = sorted(place_zones, key=len, reverse=True)
+        self._place_re = re.compile(r'\b(' + '|'.join(re.escape(name) for name in names) + r')\b')
+        self.zone_of = lru_cache(maxsize=4096)(self._zone_of)
+
+    @staticmethod
+    def normalize(location):
+        return ' '.join(re.sub(r'[^\w]+', ' ', location.lower()).split())
+
+    def _zone_of(self, location):
+        """Zone number for a location, or -1 if it names no known place."""
+        if not location:
+            return -1
+        match = self._place_re.search(self.normalize(location))
+        return self._place_zones[match.group(1)] if match else -1
+
+    def distances_km(self):
+        """Great-circle distance between every pair of zone centroids."""
+        lat, lon = self.latitudes, self.longitudes
+        dlat = lat[:, None] - lat[None, :]
+        dlon = lon[:, None] - lon[None, :]
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class TravelTimeService:
+    def __init__(self):
+        self.gazetteer = None
+        self.matrix_path = None
+        self.average_kmh = 35
+        self.road_factor = 1.4
+        self.min_minutes = 10
+        self.prior_weight = 5
+        self.reload_seconds = 60
+        self._matrix = None
+        self._loaded = (0, None)  # (monotonic time of last check, file mtime)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.gazetteer = Gazetteer(app.config.get(
+            'TRAVEL_GAZETTEER', os.path.join(app.root_path, 'data', 'gazetteer.csv')))
+        self.average_kmh = app.config.get('TRAVEL_AVERAGE_KMH', 35)
+        self.road_factor = app.config.get('TRAVEL_ROAD_FACTOR', 1.4)
+        self.min_minutes = app.config.get('TRAVEL_MIN_MINUTES', 10)
+        self.prior_weight = app.config.get('TRAVEL_PRIOR_WEIGHT', 5)
+        self.reload_seconds = app.config.get('TRAVEL_RELOAD_SECONDS', 60)
+        self.matrix_path = os.path.join(app.instance_path, 'travel', 'matrix.npy')
+        self._matrix = None
+
+    def prior(self):
+        """Minutes between zone centroids at the configured road factor and average speed."""
+        minutes = self.gazetteer.distances_km() * self.road_factor / self.average_kmh * 60
+        return np.maximum(minutes, self.min_minutes).astype(np.float32)
+
+    def matrix(self):
+        """The (2, zones, zones) minutes/samples array, memory-mapped and reloaded when the file changes."""
+        now = time.monotonic()
+        if self._matrix is not None and now - self._loaded[0] < self.reload_seconds:
+            return self._matrix
+        with self._lock:
+            try:
+                mtime = os.stat(self.matrix_path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if self._matrix is None or mtime != self._loaded[1]:
+                zones = len(self.gazetteer.zones)
+                matrix = np.load(self.matrix_path, mmap_mode='r') if mtime else None
+                if matrix is None or matrix.shape != (2, zones, zones):
+                    # No matrix yet, or one built for a different gazetteer
+                    matrix = np.stack([self.prior(), np.zeros((zones, zones), dtype=np.float32)])
+                self._matrix = matrix
+            self._loaded = (now, mtime)
+            return self._matrix
+
+    def zones(self, locations):
+        return np.fromiter((self.gazetteer.zone_of(location) for location in locations),
+                           dtype=np.intp, count=len(locations))
+
+    def estimate_many(self, pickups, dropoffs):
+        """Estimated minutes for each pickup/dropoff pair; NaN where either location is unknown."""
+        origins, destinations = self.zones(pickups), self.zones(dropoffs)
+        minutes = self.matrix()[0][origins, destinations].astype(np.float32)
+        minutes[(origins < 0) | (destinations < 0)] = np.nan
+        return minutes
+
+    def estimate(self, pickup, dropoff):
+        """Estimated minutes from pickup to dropoff, or None if either location is unknown."""
+        origin, destination = self.gazetteer.zone_of(pickup), self.gazetteer.zone_of(dropoff)
+        if origin < 0 or destination < 0:
+            return None
+        return float(self.matrix()[0][origin, destination])
+
+    def learn(self):
+        """Rebuild the matrix from the prior and completed jobs; returns the number of jobs used."""
+        zones = len(self.gazetteer.zones)
+        totals = np.zeros((zones, zones))
+        counts = np.zeros((zones, zones))
+        rows = db.session.execute(
+            select(Job.pickup_location, Job.dropoff_location, Job.pickup_date, Job.pickup_time, Job.completed_at)
+            .where(Job.completed_at.isnot(None), Job.pickup_time.isnot(None))).all()
+        origins, destinations, minutes = [], [], []
+        for row in rows:
+            start, _ = job_window(row.pickup_date, row.pickup_time, availability.duration)
+            if start is None:
+                continue
+            actual = (row.completed_at - start).total_seconds() / 60
+            origin = self.gazetteer.zone_of(row.pickup_location)
+            destination = self.gazetteer.zone_of(row.dropoff_location)
+            if MIN_ACTUAL_MINUTES <= actual <= MAX_ACTUAL_MINUTES and origin >= 0 and destination >= 0:
+                origins.append(origin)
+                destinations.append(destination)
+                minutes.append(actual)
+        np.add.at(totals, (origins, destinations), minutes)
+        np.add.at(counts, (origins, destinations), 1)
+
+        blended = (self.prior() * self.prior_weight + totals) / (self.prior_weight + counts)
+        matrix = np.stack([blended, counts]).astype(np.float32)
+        os.makedirs(os.path.dirname(self.matrix_path), exist_ok=True)
+        # Write aside and rename, so workers never map a half-written file
+        tmp_path = self.matrix_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, matrix)
+        os.replace(tmp_path, self.matrix_path)
+        self._matrix = None
+        return len(minutes)
+
+
+travel_times = TravelTimeService()
+
+
+@event.listens_for(Job.order_status, 'set', active_history=True)
+@event.listens_for(Job.status, 'set', active_history=True)
+def _stamp_completed_at(job, value, oldvalue, initiator):
+    # Jobs carry two status fields; either one reaching Completed counts
+    other = job.order_status if initiator.key == 'status' else job.status
+    if value == 'Completed' and job.completed_at is None:
+        job.completed_at = datetime.now()
+    elif value != 'Completed' and oldvalue == 'Completed' and other != 'Completed':
+        job.completed_at = None
@@ -6,6 +6,7 @@ class FleetChat {
     this.chatMessages = document.getElementById('chatMessages');
     this.downloadSection = document.getElementById('downloadSection');
     this.downloadBtn = document.getElementById('downloadBtn');
+    this.downloadXlsxBtn = document.getElementById('downloadXlsxBtn');
     
     // Control buttons
     this.dockBtn = document.getElementById('dockBtn');
@@ -17,8 +18,7 @@ class FleetChat {
     this.isFullscreen = false;
     this.isDocked = false;
     this.isHidden = false;
-    this.currentData = null;
-    this.currentQuery = null;
+    this.exportToken = null;
     
     this.init();
   }
@@ -100,8 +100,20 @@ class FleetChat {
       });
     });
     
+    // Free-text queries
+    const queryForm = document.getElementById('chatQueryForm');
+    const queryInput = document.getElementById('chatQueryInput');
+    queryForm.addEventListener('submit', (e) => {
+      e.preventDefault();
+      const query = queryInput.value.trim();
+      if (!query) return;
+      queryInput.value = '';
+      this.handleButtonClick(query);
+    });
+    
     // Download button
-    this.downloadBtn.addEventListener('click', () => this.downloadData());
+    this.downloadBtn.addEventListener('click', () => this.downloadData('csv'));
+    this.downloadXlsxBtn.addEventListener('click', () => this.downloadData('xlsx'));
     
     // Make header draggable
     this.makeDraggable();
@@ -144,7 +156,7 @@ class FleetChat {
     } else {
       this.chatMessages.style.display = 'block';
       document.querySelector('.chat-buttons-container').style.display = 'block';
-      if (this.currentData) {
+      if (this.exportToken) {
         this.downloadSection.style.display = 'block';
       }
     }
@@ -215,9 +227,11 @@ class FleetChat {
     });
   }
   
-  async handleButtonClick(query) {
-    // Add user message
-    this.addMessage(query, 'user');
+  async handleButtonClick(query, cursor = null) {
+    // Add user message (not for "load more" pages of the previous answer)
+    if (cursor === null) {
+      this.addMessage(this.escapeHtml(query), 'user');
+    }
     
     // Show typing indicator
     this.showTypingIndicator();
@@ -226,32 +240,53 @@ class FleetChat {
       // Get CSRF token
       const csrfToken = document.querySelector('meta[name="csrf-token"]')?.getAttribute('content');
       
-      // Send to backend
-      const response = await fetch('/api/chat', {
+      // Send to backend; the answer streams back as Server-Sent Events
+      const response = await fetch('/api/chat/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Accept': 'text/event-stream',
           'X-CSRFToken': csrfToken
         },
-        body: JSON.stringify({ message: query })
+        body: JSON.stringify({ message: query, cursor: cursor })
       });
       
-      const data = await response.json();
-      
-      // Remove typing indicator
-      this.removeTypingIndicator();
+      if (!response.ok || !response.body) {
+        throw new Error(`Chat request failed: ${response.status}`);
+      }
       
-      // Store current data and query for download
-      this.currentData = data.data;
-      this.currentQuery = query;
+      // A new question replaces the export; "load more" pages keep the first page's token
+      if (cursor === null) {
+        this.exportToken = null;
+      }
       
-      // Add assistant response
-      this.addMessage(data.response, 'assistant', data.data);
+      let messageDiv = null;
+      let rowCount = 0;
+      await this.readEventStream(response, (event, payload) => {
+        if (event === 'message') {
+          // Answer text arrives first, before any rows are fetched
+          this.removeTypingIndicator();
+          messageDiv = this.addMessage(payload.response, 'assistant');
+          if (payload.export_token) {
+            this.exportToken = payload.export_token;
+          }
+        } else if (event === 'rows') {
+          rowCount += payload.length;
+          this.appendRows(messageDiv, payload);
+        } else if (event === 'done') {
+          this.addLoadMore(messageDiv, query, payload.next_cursor);
+        } else if (event === 'error') {
+          this.removeTypingIndicator();
+          this.addMessage(`Sorry, I encountered an error: ${this.escapeHtml(payload.response)}`, 'assistant');
+        }
+      });
+      this.removeTypingIndicator();
       
       // Show download section if there's data
-      if (data.data && data.data.length > 0) {
+      if (this.exportToken && (rowCount > 0 || cursor !== null)) {
         this.downloadSection.style.display = 'block';
       } else {
+        this.exportToken = null;
         this.downloadSection.style.display = 'none';
       }
       
@@ -262,42 +297,56 @@ class FleetChat {
     }
   }
   
-  async downloadData() {
-    if (!this.currentData || !this.currentQuery) return;
+  async readEventStream(response, onEvent) {
+    // Minimal text/event-stream parser for a fetch() body (EventSource can't POST)
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
     
-    try {
-      const csrfToken = document.querySelector('meta[name="csrf-token"]')?.getAttribute('content');
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
       
-      const response = await fetch('/api/chat/download', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'X-CSRFToken': csrfToken
-        },
-        body: JSON.stringify({ 
-          query: this.currentQuery,
-          data: this.currentData 
-        })
-      });
-      
-      if (response.ok) {
-        const blob = await response.blob();
-        const url = window.URL.createObjectURL(blob);
-        const a = document.createElement('a');
-        a.href = url;
-        a.download = `${this.currentQuery.replace(/\s+/g, '_')}_${new Date().toISOString().split('T')[0]}.csv`;
-        document.body.appendChild(a);
-        a.click();
-        window.URL.revokeObjectURL(url);
-        document.body.removeChild(a);
-      } else {
-        console.error('Download failed');
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const frame = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        
+        let event = 'message';
+        let data = '';
+        frame.split('\n').forEach(line => {
+          if (line.startsWith('event: ')) {
+            event = line.slice(7);
+          } else if (line.startsWith('data: ')) {
+            data += line.slice(6);
+          }
+        });
+        if (data) {
+          onEvent(event, JSON.parse(data));
+        }
       }
-    } catch (error) {
-      console.error('Download error:', error);
     }
   }
   
+  downloadData(format) {
+    // The server re-runs the signed query and streams every matching row
+    if (!this.exportToken) return;
+    
+    const params = new URLSearchParams({ token: this.exportToken, format: format });
+    const a = document.createElement('a');
+    a.href = `/api/chat/download?${params.toString()}`;
+    document.body.appendChild(a);
+    a.click();
+    document.body.removeChild(a);
+  }
+  
+  escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+  }
+  
   addMessage(content, type, data = null) {
     const messageDiv = document.createElement('div');
     messageDiv.className = `message ${type}`;
@@ -326,6 +375,36 @@ class FleetChat {
     
     // Scroll to bottom
     this.chatMessages.scrollTop = this.chatMessages.scrollHeight;
+    return messageDiv;
+  }
+  
+  appendRows(messageDiv, rows) {
+    // Add a streamed batch to the message's table, creating the table on the first batch
+    if (!messageDiv || !rows || rows.length === 0) return;
+    const body = messageDiv.querySelector('.message-content > div');
+    const tbody = body.querySelector('table.data-table tbody');
+    
+    if (tbody) {
+      const columns = Array.from(body.querySelectorAll('table.data-table th')).map(th => th.dataset.column);
+      tbody.insertAdjacentHTML('beforeend', rows.map(row => this.formatDataRow(row, columns)).join(''));
+    } else {
+      body.insertAdjacentHTML('beforeend', this.formatDataTable(rows));
+    }
+    
+    this.chatMessages.scrollTop = this.chatMessages.scrollHeight;
+  }
+  
+  addLoadMore(messageDiv, query, nextCursor) {
+    // Keyset pagination: fetch the rows after the last one shown
+    if (!messageDiv || nextCursor === null || nextCursor === undefined) return;
+    const loadMore = document.createElement('button');
+    loadMore.className = 'btn btn-sm btn-outline-primary chat-load-more';
+    loadMore.innerHTML = '<i class="bi bi-chevron-down"></i> Load more';
+    loadMore.addEventListener('click', () => {
+      loadMore.remove();
+      this.handleButtonClick(query, nextCursor);
+    });
+    messageDiv.querySelector('.message-content > div').appendChild(loadMore);
   }
   
   formatDataTable(data) {
@@ -337,32 +416,36 @@ class FleetChat {
     // Header
     tableHTML += '<thead><tr>';
     columns.forEach(col => {
-      tableHTML += `<th>${col.replace(/_/g, ' ').toUpperCase()}</th>`;
+      tableHTML += `<th data-column="${col}">${col.replace(/_/g, ' ').toUpperCase()}</th>`;
     });
     tableHTML += '</tr></thead>';
     
     // Body
     tableHTML += '<tbody>';
     data.forEach(row => {
-      tableHTML += '<tr>';
-      columns.forEach(col => {
-        let value = row[col] || '';
-        
-        // Format status badges
-        if (col.includes('status') && value) {
-          const statusClass = this.getStatusClass(value);
-          value = `<span class="status-badge ${statusClass}">${value}</span>`;
-        }
-        
-        tableHTML += `<td>${value}</td>`;
-      });
-      tableHTML += '</tr>';
+      tableHTML += this.formatDataRow(row, columns);
     });
     tableHTML += '</tbody></table></div>';
     
     return tableHTML;
   }
   
+  formatDataRow(row, columns) {
+    let rowHTML = '<tr>';
+    columns.forEach(col => {
+      let value = row[col] || '';
+      
+      // Format status badges
+      if (col.includes('status') && value) {
+        const statusClass = this.getStatusClass(value);
+        value = `<span class="status-badge ${statusClass}">${value}</span>`;
+      }
+      
+      rowHTML += `<td>${value}</td>`;
+    });
+    return rowHTML + '</tr>';
+  }
+  
   getStatusClass(status) {
     const statusLower = status.toLowerCase();
     if (statusLower.includes('active') || statusLower.includes('completed') || statusLower.includes('paid')) {
@@ -420,7 +503,7 @@ class FleetChat {
       this.chatWindow.classList.remove('minimized');
       this.chatMessages.style.display = 'block';
       document.querySelector('.chat-buttons-container').style.display = 'block';
-      if (this.currentData) {
+      if (this.exportToken) {
         this.downloadSection.style.display = 'block';
       }
     }
@@ -0,0 +1,33 @@
+// Live job board: opens the change feed on pages that ask for it with
+// data-change-feed="<stream url>" and re-dispatches every change as a
+// "change-feed" event on document.body, so each page patches what it shows.
+document.addEventListener('DOMContentLoaded', function() {
+  const host = document.querySelector('[data-change-feed]');
+  if (!host || !window.EventSource) return;
+
+  // Seconds before trying again when the server turned the stream away (503: all slots busy)
+  const BUSY_RETRY_SECONDS = 30;
+
+  function connect() {
+    // EventSource reconnects by itself after a dropped stream and sends Last-Event-ID
+    const source = new EventSource(host.dataset.changeFeed);
+    source.addEventListener('change', function(event) {
+      document.body.dispatchEvent(new CustomEvent('change-feed', {detail: JSON.parse(event.data)}));
+    });
+    // Too far behind to catch up event by event: the page reloads what it shows
+    source.addEventListener('reset', function() {
+      document.body.dispatchEvent(new CustomEvent('change-feed', {detail: {op: 'reset'}}));
+    });
+    // A non-200 answer closes the EventSource for good, so reopen it later ourselves
+    source.addEventListener('error', function() {
+      if (source.readyState === EventSource.CLOSED) {
+        setTimeout(function() {
+          connect();
+          // Changes may have been missed while disconnected
+          document.body.dispatchEvent(new CustomEvent('change-feed', {detail: {op: 'reset'}}));
+        }, BUSY_RETRY_SECONDS * 1000);
+      }
+    });
+  }
+  connect();
+});
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for the change feed's settled cursor (no database or server needed)
+
+Run with: python -m pytest -q test_change_feed.py
+"""
+
+import pytest
+
+from services.change_feed import ChangeFeed
+
+
+@pytest.fixture
+def feed():
+    feed = ChangeFeed()
+    feed.gap_seconds = 10
+    feed.settled = 10
+    return feed
+
+
+def test_in_order_ids_settle_immediately(feed):
+    feed._advance([11, 12, 13], now=0)
+    assert feed.settled == 13
+    assert feed._seen == set() and feed._gaps == {}
+
+
+def test_out_of_order_id_holds_the_cursor_until_the_gap_fills(feed):
+    feed._advance([11, 13, 14], now=0)
+    assert feed.settled == 11
+    assert feed._seen == {13, 14} and feed._gaps == {12: 0}
+
+    # The transaction holding 12 commits late
+    feed._advance([12], now=3)
+    assert feed.settled == 14
+    assert feed._seen == set() and feed._gaps == {}
+
+
+def test_gap_is_given_up_after_gap_seconds(feed):
+    feed._advance([12], now=0)
+    feed._advance([], now=9.9)
+    assert feed.settled == 10
+
+    feed._advance([], now=10)
+    assert feed.settled == 12
+    assert feed._gaps == {}
+
+
+def test_gap_expiry_counts_from_when_it_was_first_noticed(feed):
+    feed._advance([12], now=0)
+    feed._advance([13], now=8)
+    assert feed._gaps == {11: 0}
+
+    feed._advance([], now=10)
+    assert feed.settled == 13
+
+
+def test_cursor_runs_through_expired_gaps_and_read_ids(feed):
+    feed._advance([12, 15], now=0)
+    feed._advance([14], now=5)
+    assert feed.settled == 10 and feed._seen == {12, 14, 15}
+
+    # 11 expires, 12 was read, 13 also expires, then 14 and 15 were read
+    feed._advance([], now=10)
+    assert feed.settled == 15
+    assert feed._seen == set() and feed._gaps == {}
+
+
+def test_later_gap_expires_on_its_own_clock(feed):
+    feed._advance([12], now=0)
+    feed._advance([14], now=6)
+    assert feed._gaps == {11: 0, 13: 6}
+
+    feed._advance([], now=10)
+    assert feed.settled == 12
+    feed._advance([], now=16)
+    assert feed.settled == 14
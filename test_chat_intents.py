@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Table-driven tests for the chat intent engine (no database or server needed)
+
+Run with: python -m pytest -q test_chat_intents.py
+"""
+
+from datetime import date
+
+import pytest
+
+from services.chat_intents import parse, resolve_date_range
+
+TODAY = date(2025, 7, 16)  # a Wednesday
+
+# message, expected intent, expected slots
+CASES = [
+    ("Show all jobs", 'jobs', {}),
+    ("Active jobs", 'jobs', {'status': 'active'}),
+    ("Pending jobs", 'jobs', {'status': 'pending'}),
+    ("Completed jobs", 'jobs', {'status': 'completed'}),
+    ("cancelled jobs", 'jobs', {'status': 'cancelled'}),
+    ("canceled job", 'jobs', {'status': 'cancelled'}),
+    ("jobs in progress", 'jobs', {'status': 'in_progress'}),
+    ("new jobs", 'jobs', {'status': 'new'}),
+    ("Unpaid jobs", 'jobs', {'payment': 'unpaid'}),
+    ("paid jobs", 'jobs', {'payment': 'paid'}),
+    ("unpaid completed jobs", 'jobs', {'payment': 'unpaid', 'status': 'completed'}),
+    ("Job status", 'status', {}),
+    ("status", 'status', {}),
+    ("status of active jobs", 'jobs', {'status': 'active'}),
+    ("All drivers", 'drivers', {}),
+    ("Available drivers", 'drivers', {'available': True}),
+    ("Available vehicles", 'vehicles', {'available': True}),
+    ("list vehicles", 'vehicles', {}),
+    ("show agents", 'agents', {}),
+    ("services", 'services', {}),
+    ("billing records", 'billing', {}),
+    ("unpaid invoices", 'billing', {'payment': 'unpaid'}),
+    ("Payment status", 'payment', {}),
+    ("unpaid payments", 'payment', {'payment': 'unpaid'}),
+    ("paid payments", 'payment', {'payment': 'paid'}),
+    ("Dashboard summary", 'dashboard', {}),
+    ("give me an overview", 'dashboard', {}),
+    ("Help", 'help', {}),
+    ("what can you do?", 'help', {}),
+    ("what   can you   do", 'help', {}),
+    ("driver jobs", 'jobs', {}),
+    ("jobless", None, {}),
+    ("hello there", None, {}),
+    ("", None, {}),
+    ("top 5 jobs", 'jobs', {'limit': 5}),
+    ("show 20 completed jobs", 'jobs', {'status': 'completed', 'limit': 20}),
+    ("last 3 unpaid jobs", 'jobs', {'payment': 'unpaid', 'limit': 3}),
+    ("show 99999 jobs", 'jobs', {}),
+    ("top 0 jobs", 'jobs', {'limit': 1}),
+    ("jobs today", 'jobs', {'date_range': ('today', '2025-07-16', '2025-07-16')}),
+    ("jobs yesterday", 'jobs', {'date_range': ('yesterday', '2025-07-15', '2025-07-15')}),
+    ("tomorrow's jobs", 'jobs', {'date_range': ('tomorrow', '2025-07-17', '2025-07-17')}),
+    ("completed jobs this week", 'jobs',
+     {'status': 'completed', 'date_range': ('this_week', '2025-07-14', '2025-07-20')}),
+    ("unpaid jobs last month", 'jobs',
+     {'payment': 'unpaid', 'date_range': ('last_month', '2025-06-01', '2025-06-30')}),
+    ("jobs for agent acme travel", 'jobs', {'agent_name': 'acme travel'}),
+    ("completed jobs by driver john tan this week", 'jobs',
+     {'status': 'completed', 'driver_name': 'john tan',
+      'date_range': ('this_week', '2025-07-14', '2025-07-20')}),
+    ("top 5 jobs for driver ali for agent acme", 'jobs',
+     {'limit': 5, 'driver_name': 'ali', 'agent_name': 'acme'}),
+    ("agent acme", 'agents', {'agent_name': 'acme'}),
+    ("driver jobs today", 'jobs', {'date_range': ('today', '2025-07-16', '2025-07-16')}),
+]
+
+
+@pytest.mark.parametrize('message,expected_intent,expected_slots', CASES)
+def test_parse(message, expected_intent, expected_slots):
+    intent = parse(message, today=TODAY)
+    assert intent.name == expected_intent
+    assert intent.slots == expected_slots
+
+
+@pytest.mark.parametrize('label,start,end', [
+    ('last_week', '2025-07-07', '2025-07-13'),
+    ('this_month', '2025-07-01', '2025-07-31'),
+])
+def test_resolve_date_range(label, start, end):
+    assert resolve_date_range(label, TODAY) == (label, start, end)
+
+
+def test_resolve_date_range_across_year_boundary():
+    assert resolve_date_range('last_month', date(2025, 1, 10)) == ('last_month', '2024-12-01', '2024-12-31')
+    assert resolve_date_range('this_month', date(2024, 12, 10)) == ('this_month', '2024-12-01', '2024-12-31')
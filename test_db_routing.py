@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for read-replica routing with two SQLite files, one standing in for the
+primary and one for the replica (no server needed)
+
+Run with: python -m pytest -q test_db_routing.py
+"""
+
+import pytest
+from flask import Flask, jsonify
+
+from extensions import db
+from models import Driver
+from services import db_routing
+from services.db_routing import read_replica
+
+
+def driver_names():
+    return sorted(db.session.execute(db.select(Driver.name)).scalars())
+
+
+def make_app(tmp_path, replica):
+    app = Flask(__name__, instance_path=str(tmp_path))
+    app.secret_key = 'test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path}/primary.db'
+    if replica:
+        app.config['SQLALCHEMY_BINDS'] = {db_routing.REPLICA_BIND: f'sqlite:///{tmp_path}/replica.db'}
+    app.config['REPLICA_STICKY_SECONDS'] = 5
+    db.init_app(app)
+    db_routing.init_app(app)
+
+    @app.route('/report')
+    @read_replica
+    def report():
+        return jsonify(driver_names())
+
+    @app.route('/add-and-report', methods=['POST'])
+    @read_replica
+    def add_and_report():
+        db.session.add(Driver(name='added', phone='0'))
+        db.session.commit()
+        return jsonify(driver_names())
+
+    @app.route('/add', methods=['POST'])
+    def add():
+        db.session.add(Driver(name='added', phone='0'))
+        db.session.commit()
+        return jsonify([])
+
+    with app.app_context():
+        for bind_key in [None] + ([db_routing.REPLICA_BIND] if replica else []):
+            engine = db.engines[bind_key]
+            db.metadata.create_all(engine)
+            with engine.begin() as conn:
+                # Each file names itself, so a read shows where it was served from
+                conn.execute(Driver.__table__.insert(), {'name': bind_key or 'primary', 'phone': '0'})
+    return app
+
+
+# Not named app: pytest-flask, when installed, would push one context around the
+# whole test, and per-request state in g would leak from one request into the next
+@pytest.fixture
+def routed_app(tmp_path):
+    yield make_app(tmp_path, replica=True)
+    # init_app left an empty metadata for the bind on the shared db, and
+    # create_all() in apps without a replica would ask for its engine
+    db.metadatas.pop(db_routing.REPLICA_BIND, None)
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1_000_000.0)
+    monkeypatch.setattr(db_routing.time, 'time', clock)
+    return clock
+
+
+def test_read_replica_view_reads_the_replica(routed_app):
+    app = routed_app
+    assert app.test_client().get('/report').get_json() == ['replica']
+
+
+def test_write_then_read_in_one_request_stays_on_the_primary(routed_app):
+    app = routed_app
+    assert app.test_client().post('/add-and-report').get_json() == ['added', 'primary']
+
+
+def test_recent_writer_is_pinned_to_the_primary(routed_app, clock):
+    app = routed_app
+    client = app.test_client()
+    client.post('/add')
+
+    assert client.get('/report').get_json() == ['added', 'primary']
+    # Another user, without the sticky mark in their session, still reads the replica
+    assert app.test_client().get('/report').get_json() == ['replica']
+
+    clock.now += 5
+    assert client.get('/report').get_json() == ['replica']
+
+
+def test_without_a_replica_everything_reads_the_primary(tmp_path):
+    app = make_app(tmp_path, replica=False)
+    client = app.test_client()
+    assert client.get('/report').get_json() == ['primary']
+    assert client.post('/add-and-report').get_json() == ['added', 'primary']
+    with app.app_context():
+        assert not db_routing.replica_enabled()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for dispatch apply(): a reviewed proposal is re-checked against the
+current jobs before anything is written (SQLite file database, no server needed)
+
+Run with: python -m pytest -q test_dispatch.py
+"""
+
+from datetime import date
+
+import pytest
+from flask import Flask
+
+from extensions import db
+from models import Driver, Job, Vehicle
+from services.dispatch import dispatch
+from services.scheduling import conflict_engine
+
+DAY = date(2030, 8, 1)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__, instance_path=str(tmp_path))
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path}/dispatch.db'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        conflict_engine.invalidate()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def fleet(app):
+    drivers = [Driver(name='Ann', phone='1'), Driver(name='Ben', phone='2')]
+    vehicles = [Vehicle(name='Van', number='SG1', type='Van', status='Active'),
+                Vehicle(name='Car', number='SG2', type='Sedan', status='Active')]
+    jobs = [Job(customer_name='a', order_status='New', pickup_date=DAY.isoformat(), pickup_time='09:00'),
+            Job(customer_name='b', order_status='New', pickup_date=DAY.isoformat(), pickup_time='09:30')]
+    db.session.add_all(drivers + vehicles + jobs)
+    db.session.commit()
+    return drivers, vehicles, jobs
+
+
+def proposal():
+    return [a._asdict() for a in dispatch.plan(DAY).assignments]
+
+
+def assigned(job_id):
+    return db.session.execute(db.select(Job.driver_id, Job.vehicle_id).where(Job.id == job_id)).one()
+
+
+def test_apply_writes_a_fresh_proposal(fleet):
+    planned = proposal()
+    assert len(planned) == 2
+    assert dispatch.apply(planned) == []
+    for a in planned:
+        assert tuple(assigned(a['job_id'])) == (a['driver_id'], a['vehicle_id'])
+
+
+def test_apply_rejects_a_job_closed_since_the_proposal(fleet):
+    _, _, jobs = fleet
+    planned = proposal()
+    jobs[0].order_status = 'Cancelled'
+    db.session.commit()
+
+    assert dispatch.apply(planned) == [f'Job #{jobs[0].id} no longer exists or is closed']
+    assert tuple(assigned(jobs[1].id)) == (None, None)
+
+
+def test_apply_rejects_a_job_assigned_since_the_proposal(fleet):
+    drivers, _, jobs = fleet
+    planned = proposal()
+    job_a = next(a for a in planned if a['job_id'] == jobs[0].id)
+    other = next(d for d in drivers if d.id != job_a['driver_id'])
+    jobs[0].driver_id = other.id
+    db.session.commit()
+
+    # That driver was also proposed for the other job, which now clashes with it
+    assert dispatch.apply(planned) == [f'Job #{jobs[0].id} was assigned since the proposal was made',
+                                       f'Job #{jobs[1].id} now clashes with another booking']
+
+
+def test_apply_rejects_a_driver_booked_elsewhere_since_the_proposal(fleet):
+    planned = proposal()
+    # Another job in the same window takes the first proposed driver
+    taken = planned[0]['driver_id']
+    db.session.add(Job(customer_name='c', order_status='New', driver_id=taken,
+                       pickup_date=DAY.isoformat(), pickup_time='10:00'))
+    db.session.commit()
+
+    assert dispatch.apply(planned) == [f"Job #{planned[0]['job_id']} now clashes with another booking"]
+    # Nothing is written when any entry fails
+    for a in planned:
+        assert tuple(assigned(a['job_id'])) == (None, None)
+
+
+def test_apply_rejects_clashes_within_the_proposal(fleet):
+    planned = proposal()
+    planned[1]['driver_id'] = planned[0]['driver_id']
+
+    assert dispatch.apply(planned) == [f"Job #{planned[1]['job_id']} now clashes with another booking"]
+
+
+def test_apply_rejects_unknown_driver(fleet):
+    planned = proposal()
+    planned[0]['driver_id'] = 999
+
+    assert dispatch.apply(planned) == [f"Job #{planned[0]['job_id']} has an unknown driver or vehicle"]
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite sliding-window-counter rate limit storage, and for limited
+requests being answered without a main-database query (no server needed)
+
+Run with: python -m pytest -q test_rate_limit.py
+"""
+
+import importlib
+import os
+
+import pytest
+from sqlalchemy import event
+
+from services import rate_limit
+from services.rate_limit import SQLiteStorage
+
+WINDOW = 60
+START = 6000.0  # a window boundary
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(START)
+    monkeypatch.setattr(rate_limit.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def storage(tmp_path, clock):
+    return SQLiteStorage(f'sqlite:///{tmp_path}/ratelimits.db')
+
+
+def acquire(storage, times, limit=4, amount=1, key='k'):
+    return [storage.acquire_sliding_window_entry(key, limit, WINDOW, amount) for _ in range(times)]
+
+
+def test_allows_up_to_the_limit(storage):
+    assert acquire(storage, 5) == [True, True, True, True, False]
+
+
+def test_rejected_attempts_are_not_counted(storage):
+    acquire(storage, 10)
+    assert storage.get_sliding_window('k', WINDOW)[2] == 4
+
+
+def test_amount_over_the_limit_is_rejected_without_counting(storage):
+    assert storage.acquire_sliding_window_entry('k', 4, WINDOW, amount=5) is False
+    assert storage.get_sliding_window('k', WINDOW) == (0, 0.0, 0, pytest.approx(2 * WINDOW))
+    assert storage.acquire_sliding_window_entry('k', 4, WINDOW, amount=4) is True
+
+
+def test_amount_that_would_cross_the_limit_is_rejected(storage):
+    assert acquire(storage, 1, amount=3) == [True]
+    assert acquire(storage, 1, amount=2) == [False]
+    assert acquire(storage, 1, amount=1) == [True]
+
+
+def test_previous_window_counts_in_full_at_the_boundary(storage, clock):
+    acquire(storage, 4)
+    clock.now = START + WINDOW
+    assert acquire(storage, 1) == [False]
+
+
+def test_previous_window_weight_decays_across_the_window(storage, clock):
+    acquire(storage, 4)
+    # Halfway through the next window the previous 4 hits weigh 2
+    clock.now = START + 1.5 * WINDOW
+    assert acquire(storage, 3) == [True, True, False]
+
+
+def test_counters_expire_after_two_windows(storage, clock):
+    acquire(storage, 4)
+    clock.now = START + 2 * WINDOW
+    assert acquire(storage, 5) == [True, True, True, True, False]
+
+
+def test_keys_are_independent(storage):
+    acquire(storage, 4, key='a')
+    assert acquire(storage, 1, key='a') == [False]
+    assert acquire(storage, 1, key='b') == [True]
+
+
+def test_clear_sliding_window(storage):
+    acquire(storage, 4)
+    storage.clear_sliding_window('k', WINDOW)
+    assert acquire(storage, 1) == [True]
+
+
+# Not named app: pytest-flask, when installed, would push a request context around every test using it
+@pytest.fixture(scope='module')
+def limited_app(tmp_path_factory):
+    # app.py reads these at import, so they must be set before it is first imported
+    tmp_path = tmp_path_factory.mktemp('app')
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('DATABASE_URL', f'sqlite:///{tmp_path}/app.db')
+        mp.setenv('SESSION_BACKEND', 'database')
+        mp.setenv('RATELIMIT_STORAGE_URI', 'memory://')
+        app = importlib.import_module('app').app
+    from extensions import db
+    from models import User
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(email='limit@example.com', password='secret', username='limited'))
+        db.session.commit()
+    return app
+
+
+def test_limited_request_makes_no_database_query(limited_app, monkeypatch):
+    app = limited_app
+    from extensions import db
+    client = app.test_client()
+    assert client.post('/login', data={'username': 'limited', 'password': 'secret'}).status_code == 302
+    monkeypatch.setitem(app.config, 'RATELIMIT_JOBS_TABLE', '1 per minute')
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        assert client.get('/jobs/table').status_code == 200
+        assert statements
+        statements.clear()
+        for headers in ({}, {'HX-Request': 'true'}):
+            assert client.get('/jobs/table', headers=headers).status_code == 429
+        assert statements == []
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Tests for the double-booking interval index and batch checks (no database or server needed)
+
+Run with: python -m pytest -q test_scheduling.py
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.invalidation import Stamp
+from services.scheduling import Conflict, ConflictEngine, IntervalIndex
+
+DAY = datetime(2030, 8, 1)
+
+
+def at(hour, minute=0):
+    return DAY + timedelta(hours=hour, minutes=minute)
+
+
+@pytest.fixture
+def index():
+    index = IntervalIndex()
+    index.add(at(9), at(11), 1)
+    index.add(at(13), at(14), 2)
+    return index
+
+
+@pytest.mark.parametrize('start,end,expected', [
+    (at(10), at(12), [1]),            # overlaps the end of a booking
+    (at(8), at(9, 30), [1]),          # overlaps the start
+    (at(9, 30), at(10), [1]),         # inside a booking
+    (at(8), at(15), [1, 2]),          # covers both
+    (at(11), at(13), []),             # touches both ends: windows are half-open
+    (at(7), at(9), []),               # ends exactly where a booking starts
+    (at(14), at(16), []),             # starts exactly where a booking ends
+    (at(11, 30), at(12, 30), []),     # in the gap
+])
+def test_overlapping(index, start, end, expected):
+    assert [b.job_id for b in index.overlapping(start, end)] == expected
+
+
+def test_overlapping_excludes_own_job(index):
+    assert index.overlapping(at(10), at(12), exclude_job_id=1) == []
+
+
+def test_long_booking_found_from_far_before_the_query(index):
+    # A whole-day booking starts long before a short query window
+    index.add(DAY, DAY + timedelta(days=1), 3)
+    assert [b.job_id for b in index.overlapping(at(20), at(21))] == [3]
+    assert len(index) == 3 and index.max_length == timedelta(days=1)
+
+
+def test_empty_index():
+    assert IntervalIndex().overlapping(at(9), at(10)) == []
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = ConflictEngine()
+    existing = {('driver', 7): IntervalIndex()}
+    existing[('driver', 7)].add(at(9), at(11), 100)
+    monkeypatch.setattr(engine, 'indexes', lambda: existing)
+    return engine
+
+
+def candidate(start, end, driver_id=None, vehicle_id=None, **extra):
+    return dict(start=start, end=end, driver_id=driver_id, vehicle_id=vehicle_id, **extra)
+
+
+def test_check_batch_clash_between_candidates(engine):
+    results = engine.check_batch([
+        candidate(at(15), at(17), driver_id=1, vehicle_id=5),
+        candidate(at(16), at(18), driver_id=1, vehicle_id=6),
+        candidate(at(16, 30), at(17), driver_id=2, vehicle_id=5),
+    ])
+    assert results[0] == []
+    assert results[1] == [Conflict('driver', 1, -1, at(15), at(17))]
+    assert results[2] == [Conflict('vehicle', 5, -1, at(15), at(17))]
+
+
+def test_check_batch_back_to_back_candidates_do_not_clash(engine):
+    results = engine.check_batch([
+        candidate(at(15), at(16), driver_id=1),
+        candidate(at(16), at(17), driver_id=1),
+    ])
+    assert results == [[], []]
+
+
+def test_check_batch_reports_existing_and_batch_clashes(engine):
+    results = engine.check_batch([
+        candidate(at(10), at(12), driver_id=7),
+        candidate(at(11, 30), at(13), driver_id=7),
+    ])
+    assert results[0] == [Conflict('driver', 7, 100, at(9), at(11))]
+    assert results[1] == [Conflict('driver', 7, -1, at(10), at(12))]
+
+
+def test_check_batch_ignores_the_candidates_own_booking(engine):
+    assert engine.check_batch([candidate(at(10), at(12), driver_id=7, job_id=100)]) == [[]]
+
+
+def test_check_batch_skips_candidates_without_a_window(engine):
+    results = engine.check_batch([
+        candidate(None, None, driver_id=1),
+        candidate(at(9), at(10), driver_id=1),
+    ])
+    assert results == [[], []]
+
+
+def test_stamp_changes_on_every_bump(tmp_path):
+    stamp = Stamp('schedule.stamp')
+    stamp.path = str(tmp_path / 'schedule.stamp')
+    seen = {stamp.read()}
+    for _ in range(5):
+        # Faster than any filesystem mtime tick
+        stamp.bump()
+        seen.add(stamp.read())
+    assert len(seen) == 6
+    assert stamp.read() == stamp.read()
+
+
+def test_bump_in_another_worker_forces_a_rebuild(tmp_path, monkeypatch):
+    workers = [ConflictEngine(), ConflictEngine()]
+    builds = []
+    for worker in workers:
+        worker.stamp.path = str(tmp_path / 'schedule.stamp')
+        monkeypatch.setattr(worker, '_build', lambda worker=worker: builds.append(worker) or {})
+    reader, writer = workers
+
+    reader.indexes()
+    reader.indexes()
+    assert builds == [reader]
+
+    writer.invalidate()
+    writer.invalidate()
+    reader.indexes()
+    assert builds == [reader, reader]